@@ -0,0 +1,387 @@
+"""Gerador de grafos de linhagem sintéticos com o schema de produção.
+
+Os vértices e arestas seguem o formato de `lambda/utils/data.json`
+(`~id`, `~label`, propriedades `nome:Tipo`, `~from`/`~to`):
+
+    JOB -schedule-> JOB_RUN -has-> EXECUTION_PLAN -produce-> TABLE
+    TABLE -consumed_by-> EXECUTION_PLAN
+    TABLE -belongs_to_table-> FEATURE -has_feature-> MODEL
+    TABLE -read_by-> DATASET -uses_dataset-> ANALYSIS -generate_by-> DASHBOARD
+
+O grafo é um DAG em camadas: as tabelas da camada 0 são fontes e os jobs da
+camada `l` leem tabelas das camadas anteriores (na maior parte da camada
+`l - 1`) e escrevem tabelas da camada `l`. Cada job tem `runs` execuções
+com o mesmo plano; a mais recente é a de maior `dt_update`.
+
+A forma do grafo é ajustável: tabelas hub com fan-in e fan-out extremos,
+leituras de camadas posteriores (ciclos), execuções antigas com planos
+diferentes da mais recente e as taxas de features, modelos e dashboards.
+A saída é gravada em streaming, no formato JSON de `utils/data.json` ou no
+CSV do bulk loader do Neptune.
+
+Uso:
+    python benchmarks/lineage_graph.py --jobs 100000 --levels 30 \\
+        --hubs 20 --hub-rate 0.02 --cycle-rate 0.01 \\
+        --format csv --output /tmp/lineage_csv
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+BASE_DATE = datetime(2025, 1, 1)
+
+# Grupo de cada label no arquivo JSON, na ordem de `utils/data.json`
+NODE_GROUPS = {
+    "JOB": "jobs",
+    "JOB_RUN": "job_runs",
+    "EXECUTION_PLAN": "execution_plans",
+    "TABLE": "tables",
+    "FEATURE": "features",
+    "MODEL": "models",
+    "DATASET": "datasets",
+    "ANALYSIS": "analyses",
+    "DASHBOARD": "dashboards",
+}
+
+# Formas usadas pelo benchmark, de ~1k a ~1M vértices
+SHAPES = {
+    "1k": dict(levels=5, jobs_per_level=15, tables_per_level=60, runs=3),
+    "10k": dict(levels=10, jobs_per_level=80, tables_per_level=100,
+                runs=5),
+    "100k": dict(levels=20, jobs_per_level=400, tables_per_level=500,
+                 runs=5),
+    "1m": dict(levels=40, jobs_per_level=2000, tables_per_level=2500,
+               runs=5),
+}
+
+
+def timestamp(offset: int) -> str:
+    """Data no formato de `dt_update` (ordenável como texto)."""
+    value = BASE_DATE + timedelta(minutes=offset)
+    return value.strftime("%Y-%m-%d %H:%M:%S UTC")
+
+
+def vertex(label: str, vertex_id: str, **properties) -> dict:
+    item = {"~id": vertex_id, "~label": label}
+    item.update({
+        f"{key}:String": value for key, value in properties.items()
+    })
+    return item
+
+
+def edge(label: str, from_id: str, to_id: str) -> dict:
+    return {
+        "~id": f"{label}-{from_id}-{to_id}",
+        "~label": label,
+        "~from": from_id,
+        "~to": to_id,
+    }
+
+
+def table_name(level: int, index: int) -> str:
+    return f"table_{level}_{index}"
+
+
+def job_name(level: int, index: int) -> str:
+    return f"job_{level}_{index}"
+
+
+def hub_name(index: int) -> str:
+    return f"hub_table_{index}"
+
+
+def generate(
+        levels: int,
+        jobs_per_level: int,
+        tables_per_level: int,
+        runs: int = 3,
+        reads: int = 3,
+        writes: int = 2,
+        hubs: int = 0,
+        hub_rate: float = 0.0,
+        cycle_rate: float = 0.0,
+        history_drift: float = 0.0,
+        feature_rate: float = 0.2,
+        model_rate: float = 0.5,
+        dashboard_rate: float = 0.1,
+        seed: int = 42
+        ):
+    """Gera o grafo como uma sequência de ("vertex", item) e
+    ("edge", item), sempre com os dois vértices antes da aresta.
+
+    A geração é feita job a job e guarda apenas as tabelas do job corrente,
+    então a memória não cresce com o tamanho do grafo.
+
+    Args:
+    -----
+    levels (int): Número de camadas de jobs (profundidade do DAG).
+    jobs_per_level (int): Jobs por camada.
+    tables_per_level (int): Tabelas por camada.
+    runs (int): Execuções (JOB_RUN + EXECUTION_PLAN) por job.
+    reads (int): Tabelas lidas por plano de execução.
+    writes (int): Tabelas escritas por plano de execução.
+    hubs (int): Número de tabelas hub, lidas e escritas por jobs de todas
+        as camadas (fan-in e fan-out extremos).
+    hub_rate (float): Probabilidade de cada leitura ser de um hub e de cada
+        job escrever também em um hub.
+    cycle_rate (float): Probabilidade de cada leitura ser de uma camada
+        posterior, o que cria ciclos.
+    history_drift (float): Probabilidade de uma execução antiga ler uma
+        tabela diferente da execução mais recente.
+    feature_rate (float): Fração das tabelas com uma feature.
+    model_rate (float): Fração das features com um modelo.
+    dashboard_rate (float): Fração das tabelas com dataset, análise e
+        dashboard.
+    seed (int): Semente do gerador aleatório.
+    """
+    rng = random.Random(seed)
+    hubs = hubs if hub_rate > 0 else 0
+
+    def random_table(level: int) -> str:
+        if hubs and rng.random() < hub_rate:
+            return hub_name(rng.randrange(hubs))
+        if level < levels and rng.random() < cycle_rate:
+            source = rng.randint(level, levels)
+        elif rng.random() < 0.8:
+            source = level - 1
+        else:
+            source = rng.randrange(level)
+        return table_name(source, rng.randrange(tables_per_level))
+
+    def all_tables():
+        for level in range(levels + 1):
+            for index in range(tables_per_level):
+                yield table_name(level, index)
+        for index in range(hubs):
+            yield hub_name(index)
+
+    for name in all_tables():
+        yield "vertex", vertex(
+            "TABLE", name,
+            table_name=name,
+            db_name="db_hub" if name.startswith("hub_")
+            else f"db_{name.split('_')[1]}",
+            location_path=f"s3://bucket/{name}/",
+            status="ACTIVE",
+            dt_update=timestamp(0),
+        )
+
+    for level in range(1, levels + 1):
+        for index in range(jobs_per_level):
+            job_id = job_name(level, index)
+            yield "vertex", vertex(
+                "JOB", job_id,
+                name=job_id,
+                account_id="123456789012",
+                sigla=f"S{level % 10}",
+                tool="Glue",
+                status="ACTIVE",
+                dt_update=timestamp(0),
+            )
+            consumed = sorted({random_table(level) for _ in range(reads)})
+            produced = {
+                table_name(level, (index * writes + k) % tables_per_level)
+                for k in range(writes)
+            }
+            if hubs and rng.random() < hub_rate:
+                produced.add(hub_name(rng.randrange(hubs)))
+            produced = sorted(produced)
+
+            for run in range(runs):
+                run_id = f"{job_id}_run_{run}"
+                plan_id = f"{job_id}_plan_{run}"
+                run_consumed = consumed
+                # A última execução (a mais recente) mantém o plano atual
+                if run < runs - 1 and rng.random() < history_drift:
+                    run_consumed = consumed[1:] + [random_table(level)]
+                yield "vertex", vertex(
+                    "JOB_RUN", run_id, id=run_id,
+                    dt_update=timestamp(run * 60 + level),
+                )
+                yield "vertex", vertex(
+                    "EXECUTION_PLAN", plan_id, id=plan_id,
+                    dt_update=timestamp(run * 60 + level),
+                )
+                yield "edge", edge("schedule", job_id, run_id)
+                yield "edge", edge("has", run_id, plan_id)
+                for table in produced:
+                    yield "edge", edge("produce", plan_id, table)
+                for table in sorted(set(run_consumed)):
+                    yield "edge", edge("consumed_by", table, plan_id)
+
+    for table in all_tables():
+        if rng.random() < feature_rate:
+            feature_id = f"feature_{table}"
+            yield "vertex", vertex(
+                "FEATURE", feature_id,
+                feature_name=feature_id,
+                book_id=f"book_{table}",
+                status="ACTIVE",
+                dt_update=timestamp(0),
+            )
+            yield "edge", edge("belongs_to_table", table, feature_id)
+            if rng.random() < model_rate:
+                model_id = f"model_{table}"
+                yield "vertex", vertex(
+                    "MODEL", model_id,
+                    model_name=model_id,
+                    status="ACTIVE",
+                    dt_update=timestamp(0),
+                )
+                yield "edge", edge("has_feature", feature_id, model_id)
+        if rng.random() < dashboard_rate:
+            dataset_id = f"dataset_{table}"
+            analysis_id = f"analysis_{table}"
+            dashboard_id = f"dashboard_{table}"
+            yield "vertex", vertex(
+                "DATASET", dataset_id, dataset_name=dataset_id
+            )
+            yield "vertex", vertex(
+                "ANALYSIS", analysis_id, analysis_name=analysis_id
+            )
+            yield "vertex", vertex(
+                "DASHBOARD", dashboard_id, dashboard_name=dashboard_id
+            )
+            yield "edge", edge("read_by", table, dataset_id)
+            yield "edge", edge("uses_dataset", dataset_id, analysis_id)
+            yield "edge", edge("generate_by", analysis_id, dashboard_id)
+
+
+def write_json(items, file) -> tuple:
+    """Grava o grafo no formato de `utils/data.json`, em streaming.
+
+    Os vértices de cada grupo (`jobs`, `tables`, ...) e as arestas são
+    escritos em arquivos temporários durante a geração e concatenados no
+    final, então apenas um item fica em memória por vez.
+    """
+    spools = {}
+    counts = {}
+    try:
+        for kind, item in items:
+            group = "edges" if kind == "edge" \
+                else NODE_GROUPS[item["~label"]]
+            spool = spools.get(group)
+            if spool is None:
+                spool = spools[group] = tempfile.TemporaryFile("w+")
+            else:
+                spool.write(",")
+            spool.write(json.dumps(item))
+            counts[group] = counts.get(group, 0) + 1
+
+        file.write('{"nodes": {')
+        groups = [group for group in NODE_GROUPS.values()
+                  if group in spools]
+        for i, group in enumerate(groups):
+            file.write(f'{"," if i else ""}"{group}": [')
+            copy_spool(spools[group], file)
+            file.write("]")
+        file.write('}, "edges": [')
+        if "edges" in spools:
+            copy_spool(spools["edges"], file)
+        file.write("]}\n")
+    finally:
+        for spool in spools.values():
+            spool.close()
+    return counts
+
+
+def copy_spool(spool, file) -> None:
+    spool.seek(0)
+    shutil.copyfileobj(spool, file)
+
+
+def write_csv(items, directory: str) -> dict:
+    """Grava o grafo no formato CSV do bulk loader do Neptune, em
+    streaming: um arquivo de vértices por label (cada label tem o seu
+    cabeçalho de propriedades) e um arquivo `edges.csv`."""
+    os.makedirs(directory, exist_ok=True)
+    files, writers, counts = {}, {}, {}
+    try:
+        for kind, item in items:
+            key = "edges" if kind == "edge" else item["~label"]
+            writer = writers.get(key)
+            if writer is None:
+                name = "edges.csv" if key == "edges" \
+                    else f"vertices_{key.lower()}.csv"
+                files[key] = open(
+                    os.path.join(directory, name), "w", newline=""
+                )
+                header = ["~id", "~from", "~to", "~label"] \
+                    if key == "edges" else list(item)
+                writer = writers[key] = csv.DictWriter(files[key], header)
+                writer.writeheader()
+            writer.writerow(item)
+            counts[key] = counts.get(key, 0) + 1
+    finally:
+        for file in files.values():
+            file.close()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--shape", choices=list(SHAPES))
+    parser.add_argument("--jobs", type=int, default=1000,
+                        help="Total de jobs (dividido entre as camadas)")
+    parser.add_argument("--tables", type=int, default=1500,
+                        help="Total de tabelas (dividido entre as camadas)")
+    parser.add_argument("--levels", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--reads", type=int, default=3)
+    parser.add_argument("--writes", type=int, default=2)
+    parser.add_argument("--hubs", type=int, default=0)
+    parser.add_argument("--hub-rate", type=float, default=0.0)
+    parser.add_argument("--cycle-rate", type=float, default=0.0)
+    parser.add_argument("--history-drift", type=float, default=0.0)
+    parser.add_argument("--feature-rate", type=float, default=0.2)
+    parser.add_argument("--model-rate", type=float, default=0.5)
+    parser.add_argument("--dashboard-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument(
+        "--output", required=True,
+        help="Arquivo (json) ou diretório (csv) de saída"
+    )
+    args = parser.parse_args()
+
+    if args.shape:
+        shape = dict(SHAPES[args.shape])
+    else:
+        shape = dict(
+            levels=args.levels,
+            jobs_per_level=max(1, math.ceil(args.jobs / args.levels)),
+            tables_per_level=max(
+                1, math.ceil(args.tables / (args.levels + 1))
+            ),
+            runs=args.runs,
+        )
+    items = generate(
+        reads=args.reads,
+        writes=args.writes,
+        hubs=args.hubs,
+        hub_rate=args.hub_rate,
+        cycle_rate=args.cycle_rate,
+        history_drift=args.history_drift,
+        feature_rate=args.feature_rate,
+        model_rate=args.model_rate,
+        dashboard_rate=args.dashboard_rate,
+        seed=args.seed,
+        **shape
+    )
+    if args.format == "json":
+        with open(args.output, "w") as file:
+            counts = write_json(items, file)
+    else:
+        counts = write_csv(items, args.output)
+    for key, count in counts.items():
+        print(f"{key:>16} {count:>12,}")
+
+
+if __name__ == "__main__":
+    main()
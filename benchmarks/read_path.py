@@ -0,0 +1,363 @@
+"""Benchmark do caminho de leitura (`get_subgraph_of_the_table` e
+`get_subgraph_of_the_job`) sobre grafos de linhagem sintéticos.
+
+Para cada forma de `lineage_graph.SHAPES` o grafo é gerado, carregado em um
+Gremlin Server local (TinkerGraph) e as consultas de cada engine do
+`lambda/app.py` são executadas para uma amostra de tabelas e jobs. O
+relatório traz, por forma, engine e tipo de nó:
+
+- latência p50/p95/p99 (ms);
+- tamanho do resultado (nós, arestas e bytes do JSON);
+- traversers das travessias do engine default, somando a coluna
+  "Traversers" de todos os passos do `profile()` (`utils.query_profile`).
+
+O engine snapshot responde com um `LineageSnapshot` construído a partir do
+mesmo grafo gerado, sem consultas ao servidor. O engine closure usa o fecho
+transitivo (`LineageClosure`) calculado a partir desse snapshot. A memória
+do snapshot é medida com `tracemalloc` (pico da construção e memória
+retida depois dela) e comparada com a memória da Lambda (`--memory-mb`,
+512 MB no `template.yaml`).
+
+Os IDs dos vértices são strings, como no Neptune, então o TinkerGraph do
+servidor precisa de `gremlin.tinkergraph.vertexIdManager=ANY` e
+`gremlin.tinkergraph.edgeIdManager=ANY` no `.properties` do grafo (por
+exemplo, `conf/tinkergraph-empty.properties` da imagem
+`tinkerpop/gremlin-server`).
+
+Uso:
+    python benchmarks/read_path.py --shapes 1k 10k --samples 20
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "lambda"))
+
+from gremlin_python.driver.driver_remote_connection import \
+    DriverRemoteConnection  # noqa: E402
+from gremlin_python.process.anonymous_traversal import traversal  # noqa: E402
+from gremlin_python.process.traversal import T  # noqa: E402
+from gremlin_python.process.graph_traversal import __  # noqa: E402
+from utils.constants import (  # noqa: E402
+    VERTEX_LABEL_JOB,
+    VERTEX_LABEL_TABLE,
+    ENGINE_DEFAULT,
+    ENGINE_SINGLE_TRIP,
+    ENGINE_BFS,
+    ENGINE_SHORTCUT,
+    ENGINE_SNAPSHOT,
+    ENGINE_CLOSURE
+)
+from utils.data_reader import (  # noqa: E402
+    get_subgraph_of_the_table,
+    get_subgraph_of_the_job,
+    get_subgraph_of_the_table_single_trip,
+    get_subgraph_of_the_job_single_trip,
+    get_subgraph_of_the_table_bfs,
+    get_subgraph_of_the_job_bfs,
+    get_subgraph_of_the_table_shortcut,
+    get_subgraph_of_the_job_shortcut
+)
+from utils.latest_run_edges import rebuild_latest_run_edges  # noqa: E402
+from utils.query_profile import profile_subgraph  # noqa: E402
+from utils.lineage_snapshot import \
+    LineageSnapshot, SnapshotStore  # noqa: E402
+from utils.lineage_closure import LineageClosure, ClosureStore  # noqa: E402
+from lineage_graph import SHAPES, generate  # noqa: E402
+
+# Snapshot da forma corrente, sem arquivo e sem stream
+snapshot_store = SnapshotStore(path=None)
+# Fecho da forma corrente, gravado em um arquivo temporário
+closure_store = ClosureStore(
+    path=os.path.join(tempfile.gettempdir(), "lineage_closure.bin")
+)
+
+ENGINES = {
+    ENGINE_DEFAULT: (get_subgraph_of_the_table, get_subgraph_of_the_job),
+    ENGINE_SINGLE_TRIP: (
+        get_subgraph_of_the_table_single_trip,
+        get_subgraph_of_the_job_single_trip
+    ),
+    ENGINE_BFS: (get_subgraph_of_the_table_bfs, get_subgraph_of_the_job_bfs),
+    ENGINE_SHORTCUT: (
+        get_subgraph_of_the_table_shortcut,
+        get_subgraph_of_the_job_shortcut
+    ),
+    ENGINE_SNAPSHOT: (
+        snapshot_store.get_subgraph_of_the_table,
+        snapshot_store.get_subgraph_of_the_job
+    ),
+    ENGINE_CLOSURE: (
+        closure_store.get_subgraph_of_the_table,
+        closure_store.get_subgraph_of_the_job
+    ),
+}
+
+# Consultas encadeadas por requisição na carga
+LOAD_BATCH_SIZE = 100
+
+
+def load_graph(g, items) -> tuple:
+    """Carrega os itens de `lineage_graph.generate`, encadeando
+    `LOAD_BATCH_SIZE` inserções por requisição."""
+    vertices = edges = 0
+    batch, size = None, 0
+    for kind, item in items:
+        if kind == "vertex":
+            source = batch if batch is not None else g
+            batch = source.addV(item["~label"]).property(T.id, item["~id"])
+            for key, value in item.items():
+                if not key.startswith("~"):
+                    batch = batch.property(key.split(":")[0], value)
+            vertices += 1
+        else:
+            source = batch if batch is not None else g
+            batch = source.V(item["~from"]) \
+                .addE(item["~label"]).to(__.V(item["~to"]))
+            edges += 1
+        size += 1
+        if size >= LOAD_BATCH_SIZE:
+            batch.iterate()
+            batch, size = None, 0
+    if batch is not None:
+        batch.iterate()
+    return vertices, edges
+
+
+def sample_names(shape: dict, node_type: str, samples: int,
+                 rng: random.Random) -> list:
+    """Sorteia nomes de tabelas ou jobs das camadas intermediárias, com
+    ascendentes e descendentes."""
+    levels = shape["levels"]
+    if node_type == VERTEX_LABEL_TABLE:
+        per_level, prefix = shape["tables_per_level"], "table"
+    else:
+        per_level, prefix = shape["jobs_per_level"], "job"
+    return [
+        f"{prefix}_{rng.randint(1, max(levels - 1, 1))}_"
+        f"{rng.randrange(per_level)}"
+        for _ in range(samples)
+    ]
+
+
+def percentile(values: list, q: float) -> float:
+    """Percentil pelo método da posição mais próxima."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def result_size(subgraph: dict) -> tuple:
+    nodes = sum(
+        len(value) for key, value in subgraph.items()
+        if isinstance(value, list) and key != "edges"
+    )
+    return nodes, len(subgraph.get("edges", [])), \
+        len(json.dumps(subgraph))
+
+
+def traverser_count(profiles: list) -> int:
+    return sum(
+        step["traversers"] or 0
+        for profile in profiles
+        for step in profile["steps"]
+    )
+
+
+def run_case(g, shape_name: str, engine: str, node_type: str, names: list,
+             level: int, level_down: int, iterations: int,
+             profile: bool) -> dict:
+    table_reader, job_reader = ENGINES[engine]
+    latencies, nodes, edges, sizes, traversers = [], [], [], [], []
+    for name in names:
+        for _ in range(iterations):
+            started_at = time.perf_counter()
+            if node_type == VERTEX_LABEL_TABLE:
+                subgraph = table_reader(g, name, level, level_down)
+            else:
+                subgraph = job_reader(g, name, level, level_down)
+            latencies.append((time.perf_counter() - started_at) * 1000)
+        node_count, edge_count, size = result_size(subgraph)
+        nodes.append(node_count)
+        edges.append(edge_count)
+        sizes.append(size)
+        if profile:
+            traversers.append(traverser_count(
+                profile_subgraph(g, node_type, subgraph, level, level_down)
+            ))
+    return {
+        "shape": shape_name,
+        "engine": engine,
+        "nodeType": node_type,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "nodes": sum(nodes) / len(nodes),
+        "edges": sum(edges) / len(edges),
+        "bytes": sum(sizes) / len(sizes),
+        "traversers": sum(traversers) / len(traversers)
+        if traversers else None,
+    }
+
+
+def build_snapshot(items) -> tuple:
+    """Constrói o snapshot medindo a memória alocada pelo Python.
+
+    Returns:
+    -------
+    tuple: Uma tupla contendo:
+        - snapshot: O `LineageSnapshot` construído.
+        - memory: Bytes retidos pelo snapshot (`retained`), pico durante a
+          construção (`peak`) e a estimativa de `memory_usage`.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        snapshot = LineageSnapshot.build(items)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return snapshot, {
+        "retained": retained - before,
+        "peak": peak - before,
+        "estimated": snapshot.memory_usage(),
+    }
+
+
+def print_memory(shape_name: str, memory: dict, limit_mb: int) -> None:
+    mib = {key: value / 2 ** 20 for key, value in memory.items()}
+    print(
+        f"{shape_name}: snapshot retains {mib['retained']:.1f} MiB "
+        f"(estimated {mib['estimated']:.1f} MiB), build peak "
+        f"{mib['peak']:.1f} MiB, "
+        f"{mib['peak'] / limit_mb:.0%} of a {limit_mb} MB Lambda",
+        file=sys.stderr
+    )
+
+
+def print_report(results: list) -> None:
+    header = f"{'shape':>6} {'engine':>12} {'type':>6} {'p50':>9} " \
+        f"{'p95':>9} {'p99':>9} {'nodes':>9} {'edges':>9} " \
+        f"{'bytes':>11} {'traversers':>12}"
+    print(header)
+    for r in results:
+        traversers = f"{r['traversers']:>12,.0f}" \
+            if r["traversers"] is not None else f"{'-':>12}"
+        print(
+            f"{r['shape']:>6} {r['engine']:>12} {r['nodeType']:>6} "
+            f"{r['p50']:>9.1f} {r['p95']:>9.1f} {r['p99']:>9.1f} "
+            f"{r['nodes']:>9,.0f} {r['edges']:>9,.0f} "
+            f"{r['bytes']:>11,.0f} {traversers}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", default="ws://localhost:8182/gremlin")
+    parser.add_argument(
+        "--shapes", nargs="+", choices=list(SHAPES), default=["1k", "10k"]
+    )
+    parser.add_argument(
+        "--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES)
+    )
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--depth-up", type=int, default=10)
+    parser.add_argument("--depth-down", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--memory-mb", type=int, default=512,
+        help="Memória da Lambda, para comparar com a do snapshot"
+    )
+    parser.add_argument(
+        "--no-load", action="store_true",
+        help="Usa o grafo já carregado no servidor (uma única forma)"
+    )
+    parser.add_argument(
+        "--no-profile", action="store_true",
+        help="Não conta os traversers com profile()"
+    )
+    parser.add_argument("--output", help="Grava os resultados em JSON")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    connection = DriverRemoteConnection(args.url, "g")
+    g = traversal().with_remote(connection)
+    rng = random.Random(args.seed)
+    results = []
+    try:
+        for shape_name in args.shapes:
+            shape = SHAPES[shape_name]
+            if not args.no_load:
+                g.V().drop().iterate()
+                started_at = time.perf_counter()
+                vertices, edges = load_graph(
+                    g, generate(seed=args.seed, **shape)
+                )
+                rebuild_latest_run_edges(g)
+                print(
+                    f"{shape_name}: loaded {vertices:,} vertices and "
+                    f"{edges:,} edges in "
+                    f"{time.perf_counter() - started_at:.1f}s",
+                    file=sys.stderr
+                )
+            if ENGINE_SNAPSHOT in args.engines or \
+                    ENGINE_CLOSURE in args.engines:
+                started_at = time.perf_counter()
+                snapshot_store.snapshot, memory = build_snapshot(
+                    generate(seed=args.seed, **shape)
+                )
+                print(
+                    f"{shape_name}: built snapshot of "
+                    f"{len(snapshot_store.snapshot.ids):,} vertices in "
+                    f"{time.perf_counter() - started_at:.1f}s",
+                    file=sys.stderr
+                )
+                print_memory(shape_name, memory, args.memory_mb)
+            if ENGINE_CLOSURE in args.engines:
+                started_at = time.perf_counter()
+                if closure_store.closure is not None:
+                    closure_store.closure.close()
+                    closure_store.closure = None
+                size = LineageClosure.build(
+                    snapshot_store.snapshot, closure_store.path
+                )
+                print(
+                    f"{shape_name}: built closure of {size:,} nodes "
+                    f"({os.path.getsize(closure_store.path) / 2 ** 20:.1f} "
+                    f"MiB) in {time.perf_counter() - started_at:.1f}s",
+                    file=sys.stderr
+                )
+            for node_type in (VERTEX_LABEL_TABLE, VERTEX_LABEL_JOB):
+                names = sample_names(shape, node_type, args.samples, rng)
+                for engine in args.engines:
+                    result = run_case(
+                        g, shape_name, engine, node_type, names,
+                        args.depth_up, args.depth_down, args.iterations,
+                        profile=engine == ENGINE_DEFAULT
+                        and not args.no_profile
+                    )
+                    if engine == ENGINE_SNAPSHOT:
+                        result["memory"] = memory
+                    results.append(result)
+    finally:
+        connection.close()
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Benchmark do número de traversers dos `repeat()` de linhagem em um grafo
+sintético com muitos losangos, medido com `profile()`.
+
+O grafo é gerado por `lineage_graph.generate` com poucas tabelas por
+camada, várias leituras e escritas por job e várias execuções por job:
+vários jobs lendo e escrevendo as mesmas tabelas formam losangos em todos
+os níveis. Ele é carregado em um Gremlin Server local (TinkerGraph) com o
+harness de `read_path.py` (mesma configuração do servidor).
+
+Para cada modo de `visit_once` (`utils.data_reader.VISIT_MODES`), as
+travessias do engine default (`utils.query_profile.lineage_traversals`)
+são executadas com `profile()` para uma amostra de tabelas e jobs:
+
+- dedup: `where(without("visited")).dedup().aggregate("visited")`, um
+  traverser por vértice em cada nível (o modo padrão);
+- visited: sem o `dedup()`; nenhum vértice de níveis anteriores é
+  revisitado, mas os traversers do mesmo nível que chegam ao mesmo vértice
+  seguem em frente;
+- paths: sem filtro; cada caminho é um traverser até o `dedup()` final.
+
+O relatório traz, por modo e tipo de nó, a latência média do `profile()`,
+a soma da coluna "Traversers" de todos os passos e o tamanho do resultado
+(que deve ser o mesmo nos modos dedup e visited).
+
+Uso:
+    python benchmarks/traverser_dedup.py --levels 6 --width 20 --runs 5
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+
+# read_path coloca lambda/ no sys.path
+import read_path
+from gremlin_python.driver.driver_remote_connection import \
+    DriverRemoteConnection
+from gremlin_python.process.anonymous_traversal import traversal
+from lineage_graph import generate, table_name, job_name
+from utils import data_reader
+from utils.constants import VERTEX_LABEL_JOB, VERTEX_LABEL_TABLE
+from utils.query_profile import lineage_traversals, profile_traversal
+
+# Travessias da linhagem (sem os nós ligados às tabelas)
+LINEAGE_QUERIES = 3
+
+
+def diamond_graph(levels: int, width: int, fan_in: int, fan_out: int,
+                  runs: int, seed: int):
+    """Grafo em camadas com `width` jobs e tabelas por camada; cada job lê
+    `fan_in` e escreve `fan_out` tabelas, sem nós ligados."""
+    return generate(
+        levels=levels,
+        jobs_per_level=width,
+        tables_per_level=width,
+        runs=runs,
+        reads=fan_in,
+        writes=fan_out,
+        feature_rate=0.0,
+        dashboard_rate=0.0,
+        seed=seed
+    )
+
+
+def profile_mode(g, mode: str, node_type: str, names: list, level: int,
+                 level_down: int) -> dict:
+    """Executa as travessias da linhagem de cada nó no modo `mode`."""
+    data_reader.VISIT_MODE = mode
+    latencies, traversers, results = [], [], []
+    for name in names:
+        queries = lineage_traversals(
+            g, node_type, name, [], level, level_down
+        )[:LINEAGE_QUERIES]
+        started_at = time.perf_counter()
+        profiles = [
+            profile_traversal(query) for _, query in queries
+        ]
+        latencies.append((time.perf_counter() - started_at) * 1000)
+        traversers.append(read_path.traverser_count(profiles))
+        results.append(sum(
+            len(query.toList()) for _, query in lineage_traversals(
+                g, node_type, name, [], level, level_down
+            )[:LINEAGE_QUERIES]
+        ))
+    return {
+        "mode": mode,
+        "nodeType": node_type,
+        "ms": sum(latencies) / len(latencies),
+        "traversers": sum(traversers) / len(traversers),
+        "results": sum(results) / len(results),
+    }
+
+
+def print_report(rows: list) -> None:
+    print(
+        f"{'mode':>8} {'type':>6} {'ms':>10} {'traversers':>14} "
+        f"{'results':>9} {'vs dedup':>9}"
+    )
+    baseline = {
+        row["nodeType"]: row["traversers"] for row in rows
+        if row["mode"] == data_reader.VISIT_MODE_DEDUP
+    }
+    for row in rows:
+        dedup = baseline.get(row["nodeType"])
+        ratio = f"{row['traversers'] / max(dedup, 1):>8.1f}x" \
+            if dedup is not None else f"{'-':>9}"
+        print(
+            f"{row['mode']:>8} {row['nodeType']:>6} {row['ms']:>10.1f} "
+            f"{row['traversers']:>14,.0f} {row['results']:>9,.0f} "
+            f"{ratio}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", default="ws://localhost:8182/gremlin")
+    parser.add_argument("--levels", type=int, default=6)
+    parser.add_argument("--width", type=int, default=20)
+    parser.add_argument("--fan-in", type=int, default=3)
+    parser.add_argument("--fan-out", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument(
+        "--modes", nargs="+", choices=data_reader.VISIT_MODES,
+        default=list(data_reader.VISIT_MODES)
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--no-load", action="store_true",
+        help="Usa o grafo já carregado no servidor"
+    )
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    connection = DriverRemoteConnection(args.url, "g")
+    g = traversal().with_remote(connection)
+    rng = random.Random(args.seed)
+    # Nós do meio do grafo, com ascendentes e descendentes
+    middle = max(1, args.levels // 2)
+    samples = {
+        VERTEX_LABEL_TABLE: [
+            table_name(middle, rng.randrange(args.width))
+            for _ in range(args.samples)
+        ],
+        VERTEX_LABEL_JOB: [
+            job_name(middle, rng.randrange(args.width))
+            for _ in range(args.samples)
+        ],
+    }
+    rows = []
+    try:
+        if not args.no_load:
+            g.V().drop().iterate()
+            vertices, edges = read_path.load_graph(g, diamond_graph(
+                args.levels, args.width, args.fan_in, args.fan_out,
+                args.runs, args.seed
+            ))
+            print(
+                f"loaded {vertices:,} vertices and {edges:,} edges",
+                file=sys.stderr
+            )
+        for node_type, names in samples.items():
+            for mode in args.modes:
+                rows.append(profile_mode(
+                    g, mode, node_type, names, args.depth, args.depth
+                ))
+    finally:
+        data_reader.VISIT_MODE = data_reader.VISIT_MODE_DEDUP
+        connection.close()
+
+    print_report(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,283 @@
 import json
 import os
 import logging
-from utils.utils import create_connection, bulk_load_data, merge_table_data
+from neptune_python_utils.endpoints import Endpoints
+from neptune_python_utils.streams import NeptuneStream
+from utils.utils import bulk_load_data, merge_table_data
+from utils.connection_manager import NeptuneRouter
+from utils.subgraph_cache import SubgraphCache, collect_ids
+from utils.latest_run_edges import sync_latest_run_edges
+from utils.wire_format import negotiate, encode_response, FORMAT_JSON
+from utils.query_metrics import with_query_metrics
+from utils.query_profile import \
+    profile_subgraph, \
+    DEBUG_PROFILE, \
+    PROFILE_ENGINES
+from utils.lineage_snapshot import SnapshotStore
+from utils.lineage_closure import ClosureStore
+from utils.name_index import NameIndex, register_name_index
+from utils.stream_reader import StreamReader
+from utils.subgraph_pages import \
+    get_subgraph_page, \
+    PAGE_SIZE, \
+    MAX_PAGE_SIZE
+from utils.constants import (
+    VERTEX_LABEL_JOB,
+    VERTEX_LABEL_TABLE,
+    DEFAULT_DEPTH,
+    MAX_DEPTH,
+    MAX_BATCH_NODES,
+    ENGINE_DEFAULT,
+    ENGINE_SINGLE_TRIP,
+    ENGINE_BFS,
+    ENGINE_SHORTCUT,
+    ENGINE_SNAPSHOT,
+    ENGINE_CLOSURE
+)
 from utils.data_reader import \
     get_subgraph_of_the_table, \
-    get_subgraph_of_the_job
+    get_subgraph_of_the_job, \
+    get_subgraph_of_the_table_single_trip, \
+    get_subgraph_of_the_job_single_trip, \
+    get_subgraph_of_the_table_bfs, \
+    get_subgraph_of_the_job_bfs, \
+    get_subgraph_of_the_table_shortcut, \
+    get_subgraph_of_the_job_shortcut, \
+    get_subgraphs_of_the_tables_bfs, \
+    get_subgraphs_of_the_jobs_bfs, \
+    merge_subgraphs, \
+    get_owner_jobs
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 NEPTUNE_PORT = os.getenv("NEPTUNE_PORT")
 NEPTUNE_ENDPOINT = os.getenv("NEPTUNE_ENDPOINT_WRITER")
+NEPTUNE_ENDPOINT_READER = os.getenv("NEPTUNE_ENDPOINT_READER")
+SUBGRAPH_CACHE_STREAM = \
+    os.getenv("SUBGRAPH_CACHE_STREAM", "false").lower() == "true"
+SUBGRAPH_ENGINE = os.getenv("SUBGRAPH_ENGINE", ENGINE_DEFAULT)
+# Arquivo do snapshot da linhagem (em /tmp ou em uma Lambda layer). Sem ele,
+# o engine snapshot não fica disponível
+LINEAGE_SNAPSHOT_PATH = os.getenv("LINEAGE_SNAPSHOT_PATH")
+# Arquivo do fecho transitivo da linhagem. Sem ele, o engine closure não
+# fica disponível
+LINEAGE_CLOSURE_PATH = os.getenv("LINEAGE_CLOSURE_PATH")
+# Índice de nome para ID das tabelas e jobs, carregado na primeira consulta
+# e atualizado pelo Neptune Stream
+NAME_INDEX = os.getenv("NAME_INDEX", "true").lower() == "true"
 
+# Implementações de (subgrafo da tabela, subgrafo do job) por engine
+SUBGRAPH_ENGINES = {
+    ENGINE_DEFAULT: (
+        get_subgraph_of_the_table,
+        get_subgraph_of_the_job
+    ),
+    ENGINE_SINGLE_TRIP: (
+        get_subgraph_of_the_table_single_trip,
+        get_subgraph_of_the_job_single_trip
+    ),
+    ENGINE_BFS: (
+        get_subgraph_of_the_table_bfs,
+        get_subgraph_of_the_job_bfs
+    ),
+    ENGINE_SHORTCUT: (
+        get_subgraph_of_the_table_shortcut,
+        get_subgraph_of_the_job_shortcut
+    ),
+}
 
+# Conexões reaproveitadas entre invocações do mesmo container: leituras vão
+# para os readers e apenas as escritas usam o writer
+router = NeptuneRouter.from_env(
+    writer_endpoint=NEPTUNE_ENDPOINT,
+    reader_endpoints=NEPTUNE_ENDPOINT_READER,
+    neptune_port=NEPTUNE_PORT
+    )
+
+writer_endpoints = Endpoints(
+    neptune_endpoint=NEPTUNE_ENDPOINT,
+    neptune_port=NEPTUNE_PORT
+    )
+
+neptune_stream = NeptuneStream(endpoints=writer_endpoints)
+# Leitor em pipeline do handler de manutenção; o tamanho dos lotes se
+# ajusta entre as execuções do container
+stream_reader = StreamReader(neptune_stream)
+
+subgraph_cache = SubgraphCache(
+    stream=neptune_stream if SUBGRAPH_CACHE_STREAM else None,
+    resolve_owners=lambda ids: router.run_read(
+        lambda g: get_owner_jobs(g=g, ids=ids)
+        )
+    )
+
+# Snapshot carregado na primeira consulta e atualizado pelo Neptune Stream
+lineage_snapshot = SnapshotStore(
+    path=LINEAGE_SNAPSHOT_PATH,
+    stream=neptune_stream
+    ) if LINEAGE_SNAPSHOT_PATH else None
+if lineage_snapshot is not None:
+    SUBGRAPH_ENGINES[ENGINE_SNAPSHOT] = (
+        lineage_snapshot.get_subgraph_of_the_table,
+        lineage_snapshot.get_subgraph_of_the_job
+    )
+
+# Fecho mapeado na primeira consulta; indica as tabelas pré-carregadas pela
+# BFS
+lineage_closure = ClosureStore(path=LINEAGE_CLOSURE_PATH) \
+    if LINEAGE_CLOSURE_PATH else None
+if lineage_closure is not None:
+    SUBGRAPH_ENGINES[ENGINE_CLOSURE] = (
+        lineage_closure.get_subgraph_of_the_table,
+        lineage_closure.get_subgraph_of_the_job
+    )
+
+# Carregado na primeira consulta do handler da API, não na importação
+name_index = NameIndex(stream=neptune_stream) if NAME_INDEX else None
+if name_index is not None:
+    register_name_index(name_index)
+
+
+def get_subgraph(
+        node_type: str,
+        node_name: str,
+        level: int,
+        level_down: int = None,
+        engine: str = ENGINE_DEFAULT
+        ) -> dict:
+    table_reader, job_reader = SUBGRAPH_ENGINES[engine]
+    if node_type == VERTEX_LABEL_TABLE:
+        return router.run_read(
+            lambda g: table_reader(
+                g=g,
+                tableId=node_name,
+                level=level,
+                level_down=level_down
+                )
+            )
+    return router.run_read(
+        lambda g: job_reader(
+            g=g,
+            jobId=node_name,
+            level=level,
+            level_down=level_down
+            )
+        )
+
+
+def get_subgraphs(
+        node_type: str,
+        node_names: list,
+        level: int,
+        level_down: int = None,
+        engine: str = ENGINE_DEFAULT
+        ) -> dict:
+    """Retorna os subgrafos de vários nós com as BFS executadas em conjunto,
+    compartilhando a fronteira de cada nível."""
+    if engine == ENGINE_SNAPSHOT:
+        return router.run_read(
+            lambda g: lineage_snapshot.get_subgraphs(
+                g,
+                node_type,
+                node_names,
+                level=level,
+                level_down=level_down
+                )
+            )
+    if engine == ENGINE_CLOSURE:
+        return router.run_read(
+            lambda g: lineage_closure.get_subgraphs(
+                g,
+                node_type,
+                node_names,
+                level=level,
+                level_down=level_down
+                )
+            )
+    batch_reader = get_subgraphs_of_the_tables_bfs \
+        if node_type == VERTEX_LABEL_TABLE else get_subgraphs_of_the_jobs_bfs
+    return router.run_read(
+        lambda g: batch_reader(
+            g,
+            node_names,
+            level=level,
+            level_down=level_down
+            )
+        )
+
+
+def with_staleness(payload: dict, engine: str) -> dict:
+    """Acrescenta à resposta o atraso dos dados do engine snapshot quando
+    a leitura do Neptune Stream está falhando."""
+    if engine != ENGINE_SNAPSHOT or lineage_snapshot is None:
+        return payload
+    staleness = lineage_snapshot.staleness()
+    if staleness is None:
+        return payload
+    return dict(payload, staleness=staleness)
+
+
+def get_batch_node_names(event: dict, parameters: dict) -> list:
+    """Retorna os nomes do modo em lote: `node_names` separados por vírgula
+    ou `node_name` repetido na query string. Retorna None quando a
+    requisição é de um único nó."""
+    node_names_str = parameters.get("node_names")
+    if node_names_str:
+        names = node_names_str.split(",")
+    else:
+        names = (event.get("multiValueQueryStringParameters") or {}) \
+            .get("node_name") or []
+        if len(names) < 2:
+            return None
+    return list(dict.fromkeys(
+        name.strip() for name in names if name.strip()
+    ))
+
+
+def parse_depth(value) -> int:
+    """Converte um parâmetro de profundidade da query string. Retorna
+    `DEFAULT_DEPTH` quando ausente e None quando inválido."""
+    if value is None or value == "":
+        return DEFAULT_DEPTH
+    try:
+        depth = int(value)
+    except (TypeError, ValueError):
+        return None
+    if depth < 1 or depth > MAX_DEPTH:
+        return None
+    return depth
+
+
+def parse_page_size(value) -> int:
+    """Converte o parâmetro `page_size`. Retorna `PAGE_SIZE` quando
+    ausente e None quando inválido."""
+    if value is None or value == "":
+        return PAGE_SIZE
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return None
+    if page_size < 1 or page_size > MAX_PAGE_SIZE:
+        return None
+    return page_size
+
+
+def maintenance_handler(event, context):
+    """Handler agendado que mantém as arestas derivadas da execução mais
+    recente de cada job (`latest_produces` e `latest_consumed_by`)."""
+    summary = router.run_write(
+        lambda g: sync_latest_run_edges(g=g, reader=stream_reader)
+        )
+    logger.info(f"Latest run edges synchronized: {summary}")
+    return summary
+
+
+@with_query_metrics
 def lambda_handler(event, context):
 
     logger.info(f"Received event: {event}")
-    parameters = event.get("queryStringParameters", {})
+    parameters = event.get("queryStringParameters") or {}
     logger.info(f"Parameters: {parameters}")
     load_mock_str = parameters.get("load_mock", "false")
     load_mock = str(load_mock_str).lower() == "true"
@@ -27,13 +288,35 @@ def lambda_handler(event, context):
     merge_table = str(merge_table_str).lower() == "true"
     logger.info(f"Merge table data: {merge_table}")
     table_merged = parameters.get("table_merged", None)
+    sections_str = parameters.get("sections")
+    sections = [
+        section.strip() for section in sections_str.split(",")
+        if section.strip()
+    ] if sections_str else None
+    engine = parameters.get("engine", SUBGRAPH_ENGINE)
+    depth_up = parse_depth(parameters.get("depth_up"))
+    depth_down = parse_depth(parameters.get("depth_down"))
+    cursor = parameters.get("cursor")
+    page_size_str = parameters.get("page_size")
+    node_names = get_batch_node_names(event, parameters)
+    merge_str = parameters.get("merge", "false")
+    merge = str(merge_str).lower() == "true"
+    debug = parameters.get("debug")
+    response_format, use_gzip = negotiate(event, parameters)
 
-    gremlin_utils, conn = create_connection(
-        neptune_endpoint=NEPTUNE_ENDPOINT,
-        neptune_port=NEPTUNE_PORT
-        )
-    g = gremlin_utils.traversal_source(connection=conn)
-    bulk_load_data(g=g, load_mock=load_mock)
+    # Apenas a carga dos dados mock usa o writer; as leituras não abrem a
+    # conexão com ele
+    if load_mock:
+        router.run_write(
+            lambda g: bulk_load_data(
+                g=g,
+                load_mock=load_mock,
+                endpoints=writer_endpoints
+                )
+            )
+        subgraph_cache.clear()
+        if name_index is not None:
+            name_index.clear()
 
     if merge_table:
         if not node_name or not table_merged:
@@ -53,37 +336,242 @@ def lambda_handler(event, context):
                 }),
             }
 
-        response = merge_table_data(
-            g=g,
-            tableId=node_name,
-            table_merged=table_merged
-            )
-        return response
-    else:
-        if node_type == "TABLE":
-            response = get_subgraph_of_the_table(
+        response = router.run_write(
+            lambda g: merge_table_data(
                 g=g,
                 tableId=node_name,
-                level=50
+                table_merged=table_merged
                 )
-        elif node_type == "JOB":
-            response = get_subgraph_of_the_job(
-                g=g,
-                jobId=node_name,
-                level=50
-                )
-        else:
+            )
+        subgraph_cache.clear()
+        if name_index is not None:
+            name_index.clear()
+        return response
+    else:
+        # O cursor guarda o nó, o tipo e as profundidades da consulta
+        if not cursor and \
+                node_type not in (VERTEX_LABEL_TABLE, VERTEX_LABEL_JOB):
             return {
                 "statusCode": 400,
                 "body": json.dumps({
                     "message": "Invalid node type. Use 'TABLE' or 'JOB'."
                 }),
             }
-    conn.close()
-    return {
-        "statusCode": 200,
-        "body": json.dumps({
+
+        if engine not in SUBGRAPH_ENGINES:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "message": "Invalid engine. Use one of: "
+                    f"{', '.join(SUBGRAPH_ENGINES)}."
+                }),
+            }
+
+        if depth_up is None or depth_down is None:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "message": "Invalid depth. 'depth_up' and 'depth_down' "
+                    f"must be integers between 1 and {MAX_DEPTH}."
+                }),
+            }
+
+        if debug and debug != DEBUG_PROFILE:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "message": f"Invalid debug mode. Use '{DEBUG_PROFILE}'."
+                }),
+            }
+
+        if debug == DEBUG_PROFILE and engine not in PROFILE_ENGINES:
+            return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "message": f"Engine '{engine}' cannot be profiled. "
+                    f"Use one of: {', '.join(PROFILE_ENGINES)}."
+                }),
+            }
+
+        # Um nome presente no índice dispensa a consulta; um nome fora dele
+        # ainda é buscado no grafo (`resolve`) antes do 404, porque o
+        # índice pode estar atrasado em relação ao stream
+        index = router.run_read(name_index.get) \
+            if name_index is not None else None
+        if index is not None and node_names is None and not cursor and \
+                not index.contains(node_type, node_name) and \
+                not router.run_read(
+                    lambda g: index.resolve(g, node_type, [node_name])
+                    ):
+            # Nome fora do índice e do grafo
+            return {
+                "statusCode": 404,
+                "body": json.dumps({
+                    "message": f"Node '{node_name}' not found."
+                }),
+            }
+
+        if node_names is not None:
+            if not node_names or len(node_names) > MAX_BATCH_NODES:
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({
+                        "message": "Invalid node_names. Provide between 1 "
+                        f"and {MAX_BATCH_NODES} names."
+                    }),
+                }
+
+            # Os nós em cache são respondidos diretamente e os demais são
+            # buscados juntos
+            responses, missing = {}, []
+            for name in node_names:
+                cache_key = subgraph_cache.key(
+                    node_type, name, depth_up, depth_down, sections,
+                    engine
+                    )
+                responses[name] = subgraph_cache.get(cache_key)
+                if responses[name] is None:
+                    missing.append(name)
+            logger.info(
+                f"Batch of {len(node_names)} nodes, "
+                f"{len(node_names) - len(missing)} cache hits"
+            )
+            if missing:
+                subgraphs = get_subgraphs(
+                    node_type, missing, depth_up, depth_down, engine
+                    )
+                for name, subgraph in subgraphs.items():
+                    responses[name] = {
+                        key: value for key, value in subgraph.items()
+                        if not sections or key in sections
+                    }
+                    subgraph_cache.put(
+                        subgraph_cache.key(
+                            node_type, name, depth_up, depth_down, sections,
+                            engine
+                            ),
+                        responses[name],
+                        collect_ids(subgraph)
+                        )
+
+            # Sem o nó de partida (quando a seção não foi filtrada), o nome
+            # não existe no grafo
+            start_key = "table" if node_type == VERTEX_LABEL_TABLE \
+                else "job"
+            not_found = [
+                name for name in node_names
+                if not responses[name].get(start_key, True)
+            ]
+            # O formato compacto vale para um único subgrafo, então só é
+            # aplicado à união
+            if merge:
+                data = merge_subgraphs(
+                    [responses[name] for name in node_names], node_type
+                    )
+            else:
+                data = responses
+            return encode_response(
+                200,
+                with_staleness({
+                    "message": "Successfully retrieved subgraphs.",
+                    "data": data,
+                    "notFound": not_found,
+                }, engine),
+                response_format if merge else FORMAT_JSON,
+                use_gzip
+                )
+
+        if cursor or page_size_str:
+            page_size = parse_page_size(page_size_str)
+            if page_size is None:
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({
+                        "message": "Invalid page_size. Use an integer "
+                        f"between 1 and {MAX_PAGE_SIZE}."
+                    }),
+                }
+            try:
+                page = router.run_read(
+                    lambda g: get_subgraph_page(
+                        g=g,
+                        node_type=node_type,
+                        node_name=node_name,
+                        level=depth_up,
+                        level_down=depth_down,
+                        cursor=cursor,
+                        page_size=page_size,
+                        sections=sections,
+                        engine=engine
+                        )
+                    )
+            except ValueError as e:
+                return {
+                    "statusCode": 400,
+                    "body": json.dumps({"message": str(e)}),
+                }
+            return encode_response(
+                200,
+                {
+                    "message": "Successfully retrieved subgraph page.",
+                    "data": page["data"],
+                    "cursor": page["cursor"],
+                },
+                response_format,
+                use_gzip
+                )
+
+        if debug == DEBUG_PROFILE:
+            # Sem cache: o subgrafo é consultado e cada travessia é
+            # executada de novo com profile()
+            subgraph = get_subgraph(
+                node_type, node_name, depth_up, depth_down, engine
+                )
+            profile = router.run_read(
+                lambda g: profile_subgraph(
+                    g=g,
+                    node_type=node_type,
+                    subgraph=subgraph,
+                    level=depth_up,
+                    level_down=depth_down,
+                    engine=engine
+                    )
+                )
+            return encode_response(
+                200,
+                {
+                    "message": "Successfully retrieved subgraph.",
+                    "data": {
+                        key: value for key, value in subgraph.items()
+                        if not sections or key in sections
+                    },
+                    "profile": profile,
+                },
+                response_format,
+                use_gzip
+                )
+
+        cache_key = subgraph_cache.key(
+            node_type, node_name, depth_up, depth_down, sections, engine
+            )
+        response = subgraph_cache.get(cache_key)
+        if response is None:
+            subgraph = get_subgraph(
+                node_type, node_name, depth_up, depth_down, engine
+                )
+            response = {
+                key: value for key, value in subgraph.items()
+                if not sections or key in sections
+            }
+            subgraph_cache.put(cache_key, response, collect_ids(subgraph))
+        else:
+            logger.info(f"Subgraph cache hit: {cache_key}")
+    return encode_response(
+        200,
+        with_staleness({
             "message": "Successfully retrieved subgraph.",
             "data": response,
-        }),
-    }
+        }, engine),
+        response_format,
+        use_gzip
+        )
@@ -12,13 +12,21 @@
 # either express or implied. See the License for the specific language governing permissions
 # and limitations under the License.
 
+import json
 import requests
 import os
+import random
 import time
+from requests.adapters import HTTPAdapter
 from neptune_python_utils.endpoints import Endpoints
 
+RETRYABLE_STATUS_CODES = [429, 500, 502, 503, 504]
+RETRYABLE_ERROR_CODES = ['ThrottlingException', 'TooManyRequestsException', 'ServiceUnavailableException', 'MemoryLimitExceededException']
+
 class EventId:
 
+    __slots__ = ('commit_num', 'op_num')
+
     def __init__(self, commit_num=1, op_num=1):
         
         assert (commit_num and commit_num >= 1), 'commit_num must be >= 1.'
@@ -30,6 +38,25 @@ class EventId:
     def to_dict(self):
         return { 'commitNum': self.commit_num, 'opNum': self.op_num}
 
+class NeptuneStreamException(Exception):
+
+    def __init__(self, status_code, text):
+    
+        super().__init__('{}: {}'.format(status_code, text))
+        
+        self.status_code = status_code
+        self.code = None
+        try:
+            self.code = json.loads(text).get('code')
+        except (ValueError, AttributeError):
+            pass
+            
+    def records_not_found(self):
+        return self.code == 'StreamRecordsNotFoundException'
+        
+    def is_retryable(self):
+        return self.status_code in RETRYABLE_STATUS_CODES or self.code in RETRYABLE_ERROR_CODES
+
 class NeptuneStreamToken:
 
     @staticmethod
@@ -61,11 +88,15 @@ class NeptuneStreamToken:
       
 class NeptuneStreamRdfRecord:
 
+    __slots__ = ('json_response',)
+
     def __init__(self, statement):
     
         self.json_response = statement
-        self.statement = statement
         
+    @property
+    def statement(self):
+        return self.json_response
         
     def to_dict(self):
         return {
@@ -77,16 +108,40 @@ class NeptuneStreamRdfRecord:
         
 class NeptuneStreamPropertyGraphRecord:
 
+    # Fields are read from the raw record on access, nothing is copied
+    __slots__ = ('json_response',)
+
     def __init__(self, json):
     
         self.json_response = json
-        self.id = json['id']
-        self.type = json['type']
-        self.key = json['key']
-        self.data_type = json['value']['dataType']
-        self.value = json['value']['value']
-        self.frm = json['from'] if 'from' in json else None
-        self.to = json['to'] if 'to' in json else None
+        
+    @property
+    def id(self):
+        return self.json_response['id']
+        
+    @property
+    def type(self):
+        return self.json_response['type']
+        
+    @property
+    def key(self):
+        return self.json_response['key']
+        
+    @property
+    def data_type(self):
+        return self.json_response['value']['dataType']
+        
+    @property
+    def value(self):
+        return self.json_response['value']['value']
+        
+    @property
+    def frm(self):
+        return self.json_response.get('from')
+        
+    @property
+    def to(self):
+        return self.json_response.get('to')
         
     def to_dict(self):
         d = {
@@ -110,14 +165,37 @@ class NeptuneStreamPropertyGraphRecord:
 
 class NeptuneStreamRecord:
 
+    # Only the raw record is kept; event_id and data are decoded on each
+    # access, so holding many records costs one small object per record
+    __slots__ = ('json_response', 'stream_format')
+
     def __init__(self, json, stream_format):
     
         self.json_response = json
-        self.commit_timestamp = json['commitTimestamp']
-        self.event_id =  EventId(json['eventId']['commitNum'], json['eventId']['opNum'])
-        self.op = json['op']
-        self.is_last_op = json.get('isLastOp', 'false') == 'true'
-        self.data = NeptuneStreamPropertyGraphRecord(json['data']) if stream_format in ['GREMLIN_JSON', 'PG_JSON'] else NeptuneStreamRdfRecord(json['data'])
+        self.stream_format = stream_format
+        
+    @property
+    def commit_timestamp(self):
+        return self.json_response['commitTimestamp']
+        
+    @property
+    def event_id(self):
+        event_id = self.json_response['eventId']
+        return EventId(event_id['commitNum'], event_id['opNum'])
+        
+    @property
+    def op(self):
+        return self.json_response['op']
+        
+    @property
+    def is_last_op(self):
+        return self.json_response.get('isLastOp', 'false') == 'true'
+        
+    @property
+    def data(self):
+        if self.stream_format in ['GREMLIN_JSON', 'PG_JSON']:
+            return NeptuneStreamPropertyGraphRecord(self.json_response['data'])
+        return NeptuneStreamRdfRecord(self.json_response['data'])
         
     def to_dict(self):
         return {
@@ -130,7 +208,68 @@ class NeptuneStreamRecord:
         
     def json(self):
         return self.json_response
-             
+        
+class NeptuneStreamColumns:
+
+    # Property graph records of one page as parallel lists, each one built
+    # from the raw records the first time it is read
+    
+    def __init__(self, records_json, stream_format):
+    
+        self.records_json = records_json
+        self.stream_format = stream_format
+        self.__columns = {}
+        
+    def __len__(self):
+        return len(self.records_json)
+        
+    def __column(self, name, read):
+        column = self.__columns.get(name)
+        if column is None:
+            column = self.__columns[name] = [read(record) for record in self.records_json]
+        return column
+        
+    @property
+    def op(self):
+        return self.__column('op', lambda record: record['op'])
+        
+    @property
+    def commit_num(self):
+        return self.__column('commitNum', lambda record: record['eventId']['commitNum'])
+        
+    @property
+    def op_num(self):
+        return self.__column('opNum', lambda record: record['eventId']['opNum'])
+        
+    @property
+    def id(self):
+        return self.__column('id', lambda record: record['data']['id'])
+        
+    @property
+    def type(self):
+        return self.__column('type', lambda record: record['data']['type'])
+        
+    @property
+    def key(self):
+        return self.__column('key', lambda record: record['data']['key'])
+        
+    @property
+    def value(self):
+        return self.__column('value', lambda record: record['data']['value']['value'])
+        
+    @property
+    def frm(self):
+        return self.__column('from', lambda record: record['data'].get('from'))
+        
+    @property
+    def to(self):
+        return self.__column('to', lambda record: record['data'].get('to'))
+        
+    def event_id(self, index):
+        return EventId(self.commit_num[index], self.op_num[index])
+        
+    def record(self, index):
+        return NeptuneStreamRecord(self.records_json[index], self.stream_format)
 
 class NeptuneStreamResponse:
 
@@ -151,6 +290,9 @@ class NeptuneStreamResponse:
             yield NeptuneStreamRecord(self.records_json[index], self.format)
             index += 1
             
+    def columns(self):
+        return NeptuneStreamColumns(self.records_json, self.format)
+            
     def to_dict(self):
         return {
             'lastEventId': self.last_event_id.to_dict(),
@@ -162,7 +304,7 @@ class NeptuneStreamResponse:
 
 class NeptuneStream:
     
-    def __init__(self, endpoint_type='propertygraph', endpoints=None):
+    def __init__(self, endpoint_type='propertygraph', endpoints=None, pool_size=10, timeout=60, max_retries=5, retry_base_delay=0.1, retry_max_delay=10.0):
     
         assert (endpoint_type and endpoint_type in ['sparql', 'pg', 'propertygraph', 'gremlin']), "endpoint_type must be one of 'sparql', 'pg', 'propertygraph', 'gremlin'."
              
@@ -172,15 +314,35 @@ class NeptuneStream:
             self.endpoints = Endpoints()
         else:
             self.endpoints = endpoints
+            
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.retries = 0
+        
+        # Keep-alive connections shared by every poll
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        self.__endpoint = None
     
     def stream_endpoint(self):
     
-        if self.endpoint_type in ['pg', 'propertygraph']:
-            return self.endpoints.propertygraph_stream_endpoint()
-        elif self.endpoint_type == 'sparql':
-            return self.endpoints.sparql_stream_endpoint()
-        elif self.endpoint_type == 'gremlin':
-            return self.endpoints.gremlin_stream_endpoint()
+        # Built once: creating an endpoint resolves the session credentials
+        if self.__endpoint is None:
+            if self.endpoint_type in ['pg', 'propertygraph']:
+                self.__endpoint = self.endpoints.propertygraph_stream_endpoint()
+            elif self.endpoint_type == 'sparql':
+                self.__endpoint = self.endpoints.sparql_stream_endpoint()
+            elif self.endpoint_type == 'gremlin':
+                self.__endpoint = self.endpoints.gremlin_stream_endpoint()
+        return self.__endpoint
+            
+    def close(self):
+        self.session.close()
             
     def earliest_event_id(self):
         response = self.poll(NeptuneStreamToken.trim_horizon(), limit=1)
@@ -194,8 +356,10 @@ class NeptuneStream:
         try:
             self.latest_event_id()
             return False
-        except:
-            return True
+        except NeptuneStreamException as e:
+            if e.records_not_found():
+                return True
+            raise
             
     def all_records_for_commit(self, commit_num, batch_size=10):
     
@@ -212,25 +376,28 @@ class NeptuneStream:
                 results = self.poll(token=results.token)
                 
                 
-    def __poll_after(self, event_id, batch_size=10, wait=0):
-        while True:
-            try:
-                return self.poll(NeptuneStreamToken.after(event_id), limit=batch_size)
-            except:
-                if wait <= 0:
-                    return None
-                else:
-                    time.sleep(wait)
+    def poll_after(self, event_id, batch_size=10):
         
-    def all_records_after(self, event_id, batch_size=10, wait=0):
+        # No records after event_id: the stream is caught up
+        try:
+            return self.poll(NeptuneStreamToken.after(event_id), limit=batch_size)
+        except NeptuneStreamException as e:
+            if e.records_not_found():
+                return None
+            raise
         
-        results = self.__poll_after(event_id, batch_size, wait)
-        allow_continue = True
+    def all_records_after(self, event_id, batch_size=10, wait=0):
         
-        while results:
+        while True:
+            results = self.poll_after(event_id, batch_size)
+            if results is None or results.total_records == 0:
+                if wait <= 0:
+                    return
+                time.sleep(wait)
+                continue
             for record in results.records():
                 yield record
-            results = self.__poll_after(results.last_event_id, batch_size, wait)
+            event_id = results.last_event_id
                     
             
     def poll(self, token=None, limit=10):
@@ -243,14 +410,31 @@ class NeptuneStream:
         params = token.to_dict()
         params['limit'] = limit
         
-        request_parameters = self.stream_endpoint().prepare_request(querystring=params)
+        endpoint = self.stream_endpoint()
+        attempt = 0
         
-        response = requests.get(self.stream_endpoint().value(), params=params, headers=request_parameters.headers)  
-        response.encoding = 'utf-8'
+        while True:
         
-        if response.status_code != 200:
-            raise Exception('{}: {}'.format(response.status_code, response.text))
+            # Signed again on each attempt, the signature has a timestamp
+            request_parameters = endpoint.prepare_request(querystring=params)
             
-        json_response = response.json()
-        
-        return NeptuneStreamResponse(json_response)
\ No newline at end of file
+            try:
+                response = self.session.get(endpoint.value(), params=params, headers=request_parameters.headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                response.encoding = 'utf-8'
+                if response.status_code == 200:
+                    return NeptuneStreamResponse(response.json())
+                error = NeptuneStreamException(response.status_code, response.text)
+                if not error.is_retryable():
+                    raise error
+                    
+            if attempt >= self.max_retries:
+                raise error
+                
+            # Exponential backoff with full jitter
+            attempt += 1
+            self.retries += 1
+            delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt)
+            time.sleep(random.uniform(0, delay))
@@ -0,0 +1,278 @@
+import logging
+import os
+import threading
+import time
+import boto3
+from neptune_python_utils.gremlin_utils import GremlinUtils, Endpoints
+from neptune_python_utils.batch_utils import reconnectable_err_msgs
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Tempo máximo (s) de vida de uma conexão antes de assinar um novo handshake
+MAX_CONNECTION_AGE = int(os.getenv("NEPTUNE_CONNECTION_MAX_AGE", "3000"))
+# Margem (s) antes da expiração das credenciais para forçar a reconexão
+CREDENTIALS_EXPIRY_MARGIN = 300
+# Intervalo (s) de inatividade a partir do qual a conexão é verificada
+HEALTH_CHECK_INTERVAL = int(os.getenv("NEPTUNE_HEALTH_CHECK_INTERVAL", "60"))
+# Tempo (s) em que um reader com falha fica fora da rotação
+READER_COOLDOWN = int(os.getenv("NEPTUNE_READER_COOLDOWN", "30"))
+# Tamanho do pool de conexões de cada reader (consultas paralelas do
+# data_reader compartilham a mesma conexão)
+READER_POOL_SIZE = int(os.getenv("NEPTUNE_READER_POOL_SIZE", "8"))
+
+
+def is_reconnectable_error(e: Exception) -> bool:
+    if isinstance(e, OSError):
+        return True
+    err_msg = str(e)
+    return any(msg in err_msg for msg in reconnectable_err_msgs)
+
+
+class NeptuneConnectionManager:
+    """Mantém uma única conexão Gremlin aberta por container Lambda.
+
+    A conexão (e o `GremlinUtils` que a cria) é montada na primeira chamada e
+    reaproveitada pelas invocações seguintes enquanto o container estiver
+    quente. Antes de entregar o traversal source a conexão é renovada quando:
+    - atingiu `max_age` segundos ou as credenciais usadas na assinatura SigV4
+      estão próximas de expirar;
+    - ficou ociosa por mais de `health_check_interval` segundos e não
+      respondeu a uma consulta trivial.
+
+    Args:
+    -----
+    neptune_endpoint (str): Endpoint do cluster Neptune.
+    neptune_port (str): Porta do cluster Neptune.
+    pool_size (int): Tamanho do pool de conexões do `DriverRemoteConnection`.
+    max_age (int): Tempo máximo de vida da conexão, em segundos.
+    health_check_interval (int): Tempo de inatividade, em segundos, a partir
+        do qual a conexão é verificada antes do uso.
+    """
+
+    def __init__(
+        self,
+        neptune_endpoint: str,
+        neptune_port: str,
+        pool_size: int = None,
+        max_age: int = MAX_CONNECTION_AGE,
+        health_check_interval: int = HEALTH_CHECK_INTERVAL
+    ):
+        self.neptune_endpoint = neptune_endpoint
+        self.neptune_port = neptune_port
+        self.pool_size = pool_size
+        self.max_age = max_age
+        self.health_check_interval = health_check_interval
+        self._lock = threading.RLock()
+        self._gremlin_utils = None
+        self._conn = None
+        self._g = None
+        self._expires_at = 0.0
+        self._last_used_at = 0.0
+
+    def _get_gremlin_utils(self) -> GremlinUtils:
+        if self._gremlin_utils is None:
+            GremlinUtils.init_statics(globals=globals())
+            endpoints = Endpoints(
+                neptune_endpoint=self.neptune_endpoint,
+                neptune_port=self.neptune_port
+            )
+            self._gremlin_utils = GremlinUtils(endpoints=endpoints)
+        return self._gremlin_utils
+
+    def _credentials_expiry(self) -> float:
+        credentials = boto3.session.Session().get_credentials()
+        expiry_time = getattr(credentials, "_expiry_time", None)
+        if expiry_time is None:
+            return None
+        return expiry_time.timestamp()
+
+    def _connect(self) -> None:
+        self._close()
+        gremlin_utils = self._get_gremlin_utils()
+        logger.info(f"Opening Neptune connection to {self.neptune_endpoint}")
+        self._conn = gremlin_utils.remote_connection(pool_size=self.pool_size)
+        self._g = gremlin_utils.traversal_source(connection=self._conn)
+
+        now = time.time()
+        self._expires_at = now + self.max_age
+        credentials_expiry = self._credentials_expiry()
+        if credentials_expiry is not None:
+            self._expires_at = min(
+                self._expires_at,
+                credentials_expiry - CREDENTIALS_EXPIRY_MARGIN
+            )
+        self._last_used_at = now
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception as e:
+                logger.warning(f"Error closing Neptune connection: {e}")
+            finally:
+                if self._conn in self._gremlin_utils.connections:
+                    self._gremlin_utils.connections.remove(self._conn)
+        self._conn = None
+        self._g = None
+
+    def _is_healthy(self) -> bool:
+        try:
+            self._g.inject(1).next()
+            return True
+        except Exception as e:
+            logger.warning(f"Neptune connection health check failed: {e}")
+            return False
+
+    def traversal_source(self):
+        """Retorna o traversal source da conexão do container, reconectando
+        quando a conexão expirou ou não está saudável."""
+        with self._lock:
+            now = time.time()
+            if self._g is None or now >= self._expires_at:
+                self._connect()
+            elif now - self._last_used_at >= self.health_check_interval \
+                    and not self._is_healthy():
+                self._connect()
+            self._last_used_at = time.time()
+            return self._g
+
+    def reconnect(self):
+        with self._lock:
+            self._connect()
+            return self._g
+
+    def run(self, query, retries: int = 0):
+        """Executa `query(g)`. Quando a falha for um dos erros de conexão em
+        `reconnectable_err_msgs`, a conexão é refeita e a chamada é repetida
+        até `retries` vezes.
+
+        A repetição só é segura para consultas idempotentes: uma escrita
+        pode ter sido confirmada antes da queda da conexão. Sem repetição, a
+        conexão com erro é descartada e refeita na próxima chamada.
+        """
+        g = self.traversal_source()
+        attempt = 0
+        while True:
+            try:
+                return query(g)
+            except Exception as e:
+                if not is_reconnectable_error(e):
+                    raise
+                if attempt >= retries:
+                    self.close()
+                    raise
+                attempt += 1
+                logger.warning(
+                    f"Reconnecting to Neptune after error: {e} "
+                    f"(attempt {attempt})"
+                )
+                g = self.reconnect()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+class NeptuneRouter:
+    """Roteia consultas de leitura para os readers e escritas para o writer.
+
+    Cada endpoint tem o seu próprio `NeptuneConnectionManager`. As leituras
+    são distribuídas em round-robin entre os readers; um reader que falha com
+    erro de conexão sai da rotação por `reader_cooldown` segundos e a consulta
+    é repetida no próximo reader e, por último, no writer.
+
+    Args:
+    -----
+    writer_endpoint (str): Endpoint de escrita do cluster.
+    reader_endpoints (list): Endpoints de leitura (endpoint `cluster-ro` ou
+        endpoints das réplicas). Se vazio, as leituras usam o writer.
+    neptune_port (str): Porta do cluster Neptune.
+    reader_pool_size (int): Tamanho do pool de conexões de cada reader.
+    reader_cooldown (int): Tempo, em segundos, que um reader com falha fica
+        fora da rotação.
+    """
+
+    def __init__(
+        self,
+        writer_endpoint: str,
+        reader_endpoints: list,
+        neptune_port: str,
+        reader_pool_size: int = READER_POOL_SIZE,
+        reader_cooldown: int = READER_COOLDOWN
+    ):
+        self.writer = NeptuneConnectionManager(
+            neptune_endpoint=writer_endpoint,
+            neptune_port=neptune_port
+        )
+        self.readers = [
+            NeptuneConnectionManager(
+                neptune_endpoint=endpoint,
+                neptune_port=neptune_port,
+                pool_size=reader_pool_size
+            )
+            for endpoint in reader_endpoints or []
+        ]
+        self.reader_cooldown = reader_cooldown
+        self._lock = threading.Lock()
+        self._next_reader = 0
+        self._unhealthy_until = {}
+
+    @classmethod
+    def from_env(cls, writer_endpoint: str, reader_endpoints: str,
+                 neptune_port: str) -> "NeptuneRouter":
+        readers = [
+            endpoint.strip()
+            for endpoint in (reader_endpoints or "").split(",")
+            if endpoint.strip()
+        ]
+        return cls(
+            writer_endpoint=writer_endpoint,
+            reader_endpoints=readers,
+            neptune_port=neptune_port
+        )
+
+    def _read_candidates(self) -> list:
+        now = time.time()
+        with self._lock:
+            start = self._next_reader
+            if self.readers:
+                self._next_reader = (start + 1) % len(self.readers)
+        ordered = self.readers[start:] + self.readers[:start]
+        healthy = [
+            reader for reader in ordered
+            if self._unhealthy_until.get(reader, 0) <= now
+        ]
+        return healthy + [self.writer]
+
+    def _mark_unhealthy(self, reader: NeptuneConnectionManager) -> None:
+        logger.warning(
+            f"Reader {reader.neptune_endpoint} is unhealthy, "
+            f"removing it from rotation for {self.reader_cooldown}s"
+        )
+        self._unhealthy_until[reader] = time.time() + self.reader_cooldown
+        reader.close()
+
+    def run_read(self, query):
+        """Executa `query(g)` em um reader saudável, com failover para os
+        demais readers e, por fim, para o writer."""
+        candidates = self._read_candidates()
+        for manager in candidates[:-1]:
+            try:
+                return manager.run(query, retries=1)
+            except Exception as e:
+                if not is_reconnectable_error(e):
+                    raise
+                self._mark_unhealthy(manager)
+        return self.writer.run(query, retries=1)
+
+    def run_write(self, query, idempotent: bool = False):
+        """Executa `query(g)` no writer. A escrita só é repetida após um erro
+        de conexão quando `idempotent` é verdadeiro; caso contrário o erro é
+        propagado, pois a primeira tentativa pode ter sido confirmada."""
+        return self.writer.run(query, retries=1 if idempotent else 0)
+
+    def close(self) -> None:
+        self.writer.close()
+        for reader in self.readers:
+            reader.close()
@@ -1,7 +1,27 @@
 VERTEX_LABEL_JOB = "JOB"
+VERTEX_LABEL_JOB_RUN = "JOB_RUN"
+VERTEX_LABEL_EXECUTION_PLAN = "EXECUTION_PLAN"
 VERTEX_LABEL_TABLE = "TABLE"
 VERTEX_LABEL_FEATURE = "FEATURE"
 VERTEX_LABEL_MODEL = "MODEL"
 VERTEX_LABEL_DATASET = "DATASET"
 VERTEX_LABEL_ANALYSIS = "ANALYSIS"
 VERTEX_LABEL_DASHBOARD = "DASHBOARD"
+
+# Arestas derivadas da execução mais recente de cada job
+EDGE_LATEST_PRODUCES = "latest_produces"
+EDGE_LATEST_CONSUMED_BY = "latest_consumed_by"
+
+# Profundidade padrão e máxima das buscas ascendente e descendente
+DEFAULT_DEPTH = 50
+MAX_DEPTH = 100
+
+# Número máximo de nós por requisição no modo em lote
+MAX_BATCH_NODES = 500
+
+ENGINE_DEFAULT = "default"
+ENGINE_SINGLE_TRIP = "single_trip"
+ENGINE_BFS = "bfs"
+ENGINE_SHORTCUT = "shortcut"
+ENGINE_SNAPSHOT = "snapshot"
+ENGINE_CLOSURE = "closure"
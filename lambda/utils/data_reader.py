@@ -1,23 +1,45 @@
+import asyncio
 import logging
-from concurrent.futures import ThreadPoolExecutor
+import os
+import time
 from gremlin_python.process.traversal import T, P, Order
-from gremlin_python.process.graph_traversal import __
+from gremlin_python.process.graph_traversal import __, GraphTraversal
 from neptune_python_utils.gremlin_utils import GremlinUtils
 from utils.project_properties import project_job, project_table
+from utils import query_metrics
+from utils.query_metrics import measured
+from utils.name_index import start_vertices
 from utils.constants import (
     VERTEX_LABEL_JOB,
+    VERTEX_LABEL_JOB_RUN,
+    VERTEX_LABEL_EXECUTION_PLAN,
     VERTEX_LABEL_TABLE,
     VERTEX_LABEL_FEATURE,
     VERTEX_LABEL_MODEL,
     VERTEX_LABEL_DATASET,
     VERTEX_LABEL_ANALYSIS,
-    VERTEX_LABEL_DASHBOARD
+    VERTEX_LABEL_DASHBOARD,
+    EDGE_LATEST_PRODUCES,
+    EDGE_LATEST_CONSUMED_BY
 )
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Filtro aplicado por `visit_once` a cada salto dos `repeat()`:
+# - dedup: um traverser por vértice em cada nível (padrão);
+# - visited: descarta os vértices de níveis anteriores, sem o `dedup()`;
+# - paths: sem filtro, um traverser por caminho até o `dedup()` final.
+# Lido na montagem das travessias, para comparar os modos
+# (`benchmarks/traverser_dedup.py`)
+VISIT_MODE_DEDUP = "dedup"
+VISIT_MODE_VISITED = "visited"
+VISIT_MODE_PATHS = "paths"
+VISIT_MODES = (VISIT_MODE_DEDUP, VISIT_MODE_VISITED, VISIT_MODE_PATHS)
+VISIT_MODE = os.getenv("LINEAGE_VISIT_MODE", VISIT_MODE_DEDUP)
 
+
+@measured()
 def get_node(g: GremlinUtils, node_type: str, node_name: str) -> list:
     logger.info("Getting node")
     return g.V().has(node_type, "table_name", node_name) \
@@ -25,6 +47,19 @@ def get_node(g: GremlinUtils, node_type: str, node_name: str) -> list:
             .by(T.id).by("table_name").toList()
 
 
+@measured()
+def get_owner_jobs(g: GremlinUtils, ids: list) -> list:
+    """Retorna os IDs dos JOBs donos dos JOB_RUNs e EXECUTION_PLANs
+    informados. Usado para mapear alterações nesses vértices, que não
+    aparecem nos subgrafos, para os JOBs afetados."""
+    if not ids:
+        return []
+    return g.V(*ids).union(
+        __.hasLabel(VERTEX_LABEL_JOB_RUN).in_("schedule"),
+        __.hasLabel(VERTEX_LABEL_EXECUTION_PLAN).in_("has").in_("schedule")
+    ).hasLabel(VERTEX_LABEL_JOB).id_().dedup().toList()
+
+
 def get_edge_projections():
     """Retorna as projeções de arestas entre JOB e TABLE.
 
@@ -236,37 +271,46 @@ def desc_path_job():
             .inE("schedule").outV()
 
 
-def get_nodes_until_models(
+def visit_once(step, visited: str = "visited", mode: str = None):
+    """Restringe um salto de `repeat` aos vértices ainda não visitados.
+
+    Os vértices alcançados são acumulados no side-effect `visited`, que deve
+    ser iniciado com os vértices de partida (`aggregate(visited)` antes do
+    `repeat`). Assim nenhum vértice é revisitado, ciclos na linhagem não
+    multiplicam os traversers e o `repeat` termina assim que a fronteira
+    fica vazia, antes de `times(level)` quando o grafo é mais raso. Como
+    `aggregate` é uma barreira, cada iteração processa um nível inteiro e o
+    limite de profundidade continua exato.
+
+    O `dedup` antes da barreira colapsa os traversers que chegam ao mesmo
+    vértice no mesmo nível (losangos: vários jobs lendo e escrevendo as
+    mesmas tabelas, várias execuções do mesmo job), de forma que cada nível
+    carrega um traverser por vértice e não um por caminho.
+
+    Travessias com mais de um `repeat` precisam de um `visited` por
+    `repeat`, já que os side-effects são compartilhados por toda a
+    travessia.
+
+    `mode` (por padrão, `VISIT_MODE`) seleciona o filtro, para comparar o
+    número de traversers de cada modo: sem o `dedup` (`visited`) ou sem
+    filtro algum (`paths`, que depende de `times(level)` para terminar em
+    ciclos).
+    """
+    mode = mode or VISIT_MODE
+    if mode == VISIT_MODE_PATHS:
+        return step
+    step = step.where(P.without(visited))
+    if mode == VISIT_MODE_DEDUP:
+        step = step.dedup()
+    return step.aggregate(visited)
+
+
+def nodes_until_models(
         g: GremlinUtils,
         table_ids: list
         ) -> tuple:
-    """Retorna os nós e arestas de features e modelos associados a tabelas.
-    Esta função consulta o grafo para obter nós e arestas relacionados a
-    features e modelos associados a tabelas específicas, identificadas por seus
-    IDs. Ela utiliza a biblioteca Gremlin para realizar consultas em grafos e
-    retorna uma tupla contendo três listas:
-    - features: lista de dicionários representando as features.
-    - models: lista de dicionários representando os modelos.
-    - edges: lista de dicionários representando as arestas entre features e
-      modelos, onde cada aresta contém os campos "from" e "to" representando
-      os IDs dos vértices de origem e destino, respectivamente.
-    Args:
-    -----
-    g (GremlinUtils): Instância da classe GremlinUtils para realizar
-        consultas em grafos.
-    table_ids (list): Lista de IDs de tabelas para as quais as features e
-        modelos associados serão recuperados.
-
-    Returns:
-    -------
-    tuple: Uma tupla contendo três listas:
-        - features: Lista de dicionários representando as features.
-        - models: Lista de dicionários representando os modelos.
-        - edges: Lista de dicionários representando as arestas entre features e
-          modelos, onde cada aresta contém os campos "from" e "to"
-          representando os IDs dos vértices de origem e destino,
-          respectivamente.
-    """
+    """Consultas (nós e arestas) de `get_nodes_until_models`, sem
+    executá-las."""
     nodes = g.V().hasLabel(VERTEX_LABEL_TABLE) \
         .has(T.id, P.within(table_ids)).as_("table").union(
         __.out("belongs_to_table").hasLabel(VERTEX_LABEL_FEATURE),
@@ -282,7 +326,7 @@ def get_nodes_until_models(
             .by(T.id)
             .by(T.label)
             .by("model_name")
-    ).toList()
+    )
 
     edges = g.V().hasLabel(VERTEX_LABEL_TABLE) \
         .has(T.id, P.within(table_ids)).as_("table") \
@@ -302,8 +346,13 @@ def get_nodes_until_models(
             .project("from", "to")
             .by(__.select("feature").id_())
             .by(__.select("model").id_())
-        ).toList()
+        )
 
+    return nodes, edges
+
+
+def split_models(nodes: list, edges: list) -> tuple:
+    """Separa features e modelos dos resultados de `nodes_until_models`."""
     features = [
         item for item in nodes if item['label'] == 'FEATURE'
     ]
@@ -314,41 +363,48 @@ def get_nodes_until_models(
     return features, models, edges
 
 
-def get_nodes_until_dashboards(
+@measured()
+def get_nodes_until_models(
         g: GremlinUtils,
         table_ids: list
         ) -> tuple:
-    """Retorna os nós e arestas de datasets, análises e dashboards
-    associados a tabelas. Esta função consulta o grafo para obter
-    nós e arestas relacionados a datasets, análises e dashboards
-    associados a tabelas específicas, identificadas por seus IDs. Ela
-    utiliza a biblioteca Gremlin para realizar consultas em grafos e
+    """Retorna os nós e arestas de features e modelos associados a tabelas.
+    Esta função consulta o grafo para obter nós e arestas relacionados a
+    features e modelos associados a tabelas específicas, identificadas por seus
+    IDs. Ela utiliza a biblioteca Gremlin para realizar consultas em grafos e
     retorna uma tupla contendo três listas:
-    - datasets: lista de dicionários representando os datasets.
-    - analyses: lista de dicionários representando as análises.
-    - dashboards: lista de dicionários representando os dashboards.
-    - edges: lista de dicionários representando as arestas entre datasets,
-      análises e dashboards, onde cada aresta contém os campos "from" e "to"
-      representando os IDs dos vértices de origem e destino, respectivamente.
-
+    - features: lista de dicionários representando as features.
+    - models: lista de dicionários representando os modelos.
+    - edges: lista de dicionários representando as arestas entre features e
+      modelos, onde cada aresta contém os campos "from" e "to" representando
+      os IDs dos vértices de origem e destino, respectivamente.
     Args:
     -----
     g (GremlinUtils): Instância da classe GremlinUtils para realizar
         consultas em grafos.
-    table_ids (list): Lista de IDs de tabelas para as quais os datasets,
-        análises e dashboards associados serão recuperados.
+    table_ids (list): Lista de IDs de tabelas para as quais as features e
+        modelos associados serão recuperados.
 
     Returns:
     -------
-    tuple: Uma tupla contendo quatro listas:
-        - datasets: Lista de dicionários representando os datasets.
-        - analyses: Lista de dicionários representando as análises.
-        - dashboards: Lista de dicionários representando os dashboards.
-        - edges: Lista de dicionários representando as arestas entre datasets,
-          análises e dashboards, onde cada aresta contém os campos "from"
-          e "to" representando os IDs dos vértices de origem e destino,
+    tuple: Uma tupla contendo três listas:
+        - features: Lista de dicionários representando as features.
+        - models: Lista de dicionários representando os modelos.
+        - edges: Lista de dicionários representando as arestas entre features e
+          modelos, onde cada aresta contém os campos "from" e "to"
+          representando os IDs dos vértices de origem e destino,
           respectivamente.
     """
+    nodes, edges = nodes_until_models(g, table_ids)
+    return split_models(nodes.toList(), edges.toList())
+
+
+def nodes_until_dashboards(
+        g: GremlinUtils,
+        table_ids: list
+        ) -> tuple:
+    """Consultas (nós e arestas) de `get_nodes_until_dashboards`, sem
+    executá-las."""
     nodes = g.V().hasLabel(VERTEX_LABEL_TABLE) \
         .has(T.id, P.within(table_ids)) \
         .union(
@@ -375,7 +431,7 @@ def get_nodes_until_dashboards(
                 .by(T.label)
                 .by("dashboard_name")
             )
-        ).toList()
+        )
 
     edges = g.V().hasLabel(VERTEX_LABEL_TABLE) \
         .has(T.id, P.within(table_ids)).as_("table") \
@@ -406,8 +462,14 @@ def get_nodes_until_dashboards(
             .project("from", "to")
             .by(__.select("analysis").id_())
             .by(__.select("dashboard").id_())
-        ).toList()
+        )
+
+    return nodes, edges
 
+
+def split_dashboards(nodes: list, edges: list) -> tuple:
+    """Separa datasets, análises e dashboards dos resultados de
+    `nodes_until_dashboards`."""
     datasets = [
         item for item in nodes if item['label'] == 'DATASET'
     ]
@@ -421,11 +483,51 @@ def get_nodes_until_dashboards(
     return datasets, analyses, dashboards, edges
 
 
-def get_ascendant_nodes_from_job(
+@measured()
+def get_nodes_until_dashboards(
+        g: GremlinUtils,
+        table_ids: list
+        ) -> tuple:
+    """Retorna os nós e arestas de datasets, análises e dashboards
+    associados a tabelas. Esta função consulta o grafo para obter
+    nós e arestas relacionados a datasets, análises e dashboards
+    associados a tabelas específicas, identificadas por seus IDs. Ela
+    utiliza a biblioteca Gremlin para realizar consultas em grafos e
+    retorna uma tupla contendo três listas:
+    - datasets: lista de dicionários representando os datasets.
+    - analyses: lista de dicionários representando as análises.
+    - dashboards: lista de dicionários representando os dashboards.
+    - edges: lista de dicionários representando as arestas entre datasets,
+      análises e dashboards, onde cada aresta contém os campos "from" e "to"
+      representando os IDs dos vértices de origem e destino, respectivamente.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    table_ids (list): Lista de IDs de tabelas para as quais os datasets,
+        análises e dashboards associados serão recuperados.
+
+    Returns:
+    -------
+    tuple: Uma tupla contendo quatro listas:
+        - datasets: Lista de dicionários representando os datasets.
+        - analyses: Lista de dicionários representando as análises.
+        - dashboards: Lista de dicionários representando os dashboards.
+        - edges: Lista de dicionários representando as arestas entre datasets,
+          análises e dashboards, onde cada aresta contém os campos "from"
+          e "to" representando os IDs dos vértices de origem e destino,
+          respectivamente.
+    """
+    nodes, edges = nodes_until_dashboards(g, table_ids)
+    return split_dashboards(nodes.toList(), edges.toList())
+
+
+def ascendant_nodes_from_job(
         g: GremlinUtils,
         jobs_ids: list,
         level: int = 10
-        ) -> list:
+        ) -> GraphTraversal:
     """
     """
     return g.V().hasLabel(VERTEX_LABEL_JOB) \
@@ -442,7 +544,8 @@ def get_ascendant_nodes_from_job(
                 .in_("consumed_by")
             ),
             # Caminho dos descendentes
-            __.repeat(
+            __.aggregate("visited")
+            .repeat(visit_once(
                 __.local(
                     __.out("schedule")
                     .order().by("dt_update", Order.desc)
@@ -453,7 +556,7 @@ def get_ascendant_nodes_from_job(
                 .inE("produce").outV()
                 .inE("has").outV()
                 .inE("schedule").outV()
-            ).emit().times(level)
+            )).emit().times(level)
              .dedup()
              .union(
                 __.choose(
@@ -472,14 +575,23 @@ def get_ascendant_nodes_from_job(
                     project_table(__.identity())
                 )
              ).dedup()
-        ).dedup().toList()
+        ).dedup()
 
 
-def get_descendant_nodes_from_job(
+@measured()
+def get_ascendant_nodes_from_job(
         g: GremlinUtils,
         jobs_ids: list,
         level: int = 10
         ) -> list:
+    return ascendant_nodes_from_job(g, jobs_ids, level).toList()
+
+
+def descendant_nodes_from_job(
+        g: GremlinUtils,
+        jobs_ids: list,
+        level: int = 10
+        ) -> GraphTraversal:
     return g.V().hasLabel(VERTEX_LABEL_JOB) \
         .has(T.id, P.within(jobs_ids)).as_("start") \
         .union(
@@ -494,7 +606,8 @@ def get_descendant_nodes_from_job(
                 .out("produce")
             ),
             # Caminho dos descendentes
-            __.repeat(
+            __.aggregate("visited")
+            .repeat(visit_once(
                 __.local(
                     __.out("schedule")
                     .order().by("dt_update", Order.desc)
@@ -515,7 +628,7 @@ def get_descendant_nodes_from_job(
                     .in_("consumed_by")
                     .where(P.eq("current_table"))
                 )
-            ).emit().times(level)
+            )).emit().times(level)
              .dedup()
              .union(
                 __.choose(
@@ -534,17 +647,27 @@ def get_descendant_nodes_from_job(
                     project_table(__.identity())
                 )
              ).dedup()
-        ).dedup().toList()
+        ).dedup()
 
 
-def get_ascendant_nodes_from_table(
+@measured()
+def get_descendant_nodes_from_job(
         g: GremlinUtils,
-        tables_ids: list,
+        jobs_ids: list,
         level: int = 10
         ) -> list:
+    return descendant_nodes_from_job(g, jobs_ids, level).toList()
+
+
+def ascendant_nodes_from_table(
+        g: GremlinUtils,
+        tables_ids: list,
+        level: int = 10
+        ) -> GraphTraversal:
     return g.V().hasLabel(VERTEX_LABEL_TABLE) \
         .has(T.id, P.within(tables_ids)) \
-        .repeat(
+        .aggregate("visited") \
+        .repeat(visit_once(
                 __.as_("current_table")
                 .inE("produce").outV()
                 .inE("has").outV()
@@ -565,7 +688,7 @@ def get_ascendant_nodes_from_table(
                     .limit(1)
                 )
                 .out("has").in_("consumed_by")
-            ).emit().times(level) \
+            )).emit().times(level) \
              .dedup() \
              .union(
                  __.choose(
@@ -590,14 +713,23 @@ def get_ascendant_nodes_from_table(
                        __.hasLabel(VERTEX_LABEL_JOB),
                        project_job(__.identity())
                    )
-             ).dedup().toList()
+             ).dedup()
 
 
-def get_descendant_nodes_from_table(
+@measured()
+def get_ascendant_nodes_from_table(
         g: GremlinUtils,
         tables_ids: list,
         level: int = 10
         ) -> list:
+    return ascendant_nodes_from_table(g, tables_ids, level).toList()
+
+
+def descendant_nodes_from_table(
+        g: GremlinUtils,
+        tables_ids: list,
+        level: int = 10
+        ) -> GraphTraversal:
     return g.V().hasLabel(VERTEX_LABEL_TABLE) \
         .has(T.id, P.within(tables_ids)).as_("start") \
         .union(
@@ -619,7 +751,8 @@ def get_descendant_nodes_from_table(
                 )
             ),
             # Caminho dos descendentes
-            __.repeat(
+            __.aggregate("visited")
+            .repeat(visit_once(
                 __.as_("current_table")
                 .outE("consumed_by").inV()
                 .inE("has").outV()
@@ -641,7 +774,7 @@ def get_descendant_nodes_from_table(
                 )
                 .out("has")
                 .out("produce")
-            ).emit().times(level)
+            )).emit().times(level)
              .dedup()
              .union(
                  __.choose(
@@ -667,50 +800,213 @@ def get_descendant_nodes_from_table(
                     project_job(__.identity())
                    )
              ).dedup()
-        ).dedup().toList()
+        ).dedup()
 
 
-def get_edges_from_job(
+@measured()
+def get_descendant_nodes_from_table(
         g: GremlinUtils,
-        jobs_ids: list,
+        tables_ids: list,
         level: int = 10
         ) -> list:
+    return descendant_nodes_from_table(g, tables_ids, level).toList()
+
+
+def edges_from_job(
+        g: GremlinUtils,
+        jobs_ids: list,
+        level: int = 10,
+        level_down: int = None
+        ) -> GraphTraversal:
+    if level_down is None:
+        level_down = level
     return g.V().hasLabel(VERTEX_LABEL_JOB) \
         .has(T.id, P.within(jobs_ids)).as_("job") \
         .union(
             # ascendant edges
             get_edge_projections(),
-            __.repeat(asc_path_job()).emit().times(level).as_("job")
+            __.aggregate("visited_up")
+            .repeat(visit_once(asc_path_job(), "visited_up"))
+            .emit().times(level).as_("job")
             .union(get_edge_projections()),
             # descendant edges
-            __.repeat(desc_path_job()).emit().times(level).as_("job")
+            __.aggregate("visited_down")
+            .repeat(visit_once(desc_path_job(), "visited_down"))
+            .emit().times(level_down).as_("job")
             .union(get_edge_projections())
         ) \
-        .dedup().toList()
+        .dedup()
 
 
-def get_edges_from_table(
+@measured()
+def get_edges_from_job(
         g: GremlinUtils,
-        tables_ids: list,
-        level: int = 10
+        jobs_ids: list,
+        level: int = 10,
+        level_down: int = None
         ) -> list:
+    return edges_from_job(g, jobs_ids, level, level_down).toList()
+
+
+def edges_from_table(
+        g: GremlinUtils,
+        tables_ids: list,
+        level: int = 10,
+        level_down: int = None
+        ) -> GraphTraversal:
+    if level_down is None:
+        level_down = level
     return g.V().hasLabel(VERTEX_LABEL_TABLE) \
         .has(T.id, P.within(tables_ids)).as_("table") \
         .union(
             get_edge_projections_from_table(),
-            __.repeat(asc_path_table()).emit().times(level)
+            __.aggregate("visited_up")
+            .repeat(visit_once(asc_path_table(), "visited_up"))
+            .emit().times(level)
             .as_("table")
             .union(get_edge_projections_from_table()),
-            __.repeat(desc_path_table()).emit().times(level)
+            __.aggregate("visited_down")
+            .repeat(visit_once(desc_path_table(), "visited_down"))
+            .emit().times(level_down)
             .as_("table")
             .union(get_edge_projections_from_table())
-        ).dedup().toList()
+        ).dedup()
+
+
+@measured()
+def get_edges_from_table(
+        g: GremlinUtils,
+        tables_ids: list,
+        level: int = 10,
+        level_down: int = None
+        ) -> list:
+    return edges_from_table(g, tables_ids, level, level_down).toList()
+
+
+def filter_edges(edges: list, nodes: list) -> list:
+    """Mantém apenas as arestas cujos dois vértices estão em `nodes`."""
+    valid_ids = set()
+    for node in nodes:
+        valid_ids.add(node["id"])
+
+    return [
+        edge for edge in edges
+        if isinstance(edge, dict) and
+        edge.get("from") in valid_ids and
+        edge.get("to") in valid_ids
+    ]
+
+
+def build_job_subgraph(
+        job_select: list,
+        ascendant: list,
+        descendant: list,
+        features: list,
+        models: list,
+        datasets: list,
+        analyses: list,
+        dashboards: list,
+        raw_edges: list
+        ) -> dict:
+    """Monta a resposta de `get_subgraph_of_the_job` a partir dos nós e
+    arestas já consultados, separando jobs e tabelas ascendentes e
+    descendentes e descartando arestas para nós fora do subgrafo."""
+    job_id = job_select[0]["id"] if job_select else None
+
+    edges = filter_edges(
+        raw_edges,
+        job_select + ascendant + descendant + features + models +
+        datasets + analyses + dashboards
+    )
+
+    ascendant_jobs = [
+        item for item in ascendant
+        if item['label'] == VERTEX_LABEL_JOB and item['id'] != job_id
+    ]
+    ascendant_tables = [
+        item for item in ascendant if item['label'] == VERTEX_LABEL_TABLE
+    ]
+    descendant_jobs = [
+        item for item in descendant
+        if item['label'] == VERTEX_LABEL_JOB and item['id'] != job_id
+    ]
+    descendant_tables = [
+        item for item in descendant if item['label'] == VERTEX_LABEL_TABLE
+    ]
+
+    return {
+        "job": job_select[0] if job_select else {},
+        "ascendantJobs": ascendant_jobs,
+        "ascendantTables": ascendant_tables,
+        "descendantJobs": descendant_jobs,
+        "descendantTables": descendant_tables,
+        "features": features,
+        "models": models,
+        "datasets": datasets,
+        "analyses": analyses,
+        "dashboards": dashboards,
+        "edges": edges
+    }
+
+
+def build_table_subgraph(
+        table_select: list,
+        source_job: list,
+        ascendant: list,
+        descendant: list,
+        features: list,
+        models: list,
+        datasets: list,
+        analyses: list,
+        dashboards: list,
+        raw_edges: list
+        ) -> dict:
+    """Monta a resposta de `get_subgraph_of_the_table` a partir dos nós e
+    arestas já consultados, separando jobs e tabelas ascendentes e
+    descendentes e descartando arestas para nós fora do subgrafo."""
+    table_id = table_select[0]["id"] if table_select else None
+
+    edges = filter_edges(
+        raw_edges,
+        table_select + ascendant + descendant + source_job + features +
+        models + datasets + analyses + dashboards
+    )
+
+    ascendant_jobs = [
+        item for item in ascendant if item['label'] == VERTEX_LABEL_JOB
+    ]
+    ascendant_tables = [
+        item for item in ascendant
+        if item['label'] == VERTEX_LABEL_TABLE and item["id"] != table_id
+    ]
+    descendant_jobs = [
+        item for item in descendant if item['label'] == VERTEX_LABEL_JOB
+    ]
+    descendant_tables = [
+        item for item in descendant
+        if item['label'] == VERTEX_LABEL_TABLE and item["id"] != table_id
+    ]
+    return {
+        "table": table_select[0] if table_select else {},
+        "sourceJob": source_job,
+        "ascendantJobs": ascendant_jobs,
+        "ascendantTables": ascendant_tables,
+        "descendantJobs": descendant_jobs,
+        "descendantTables": descendant_tables,
+        "features": features,
+        "models": models,
+        "datasets": datasets,
+        "analyses": analyses,
+        "dashboards": dashboards,
+        "edges": edges
+    }
 
 
 def get_subgraph_of_the_job(
         g: GremlinUtils,
         jobId: str,
-        level: int = 10
+        level: int = 10,
+        level_down: int = None
         ) -> list:
     """Retorna o subgrafo de um job específico.
     Esta função consulta o grafo para obter informações sobre um job
@@ -748,6 +1044,8 @@ def get_subgraph_of_the_job(
     level (int): Nível de profundidade para a busca de nós ascendentes e
         descendentes. O padrão é 10, o que significa que a busca irá até
         10 níveis acima e abaixo do job.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
 
     Returns:
     -------
@@ -756,89 +1054,16 @@ def get_subgraph_of_the_job(
         ascendentes e descendentes, tabelas ascendentes e descendentes,
         features, modelos, datasets, análises, dashboards e arestas.
     """
-    job_select = project_job(
-        g.V().has(VERTEX_LABEL_JOB, "name", jobId)
-        ).dedup().toList()
-
-    job_id = job_select[0]["id"] if job_select else None
-
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        future_asc = executor.submit(
-            get_ascendant_nodes_from_job, g, [job_id], level
-            )
-        future_desc = executor.submit(
-            get_descendant_nodes_from_job, g, [job_id], level
-            )
-        future_edges = executor.submit(
-            get_edges_from_job, g, [job_id], level
-            )
-
-        # Coletando os resultados
-        ascendant = future_asc.result()
-        descendant = future_desc.result()
-        raw_edges = future_edges.result()
-
-    tables_ids = [
-        node["id"] for node in descendant if node['label'] == VERTEX_LABEL_TABLE
-    ]
-
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        future_models = executor.submit(
-            get_nodes_until_models, g, tables_ids
-            )
-        future_dashboards = executor.submit(
-            get_nodes_until_dashboards, g, tables_ids
-            )
-
-        features, models, edges2 = future_models.result()
-        datasets, analyses, dashboards, edges3 = future_dashboards.result()
-
-    valid_ids = set()
-    for node in job_select + ascendant + descendant + features + \
-            models + datasets + analyses + dashboards:
-        valid_ids.add(node["id"])
-
-    edges = [
-        edge for edge in raw_edges + edges2 + edges3
-        if isinstance(edge, dict) and
-        edge.get("from") in valid_ids and
-        edge.get("to") in valid_ids
-    ]
-
-    ascendant_jobs = [
-        item for item in ascendant
-        if item['label'] == VERTEX_LABEL_JOB and item['id'] != job_id
-    ]
-    ascendant_tables = [
-        item for item in ascendant if item['label'] == VERTEX_LABEL_TABLE
-    ]
-    descendant_jobs = [
-        item for item in descendant
-        if item['label'] == VERTEX_LABEL_JOB and item['id'] != job_id
-    ]
-    descendant_tables = [
-        item for item in descendant if item['label'] == VERTEX_LABEL_TABLE
-    ]
-
-    return {
-        "job": job_select[0] if job_select else {},
-        "ascendantJobs": ascendant_jobs,
-        "ascendantTables": ascendant_tables,
-        "descendantJobs": descendant_jobs,
-        "descendantTables": descendant_tables,
-        "features": features,
-        "models": models,
-        "datasets": datasets,
-        "analyses": analyses,
-        "dashboards": dashboards,
-        "edges": edges
-    }
+    return asyncio.run(
+        get_subgraph_of_the_job_async(g, jobId, level, level_down)
+        )
 
 
 def get_subgraph_of_the_table(
         g: GremlinUtils,
         tableId: str,
-        level: int = 10
+        level: int = 10,
+        level_down: int = None
         ) -> list:
     """Retorna o subgrafo de uma tabela específica.
     Esta função consulta o grafo para obter informações sobre uma tabela
@@ -878,6 +1103,8 @@ def get_subgraph_of_the_table(
     level (int): Nível de profundidade para a busca de nós ascendentes e
         descendentes. O padrão é 10, o que significa que a busca irá até
         10 níveis acima e abaixo da tabela.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
 
     Returns:
     -------
@@ -886,89 +1113,1437 @@ def get_subgraph_of_the_table(
         ascendentes e descendentes, tabelas ascendentes e descendentes,
         features, modelos, datasets, análises, dashboards e arestas.
     """
-    table_select = project_table(
-        g.V().has(VERTEX_LABEL_TABLE, "table_name", tableId)
-        ).dedup().toList()
+    return asyncio.run(
+        get_subgraph_of_the_table_async(g, tableId, level, level_down)
+        )
+
+
+async def fetch(
+        traversal: GraphTraversal,
+        name: str = "query",
+        depth: dict = None
+        ) -> list:
+    """Submete a travessia de forma assíncrona pelo driver e aguarda o
+    resultado sem bloquear o event loop. As respostas são lidas pelo pool
+    da própria conexão, sem criar threads por requisição. Com medição
+    ativa, a consulta é registrada como `name`."""
+    if not query_metrics.is_active():
+        return await asyncio.wrap_future(
+            traversal.promise(lambda result: result.toList())
+            )
+    started_at = time.perf_counter()
+    result = await asyncio.wrap_future(
+        traversal.promise(lambda result: result.toList())
+        )
+    query_metrics.record(name, started_at, result, depth)
+    return result
+
+
+async def fetch_attached_nodes(g: GremlinUtils, tables_ids: list) -> tuple:
+    """Versão assíncrona de `get_nodes_until_models` e
+    `get_nodes_until_dashboards`, com as quatro consultas em paralelo."""
+    models_nodes, models_edges = nodes_until_models(g, tables_ids)
+    dashboards_nodes, dashboards_edges = \
+        nodes_until_dashboards(g, tables_ids)
+    results = await asyncio.gather(
+        fetch(models_nodes, "nodes_until_models"),
+        fetch(models_edges, "edges_until_models"),
+        fetch(dashboards_nodes, "nodes_until_dashboards"),
+        fetch(dashboards_edges, "edges_until_dashboards")
+        )
+    features, models, edges2 = split_models(results[0], results[1])
+    datasets, analyses, dashboards, edges3 = \
+        split_dashboards(results[2], results[3])
+    return features, models, datasets, analyses, dashboards, edges2 + edges3
+
+
+async def get_subgraph_of_the_job_async(
+        g: GremlinUtils,
+        jobId: str,
+        level: int = 10,
+        level_down: int = None
+        ) -> dict:
+    """Versão assíncrona de `get_subgraph_of_the_job`.
+
+    As dependências entre as etapas são explícitas: ascendentes,
+    descendentes e arestas dependem apenas do job e rodam em paralelo; os
+    nós ligados às tabelas descendentes (features, modelos, datasets,
+    análises e dashboards) começam assim que os descendentes chegam, sem
+    esperar pelas arestas.
+    """
+    if level_down is None:
+        level_down = level
+    start = start_vertices(g, VERTEX_LABEL_JOB, [jobId])
+    if start is None:
+        return build_job_subgraph([], [], [], [], [], [], [], [], [])
+    job_select = await fetch(project_job(start).dedup(), "job")
+
+    job_id = job_select[0]["id"] if job_select else None
+
+    async def descendant_stage() -> tuple:
+        descendant = await fetch(
+            descendant_nodes_from_job(g, [job_id], level_down),
+            "descendant_nodes_from_job", {"level": level_down}
+            )
+        tables_ids = [
+            node["id"] for node in descendant
+            if node['label'] == VERTEX_LABEL_TABLE
+        ]
+        return descendant, await fetch_attached_nodes(g, tables_ids)
+
+    ascendant, (descendant, attached), raw_edges = await asyncio.gather(
+        fetch(ascendant_nodes_from_job(g, [job_id], level),
+              "ascendant_nodes_from_job", {"level": level}),
+        descendant_stage(),
+        fetch(edges_from_job(g, [job_id], level, level_down),
+              "edges_from_job", {"level": level, "level_down": level_down})
+        )
+    features, models, datasets, analyses, dashboards, attached_edges = \
+        attached
+
+    return build_job_subgraph(
+        job_select, ascendant, descendant, features, models, datasets,
+        analyses, dashboards, raw_edges + attached_edges
+        )
+
+
+async def get_subgraph_of_the_table_async(
+        g: GremlinUtils,
+        tableId: str,
+        level: int = 10,
+        level_down: int = None
+        ) -> dict:
+    """Versão assíncrona de `get_subgraph_of_the_table`.
+
+    A tabela e os jobs de origem dependem apenas do nome e são buscados
+    juntos. Ascendentes, descendentes e arestas dependem do ID da tabela e
+    rodam em paralelo; os nós ligados à tabela e às descendentes começam
+    assim que os descendentes chegam, sem esperar pelas arestas.
+    """
+    if level_down is None:
+        level_down = level
+    start = start_vertices(g, VERTEX_LABEL_TABLE, [tableId])
+    if start is None:
+        return build_table_subgraph([], [], [], [], [], [], [], [], [], [])
+    table_select, source_job = await asyncio.gather(
+        fetch(project_table(start.clone()).dedup(), "table"),
+        fetch(project_job(
+            start.clone()
+            .inE("produce").outV()
+            .inE("has").outV()
+            .inE("schedule").outV()
+            ).dedup(), "source_job")
+        )
 
     table_id = table_select[0]["id"] if table_select else None
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_source_job = executor.submit(
-            lambda: project_job(
-                g.V().has(VERTEX_LABEL_TABLE, "table_name", tableId)
+    async def descendant_stage() -> tuple:
+        descendant = await fetch(
+            descendant_nodes_from_table(g, [table_id], level_down),
+            "descendant_nodes_from_table", {"level": level_down}
+            )
+        tables_ids = [
+            node["id"] for node in table_select + descendant
+            if node['label'] == VERTEX_LABEL_TABLE
+        ]
+        return descendant, await fetch_attached_nodes(g, tables_ids)
+
+    ascendant, (descendant, attached), raw_edges = await asyncio.gather(
+        fetch(ascendant_nodes_from_table(g, [table_id], level),
+              "ascendant_nodes_from_table", {"level": level}),
+        descendant_stage(),
+        fetch(edges_from_table(g, [table_id], level, level_down),
+              "edges_from_table", {"level": level, "level_down": level_down})
+        )
+    features, models, datasets, analyses, dashboards, attached_edges = \
+        attached
+
+    return build_table_subgraph(
+        table_select, source_job, ascendant, descendant, features, models,
+        datasets, analyses, dashboards, raw_edges + attached_edges
+        )
+
+
+def latest_run():
+    """Retorna o JOB_RUN mais recente do job corrente."""
+    return __.local(
+        __.out("schedule")
+        .order().by("dt_update", Order.desc)
+        .limit(1)
+    )
+
+
+def producer_jobs_of_table():
+    """Retorna os jobs cuja execução mais recente produz a tabela corrente."""
+    return __.as_("current_table") \
+        .inE("produce").outV() \
+        .inE("has").outV() \
+        .inE("schedule").outV() \
+        .where(
+            latest_run()
+            .out("has")
+            .out("produce")
+            .where(P.eq("current_table"))
+        )
+
+
+def consumer_jobs_of_table():
+    """Retorna os jobs cuja execução mais recente consome a tabela
+    corrente."""
+    return __.as_("current_table") \
+        .outE("consumed_by").inV() \
+        .inE("has").outV() \
+        .inE("schedule").outV() \
+        .where(
+            latest_run()
+            .out("has")
+            .in_("consumed_by")
+            .where(P.eq("current_table"))
+        )
+
+
+class LineageSteps:
+    """Saltos de linhagem usados pelas travessias de uma única ida.
+
+    A implementação padrão percorre JOB -> schedule -> JOB_RUN -> has ->
+    EXECUTION_PLAN -> produce/consumed_by, escolhendo a execução mais recente
+    de cada job com `latest_run`.
+    """
+
+    @staticmethod
+    def asc_table():
+        return asc_path_table()
+
+    @staticmethod
+    def desc_table():
+        return desc_path_table()
+
+    @staticmethod
+    def producer_jobs():
+        return producer_jobs_of_table()
+
+    @staticmethod
+    def consumer_jobs():
+        return consumer_jobs_of_table()
+
+    @staticmethod
+    def table_edges():
+        return get_edge_projections_from_table()
+
+    @staticmethod
+    def consumed_tables():
+        return latest_run().out("has").in_("consumed_by")
+
+    @staticmethod
+    def produced_tables():
+        return latest_run().out("has").out("produce")
+
+    @staticmethod
+    def asc_job():
+        return latest_run() \
+            .out("has") \
+            .in_("consumed_by") \
+            .inE("produce").outV() \
+            .inE("has").outV() \
+            .inE("schedule").outV()
+
+    @staticmethod
+    def desc_job():
+        return latest_run() \
+            .out("has") \
+            .out("produce").as_("current_table") \
+            .outE("consumed_by").inV() \
+            .inE("has").outV() \
+            .inE("schedule").outV() \
+            .where(
+                latest_run()
+                .out("has")
+                .in_("consumed_by")
+                .where(P.eq("current_table"))
+            )
+
+    @staticmethod
+    def job_edges():
+        return get_edge_projections()
+
+
+class ShortcutLineageSteps(LineageSteps):
+    """Saltos de linhagem sobre as arestas derivadas `latest_produces`
+    (JOB -> TABLE) e `latest_consumed_by` (TABLE -> JOB), mantidas por
+    `utils.latest_run_edges`. Cada salto JOB/TABLE vira um único passo, sem
+    percorrer JOB_RUN/EXECUTION_PLAN nem ordenar as execuções."""
+
+    @staticmethod
+    def asc_table():
+        return __.in_(EDGE_LATEST_PRODUCES).in_(EDGE_LATEST_CONSUMED_BY)
+
+    @staticmethod
+    def desc_table():
+        return __.out(EDGE_LATEST_CONSUMED_BY).out(EDGE_LATEST_PRODUCES)
+
+    @staticmethod
+    def producer_jobs():
+        return __.in_(EDGE_LATEST_PRODUCES)
+
+    @staticmethod
+    def consumer_jobs():
+        return __.out(EDGE_LATEST_CONSUMED_BY)
+
+    @staticmethod
+    def table_edges():
+        return __.union(
+            __.inE(EDGE_LATEST_PRODUCES),
+            __.outE(EDGE_LATEST_CONSUMED_BY)
+        ).project("from", "to") \
+            .by(__.outV().id_()) \
+            .by(__.inV().id_())
+
+    @staticmethod
+    def consumed_tables():
+        return __.in_(EDGE_LATEST_CONSUMED_BY)
+
+    @staticmethod
+    def produced_tables():
+        return __.out(EDGE_LATEST_PRODUCES)
+
+    @staticmethod
+    def asc_job():
+        # Os produtores das tabelas consumidas são considerados em qualquer
+        # execução, como em `get_ascendant_nodes_from_job`
+        return __.in_(EDGE_LATEST_CONSUMED_BY) \
+            .in_("produce") \
+            .in_("has") \
+            .in_("schedule")
+
+    @staticmethod
+    def desc_job():
+        return __.out(EDGE_LATEST_PRODUCES).out(EDGE_LATEST_CONSUMED_BY)
+
+    @staticmethod
+    def job_edges():
+        return __.union(
+            __.outE(EDGE_LATEST_PRODUCES),
+            __.inE(EDGE_LATEST_CONSUMED_BY)
+        ).project("from", "to") \
+            .by(__.outV().id_()) \
+            .by(__.inV().id_())
+
+
+def tag(section: str, traversal):
+    """Marca cada resultado de `traversal` com a seção da resposta a que
+    pertence, no formato {"section": ..., "item": ...}."""
+    return traversal.project("section", "item") \
+        .by(__.constant(section)) \
+        .by(__.identity())
+
+
+def attached_nodes_of_table():
+    """Retorna, marcados, as features, modelos, datasets, análises e
+    dashboards ligados à tabela corrente e as arestas entre eles, com as
+    mesmas projeções de `get_nodes_until_models` e
+    `get_nodes_until_dashboards`."""
+    return __.as_("table").union(
+        tag("attached", __.out("belongs_to_table")
+            .hasLabel(VERTEX_LABEL_FEATURE).as_("feature")
+            .union(
+                __.project("id", "label", "feature_name")
+                .by(T.id)
+                .by(T.label)
+                .by("feature_name"),
+                __.out("has_feature").hasLabel(VERTEX_LABEL_MODEL)
+                .project("id", "label", "model_name")
+                .by(T.id)
+                .by(T.label)
+                .by("model_name")
+            )),
+        tag("attached", __.out("read_by")
+            .hasLabel(VERTEX_LABEL_DATASET).as_("dataset")
+            .union(
+                __.project("id", "label", "dataset_name")
+                .by(T.id)
+                .by(T.label)
+                .by("dataset_name"),
+                __.out("uses_dataset").hasLabel(VERTEX_LABEL_ANALYSIS)
+                .union(
+                    __.project("id", "label", "analysis_name")
+                    .by(T.id)
+                    .by(T.label)
+                    .by("analysis_name"),
+                    __.out("generate_by").hasLabel(VERTEX_LABEL_DASHBOARD)
+                    .project("id", "label", "dashboard_name")
+                    .by(T.id)
+                    .by(T.label)
+                    .by("dashboard_name")
+                )
+            )),
+        tag("edge", __.union(
+            # TABLE -> FEATURE
+            __.out("belongs_to_table")
+            .hasLabel(VERTEX_LABEL_FEATURE).as_("feature")
+            .project("from", "to")
+            .by(__.select("table").id_())
+            .by(__.select("feature").id_()),
+
+            # FEATURE -> MODEL
+            __.out("belongs_to_table")
+            .hasLabel(VERTEX_LABEL_FEATURE).as_("feature")
+            .out("has_feature")
+            .hasLabel(VERTEX_LABEL_MODEL).as_("model")
+            .project("from", "to")
+            .by(__.select("feature").id_())
+            .by(__.select("model").id_()),
+
+            # TABLE -> DATASET
+            __.out("read_by")
+            .hasLabel(VERTEX_LABEL_DATASET).as_("dataset")
+            .project("from", "to")
+            .by(__.select("table").id_())
+            .by(__.select("dataset").id_()),
+
+            # DATASET -> ANALYSIS
+            __.out("read_by")
+            .hasLabel(VERTEX_LABEL_DATASET).as_("dataset")
+            .out("uses_dataset")
+            .hasLabel(VERTEX_LABEL_ANALYSIS).as_("analysis")
+            .project("from", "to")
+            .by(__.select("dataset").id_())
+            .by(__.select("analysis").id_()),
+
+            # ANALYSIS -> DASHBOARD
+            __.out("read_by")
+            .hasLabel(VERTEX_LABEL_DATASET).as_("dataset")
+            .out("uses_dataset")
+            .hasLabel(VERTEX_LABEL_ANALYSIS).as_("analysis")
+            .out("generate_by")
+            .hasLabel(VERTEX_LABEL_DASHBOARD).as_("dashboard")
+            .project("from", "to")
+            .by(__.select("analysis").id_())
+            .by(__.select("dashboard").id_())
+        ))
+    )
+
+
+def split_tagged(results: list) -> dict:
+    """Agrupa os resultados marcados por `tag` em listas por seção,
+    removendo duplicados e preservando a ordem de chegada."""
+    sections = {}
+    seen = {}
+    for result in results:
+        section = result["section"]
+        item = result["item"]
+        key = item["id"] if "id" in item else (item["from"], item["to"])
+        if key in seen.setdefault(section, set()):
+            continue
+        seen[section].add(key)
+        sections.setdefault(section, []).append(item)
+    return sections
+
+
+def split_attached(attached: list) -> tuple:
+    """Separa os nós ligados às tabelas por label, na ordem da resposta."""
+    return tuple(
+        [item for item in attached if item["label"] == label]
+        for label in (
+            VERTEX_LABEL_FEATURE,
+            VERTEX_LABEL_MODEL,
+            VERTEX_LABEL_DATASET,
+            VERTEX_LABEL_ANALYSIS,
+            VERTEX_LABEL_DASHBOARD
+        )
+    )
+
+
+def table_single_trip(
+        g: GremlinUtils,
+        tableId: str,
+        level: int,
+        level_down: int,
+        steps: LineageSteps = LineageSteps
+        ):
+    """Retorna, sem executá-la, a travessia de
+    `get_subgraph_of_the_table_single_trip`, ou None quando o índice de
+    nomes não conhece a tabela."""
+    start = start_vertices(g, VERTEX_LABEL_TABLE, [tableId])
+    if start is None:
+        return None
+    return start \
+        .fold() \
+        .union(
+            tag("table", project_table(__.unfold())),
+            tag("sourceJob", project_job(
+                __.unfold()
                 .inE("produce").outV()
                 .inE("has").outV()
                 .inE("schedule").outV()
-            ).dedup().toList()
-        )
-        future_asc = executor.submit(
-            get_ascendant_nodes_from_table, g, [table_id], level
-            )
-        future_desc = executor.submit(
-            get_descendant_nodes_from_table, g, [table_id], level
+            )),
+            # Tabelas homônimas também entram na busca de modelos/dashboards
+            __.unfold().skip(1).union(attached_nodes_of_table()),
+            # Caminho dos ascendentes
+            __.unfold().limit(1)
+            .aggregate("visited_up")
+            .repeat(visit_once(steps.asc_table(), "visited_up"))
+            .emit().times(level)
+            .dedup()
+            .hasLabel(VERTEX_LABEL_TABLE)
+            .union(
+                tag("ascendant", project_table(__.identity())),
+                tag("ascendant", project_job(steps.producer_jobs())),
+                tag("edge", steps.table_edges())
+            ),
+            # Caminho dos descendentes, a partir da própria tabela
+            __.unfold().limit(1)
+            .union(
+                __.identity(),
+                __.aggregate("visited_down")
+                .repeat(visit_once(steps.desc_table(), "visited_down"))
+                .emit().times(level_down)
             )
-        future_edges = executor.submit(
-            get_edges_from_table, g, [table_id], level
+            .dedup()
+            .hasLabel(VERTEX_LABEL_TABLE)
+            .union(
+                tag("descendant", project_table(__.identity())),
+                tag("descendant", project_job(steps.consumer_jobs())),
+                tag("edge", steps.table_edges()),
+                attached_nodes_of_table()
             )
+        )
+
+
+@measured()
+def get_subgraph_of_the_table_single_trip(
+        g: GremlinUtils,
+        tableId: str,
+        level: int = 10,
+        level_down: int = None,
+        steps: LineageSteps = LineageSteps
+        ) -> dict:
+    """Retorna o subgrafo de uma tabela em uma única ida ao Neptune.
+
+    Em vez das sete consultas de `get_subgraph_of_the_table`, cada direção
+    (ascendente e descendente) é percorrida uma única vez e, para cada tabela
+    visitada, a mesma travessia emite os nós, as arestas e as features,
+    modelos, datasets, análises e dashboards associados. Cada resultado é
+    marcado com a sua seção (`tag`) e separado em Python, produzindo o mesmo
+    dicionário de `get_subgraph_of_the_table`.
 
-        source_job = future_source_job.result()
-        ascendant = future_asc.result()
-        descendant = future_desc.result()
-        raw_edges = future_edges.result()
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    tableId (str): Nome da tabela para a qual o subgrafo será recuperado.
+    level (int): Nível de profundidade para a busca de nós ascendentes e
+        descendentes.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
+    steps (LineageSteps): Saltos de linhagem usados na travessia.
 
-    tables_ids = [
-        node["id"] for node in table_select + descendant
-        if node['label'] == VERTEX_LABEL_TABLE
+    Returns:
+    -------
+    dict: O mesmo dicionário retornado por `get_subgraph_of_the_table`.
+    """
+    if level_down is None:
+        level_down = level
+    traversal = table_single_trip(g, tableId, level, level_down, steps)
+    if traversal is None:
+        return build_table_subgraph([], [], [], [], [], [], [], [], [], [])
+    results = traversal.toList()
+
+    sections = split_tagged(results)
+    table_select = sections.get("table", [])
+    table_id = table_select[0]["id"] if table_select else None
+    # A própria tabela só é descendente de si mesma quando há ciclo
+    descendant = [
+        item for item in sections.get("descendant", [])
+        if item["id"] != table_id
     ]
+    features, models, datasets, analyses, dashboards = \
+        split_attached(sections.get("attached", []))
+
+    return build_table_subgraph(
+        table_select, sections.get("sourceJob", []),
+        sections.get("ascendant", []), descendant, features, models,
+        datasets, analyses, dashboards, sections.get("edge", [])
+        )
 
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        future_models = executor.submit(
-            get_nodes_until_models, g, tables_ids
+
+def job_single_trip(
+        g: GremlinUtils,
+        jobId: str,
+        level: int,
+        level_down: int,
+        steps: LineageSteps = LineageSteps
+        ):
+    """Retorna, sem executá-la, a travessia de
+    `get_subgraph_of_the_job_single_trip`, ou None quando o índice de nomes
+    não conhece o job."""
+    start = start_vertices(g, VERTEX_LABEL_JOB, [jobId])
+    if start is None:
+        return None
+    return start \
+        .fold() \
+        .union(
+            tag("job", project_job(__.unfold())),
+            __.unfold().limit(1).as_("job")
+            .union(
+                # Tabelas consumidas pelo job
+                tag("ascendant", project_table(steps.consumed_tables())),
+                # Caminho dos ascendentes
+                __.aggregate("visited_up")
+                .repeat(visit_once(steps.asc_job(), "visited_up"))
+                .emit().times(level)
+                .dedup()
+                .hasLabel(VERTEX_LABEL_JOB).as_("job")
+                .union(
+                    tag("ascendant", project_job(__.identity())),
+                    tag("ascendant", project_table(
+                        steps.consumed_tables().hasLabel(VERTEX_LABEL_TABLE)
+                    )),
+                    tag("edge", steps.job_edges())
+                ),
+                # Caminho dos descendentes, a partir do próprio job
+                __.union(
+                    __.identity(),
+                    __.aggregate("visited_down")
+                    .repeat(visit_once(steps.desc_job(), "visited_down"))
+                    .emit().times(level_down)
+                )
+                .dedup()
+                .hasLabel(VERTEX_LABEL_JOB).as_("job")
+                .union(
+                    tag("descendant", project_job(__.identity())),
+                    tag("edge", steps.job_edges()),
+                    steps.produced_tables()
+                    .hasLabel(VERTEX_LABEL_TABLE)
+                    .union(
+                        tag("descendant", project_table(__.identity())),
+                        attached_nodes_of_table()
+                    )
+                )
             )
-        future_dashboards = executor.submit(
-            get_nodes_until_dashboards, g, tables_ids
+        )
+
+
+@measured()
+def get_subgraph_of_the_job_single_trip(
+        g: GremlinUtils,
+        jobId: str,
+        level: int = 10,
+        level_down: int = None,
+        steps: LineageSteps = LineageSteps
+        ) -> dict:
+    """Retorna o subgrafo de um job em uma única ida ao Neptune.
+
+    Equivalente a `get_subgraph_of_the_job`: cada direção é percorrida uma
+    única vez e, para cada job visitado, a travessia emite o job, as tabelas
+    da sua execução mais recente, as arestas JOB/TABLE e, nas tabelas
+    descendentes, os nós de features, modelos e dashboards. As arestas que
+    `get_edges_from_job` obtém em uma terceira travessia são emitidas a
+    partir dos mesmos jobs já visitados.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    jobId (str): Nome do job para o qual o subgrafo será recuperado.
+    level (int): Nível de profundidade para a busca de nós ascendentes e
+        descendentes.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
+    steps (LineageSteps): Saltos de linhagem usados na travessia.
+
+    Returns:
+    -------
+    dict: O mesmo dicionário retornado por `get_subgraph_of_the_job`.
+    """
+    if level_down is None:
+        level_down = level
+    traversal = job_single_trip(g, jobId, level, level_down, steps)
+    if traversal is None:
+        return build_job_subgraph([], [], [], [], [], [], [], [], [])
+    results = traversal.toList()
+
+    sections = split_tagged(results)
+    features, models, datasets, analyses, dashboards = \
+        split_attached(sections.get("attached", []))
+
+    return build_job_subgraph(
+        sections.get("job", []), sections.get("ascendant", []),
+        sections.get("descendant", []), features, models, datasets,
+        analyses, dashboards, sections.get("edge", [])
+        )
+
+
+def get_subgraph_of_the_table_shortcut(
+        g: GremlinUtils,
+        tableId: str,
+        level: int = 10,
+        level_down: int = None
+        ) -> dict:
+    """Versão de `get_subgraph_of_the_table_single_trip` que percorre as
+    arestas derivadas da execução mais recente (`ShortcutLineageSteps`)."""
+    return get_subgraph_of_the_table_single_trip(
+        g, tableId, level, level_down, steps=ShortcutLineageSteps
+        )
+
+
+def get_subgraph_of_the_job_shortcut(
+        g: GremlinUtils,
+        jobId: str,
+        level: int = 10,
+        level_down: int = None
+        ) -> dict:
+    """Versão de `get_subgraph_of_the_job_single_trip` que percorre as
+    arestas derivadas da execução mais recente (`ShortcutLineageSteps`)."""
+    return get_subgraph_of_the_job_single_trip(
+        g, jobId, level, level_down, steps=ShortcutLineageSteps
+        )
+
+
+def job_adjacency():
+    """Projeta o job corrente com as tabelas produzidas e consumidas pela
+    sua execução mais recente. A execução mais recente é calculada uma
+    única vez por job, independentemente de quantos caminhos chegam nele."""
+    return __.project("job", "produces", "consumes") \
+        .by(project_job(__.identity())) \
+        .by(project_table(
+            latest_run().out("has").out("produce")
+            .hasLabel(VERTEX_LABEL_TABLE)
+        ).fold()) \
+        .by(project_table(
+            latest_run().out("has").in_("consumed_by")
+            .hasLabel(VERTEX_LABEL_TABLE)
+        ).fold())
+
+
+@measured()
+def get_lineage_adjacency(
+        g: GremlinUtils,
+        up_tables: set,
+        down_tables: set,
+        known_jobs: set,
+        with_links: bool = False
+        ) -> tuple:
+    """Busca, em uma única consulta, a adjacência de um nível da BFS.
+
+    Os jobs que produzem as tabelas em `up_tables` ou consomem as tabelas em
+    `down_tables`, em qualquer execução, e que ainda não são conhecidos são
+    retornados com `job_adjacency`. Com `with_links`, a consulta retorna
+    também os pares (tabela, job) dos produtores de `up_tables`.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    up_tables (set): IDs das tabelas cujos produtores serão buscados.
+    down_tables (set): IDs das tabelas cujos consumidores serão buscados.
+    known_jobs (set): IDs dos jobs cuja adjacência já foi carregada.
+    with_links (bool): Se os pares (tabela, produtor) devem ser retornados.
+
+    Returns:
+    -------
+    tuple: Uma tupla contendo:
+        - links: Lista de pares (tabela, job) de produtores de `up_tables`.
+        - rows: Lista de adjacências (`job_adjacency`) dos novos jobs.
+    """
+    results = g.V(*(up_tables | down_tables)).union(*adjacency_branches(
+        up_tables, down_tables, known_jobs, with_links
+    )).toList()
+    return adjacency_results(results)
+
+
+def adjacency_branches(up_tables: set, down_tables: set, known_jobs: set,
+                       with_links: bool) -> list:
+    """Ramos (`tag`) de `get_lineage_adjacency`, a partir das tabelas."""
+    producers = __.hasId(P.within(list(up_tables))) \
+        .in_("produce").in_("has").in_("schedule") \
+        .hasLabel(VERTEX_LABEL_JOB)
+    consumers = __.hasId(P.within(list(down_tables))) \
+        .out("consumed_by").in_("has").in_("schedule") \
+        .hasLabel(VERTEX_LABEL_JOB)
+
+    candidates = __.union(producers, consumers).dedup()
+    if known_jobs:
+        candidates = candidates.not_(__.hasId(P.within(list(known_jobs))))
+
+    branches = [tag("row", candidates.union(job_adjacency()))]
+    if with_links:
+        branches.append(
+            tag("link", __.hasId(P.within(list(up_tables))).as_("table")
+                .in_("produce").in_("has").in_("schedule")
+                .hasLabel(VERTEX_LABEL_JOB).as_("job")
+                .project("from", "to")
+                .by(__.select("table").id_())
+                .by(__.select("job").id_()))
+        )
+    return branches
+
+
+def adjacency_results(results: list) -> tuple:
+    links = set()
+    rows = []
+    for result in results:
+        if result["section"] == "link":
+            links.add((result["item"]["from"], result["item"]["to"]))
+        else:
+            rows.append(result["item"])
+    return links, rows
+
+
+@measured()
+def get_lineage_members(
+        g: GremlinUtils,
+        job_ids: set,
+        up_tables: set,
+        down_tables: set,
+        known_jobs: set,
+        with_links: bool = False
+        ) -> tuple:
+    """Busca, em uma única consulta, a adjacência dos jobs e tabelas que a
+    BFS pode visitar (os membros do fecho transitivo).
+
+    As adjacências (`job_adjacency`) de `job_ids` são buscadas pelos IDs.
+    As tabelas são consultadas como em `get_lineage_adjacency`, no estado
+    atual do grafo: jobs ligados a elas depois do cálculo do fecho (fora de
+    `job_ids`) também são retornados.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    job_ids (set): IDs dos jobs do fecho.
+    up_tables (set): IDs das tabelas cujos produtores serão buscados.
+    down_tables (set): IDs das tabelas cujos consumidores serão buscados.
+    known_jobs (set): IDs dos jobs cuja adjacência já foi carregada.
+    with_links (bool): Se os pares (tabela, produtor) devem ser retornados.
+
+    Returns:
+    -------
+    tuple: O mesmo par (links, rows) de `get_lineage_adjacency`.
+    """
+    branches = adjacency_branches(
+        up_tables, down_tables, known_jobs | job_ids, with_links
+    )
+    branches.append(tag("row", __.hasId(P.within(list(job_ids)))
+                        .hasLabel(VERTEX_LABEL_JOB).union(job_adjacency())))
+    results = g.V(*(job_ids | up_tables | down_tables)) \
+        .union(*branches).toList()
+    return adjacency_results(results)
+
+
+class LineageAdjacency:
+    """Adjacência JOB/TABLE carregada sob demanda, nível a nível, pela BFS
+    do lado do cliente, ou de uma vez (`preload`) quando os nós alcançáveis
+    já são conhecidos."""
+
+    def __init__(self, g: GremlinUtils, with_links: bool = False):
+        self.g = g
+        self.with_links = with_links
+        self.rows = {}
+        self.tables = {}
+        self.producers = {}
+        self.consumers = {}
+        self.any_run_producers = {}
+        self.loaded_up = set()
+        self.loaded_down = set()
+        self.queries = 0
+
+    def add_row(self, row: dict) -> None:
+        job_id = row["job"]["id"]
+        self.rows[job_id] = row
+        for table in row["produces"]:
+            self.tables.setdefault(table["id"], table)
+            self.producers.setdefault(table["id"], set()).add(job_id)
+        for table in row["consumes"]:
+            self.tables.setdefault(table["id"], table)
+            self.consumers.setdefault(table["id"], set()).add(job_id)
+
+    def load(self, up_tables: set, down_tables: set) -> None:
+        # Tabelas já carregadas (por outra busca que compartilha esta
+        # adjacência) não são consultadas de novo
+        up_tables = set(up_tables) - self.loaded_up
+        down_tables = set(down_tables) - self.loaded_down
+        if not up_tables and not down_tables:
+            return
+        self.store(up_tables, down_tables, *self.fetch(up_tables, down_tables))
+
+    def preload(self, job_ids: set, up_tables: set,
+                down_tables: set) -> None:
+        """Carrega, em uma única consulta, a adjacência de todos os jobs e
+        tabelas alcançáveis pela BFS (os membros do fecho transitivo). As
+        tabelas são consultadas no estado atual do grafo, como em `load`,
+        e não são consultadas de novo nos níveis seguintes; os jobs ligados
+        a elas depois do cálculo do fecho entram pela própria consulta.
+        """
+        up_tables = set(up_tables) - self.loaded_up
+        down_tables = set(down_tables) - self.loaded_down
+        job_ids = set(job_ids) - set(self.rows)
+        if not job_ids and not up_tables and not down_tables:
+            return
+        self.store(
+            up_tables, down_tables,
+            *self.fetch_members(job_ids, up_tables, down_tables)
+        )
+
+    def store(self, up_tables: set, down_tables: set, links: set,
+              rows: list) -> None:
+        self.queries += 1
+        self.loaded_up |= up_tables
+        self.loaded_down |= down_tables
+        for row in rows:
+            self.add_row(row)
+        for table_id in up_tables:
+            self.any_run_producers.setdefault(table_id, set())
+        for table_id, job_id in links:
+            self.any_run_producers[table_id].add(job_id)
+
+    def fetch(self, up_tables: set, down_tables: set) -> tuple:
+        """Retorna os pares (tabela, produtor) e as adjacências dos novos
+        jobs de um nível, no formato de `get_lineage_adjacency`."""
+        return get_lineage_adjacency(
+            self.g, up_tables, down_tables, set(self.rows), self.with_links
+        )
+
+    def fetch_members(self, job_ids: set, up_tables: set,
+                      down_tables: set) -> tuple:
+        """Retorna os pares (tabela, produtor) de `up_tables` e as
+        adjacências dos jobs do fecho e dos novos jobs das tabelas, no
+        formato de `get_lineage_members`."""
+        return get_lineage_members(
+            self.g, job_ids, up_tables, down_tables, set(self.rows),
+            self.with_links
+        )
+
+    def edges(self, job_ids, table_ids: set) -> list:
+        """Arestas JOB -> TABLE (produce) e TABLE -> JOB (consumed_by) da
+        execução mais recente dos jobs informados."""
+        edges = {}
+        for job_id in job_ids:
+            row = self.rows.get(job_id)
+            if row is None:
+                continue
+            for table in row["produces"]:
+                if table["id"] in table_ids:
+                    edges[(job_id, table["id"])] = None
+            for table in row["consumes"]:
+                if table["id"] in table_ids:
+                    edges[(table["id"], job_id)] = None
+        return [
+            {"from": from_id, "to": to_id} for from_id, to_id in edges
+        ]
+
+
+@measured()
+def get_attached_nodes(g: GremlinUtils, tables_ids: list) -> tuple:
+    """Equivalente a `get_nodes_until_models` e `get_nodes_until_dashboards`
+    em uma única consulta."""
+    if not tables_ids:
+        return [], [], [], [], [], []
+    sections = split_tagged(
+        g.V(*tables_ids).hasLabel(VERTEX_LABEL_TABLE)
+        .union(attached_nodes_of_table()).toList()
+    )
+    features, models, datasets, analyses, dashboards = \
+        split_attached(sections.get("attached", []))
+    return features, models, datasets, analyses, dashboards, \
+        sections.get("edge", [])
+
+
+@measured()
+def get_attached_nodes_by_table(g: GremlinUtils, tables_ids) -> dict:
+    """Retorna, por tabela, os resultados marcados de
+    `attached_nodes_of_table`, em uma única consulta para todas as
+    tabelas."""
+    if not tables_ids:
+        return {}
+    results = g.V(*tables_ids).hasLabel(VERTEX_LABEL_TABLE) \
+        .project("table", "items") \
+        .by(T.id) \
+        .by(__.union(attached_nodes_of_table()).fold()) \
+        .toList()
+    return {result["table"]: result["items"] for result in results}
+
+
+def attached_of(attached_by_table: dict, tables_ids: list) -> tuple:
+    """Junta os nós ligados às tabelas informadas, no formato de
+    `get_attached_nodes`."""
+    sections = split_tagged([
+        item
+        for table_id in tables_ids
+        for item in attached_by_table.get(table_id, [])
+    ])
+    features, models, datasets, analyses, dashboards = \
+        split_attached(sections.get("attached", []))
+    return features, models, datasets, analyses, dashboards, \
+        sections.get("edge", [])
+
+
+class TableBfs:
+    """Estado da BFS de uma tabela: tabelas e jobs ascendentes e
+    descendentes já encontrados e as fronteiras do próximo nível."""
+
+    def __init__(self, table_select: list, source_job: list,
+                 level: int, level_down: int):
+        self.table_select = table_select
+        self.source_job = source_job
+        self.level = level
+        self.level_down = level_down
+        self.table_id = table_select[0]["id"]
+        self.ascendant_tables, self.ascendant_jobs = {}, {}
+        self.descendant_tables, self.descendant_jobs = {}, {}
+        self.up_frontier = {self.table_id}
+        self.down_frontier = {self.table_id}
+
+    def frontiers(self, depth: int) -> tuple:
+        if depth > self.level:
+            self.up_frontier = set()
+        if depth > self.level_down:
+            self.down_frontier = set()
+        return self.up_frontier, self.down_frontier
+
+    def advance(self, adjacency: "LineageAdjacency", depth: int) -> None:
+        next_up = set()
+        for current_table in self.up_frontier:
+            for job_id in adjacency.producers.get(current_table, ()):
+                row = adjacency.rows[job_id]
+                if depth > 0:
+                    self.ascendant_jobs.setdefault(job_id, row["job"])
+                if depth == self.level:
+                    continue
+                for table in row["consumes"]:
+                    if table["id"] not in self.ascendant_tables and \
+                            table["id"] != self.table_id:
+                        self.ascendant_tables[table["id"]] = table
+                        next_up.add(table["id"])
+
+        next_down = set()
+        for current_table in self.down_frontier:
+            for job_id in adjacency.consumers.get(current_table, ()):
+                row = adjacency.rows[job_id]
+                self.descendant_jobs.setdefault(job_id, row["job"])
+                if depth == self.level_down:
+                    continue
+                for table in row["produces"]:
+                    if table["id"] not in self.descendant_tables and \
+                            table["id"] != self.table_id:
+                        self.descendant_tables[table["id"]] = table
+                        next_down.add(table["id"])
+
+        self.up_frontier, self.down_frontier = next_up, next_down
+
+    def attached_tables(self) -> list:
+        return [node["id"] for node in self.table_select] + [
+            node_id for node_id in self.descendant_tables
+            if node_id != self.table_id
+        ]
+
+    def build(self, adjacency: "LineageAdjacency",
+              attached_by_table: dict) -> dict:
+        ascendant = list(self.ascendant_tables.values()) + \
+            list(self.ascendant_jobs.values())
+        descendant = list(self.descendant_jobs.values()) + \
+            list(self.descendant_tables.values())
+        features, models, datasets, analyses, dashboards, attached_edges = \
+            attached_of(attached_by_table, self.attached_tables())
+
+        edge_tables = {self.table_id} | set(self.ascendant_tables) | \
+            set(self.descendant_tables)
+        edge_jobs = {job["id"] for job in self.source_job} | \
+            set(self.ascendant_jobs) | set(self.descendant_jobs)
+
+        return build_table_subgraph(
+            self.table_select, self.source_job, ascendant, descendant,
+            features, models, datasets, analyses, dashboards,
+            adjacency.edges(edge_jobs, edge_tables) + attached_edges
             )
 
-        features, models, edges2 = future_models.result()
-        datasets, analyses, dashboards, edges3 = future_dashboards.result()
 
-    valid_ids = set()
-    for node in table_select + ascendant + descendant + source_job + \
-            features + models + datasets + analyses + dashboards:
-        valid_ids.add(node["id"])
+def run_tables_bfs(searches: dict, adjacency: "LineageAdjacency",
+                   level: int, level_down: int) -> None:
+    """Avança as buscas (`TableBfs`) em conjunto: a cada nível, a
+    adjacência da união das fronteiras é carregada uma única vez e
+    compartilhada entre as buscas."""
+    for depth in range(max(level, level_down) + 1):
+        up_frontier, down_frontier = set(), set()
+        for search in searches.values():
+            up, down = search.frontiers(depth)
+            up_frontier |= up
+            down_frontier |= down
+        if not up_frontier and not down_frontier:
+            break
+        adjacency.load(up_frontier, down_frontier)
+        for search in searches.values():
+            search.advance(adjacency, depth)
+
+
+def attached_tables_of(searches: dict) -> list:
+    """Tabelas cujos nós ligados entram nos subgrafos das buscas."""
+    return list(dict.fromkeys(
+        table_id
+        for search in searches.values()
+        for table_id in search.attached_tables()
+    ))
+
+
+def get_subgraphs_of_the_tables_bfs(
+        g: GremlinUtils,
+        tableIds: list,
+        level: int = 10,
+        level_down: int = None,
+        closure=None
+        ) -> dict:
+    """Retorna os subgrafos de várias tabelas com BFS nível a nível
+    executadas em conjunto.
+
+    As tabelas são buscadas em uma única consulta e as BFS avançam juntas:
+    a cada nível, a adjacência da união das fronteiras de todas as tabelas
+    é carregada em uma única consulta (`LineageAdjacency` não repete as
+    tabelas já carregadas) e compartilhada entre as buscas. Os nós ligados
+    às tabelas descendentes também são buscados de uma vez.
+
+    Com o fecho transitivo da linhagem (`closure`), os jobs e tabelas
+    ascendentes e descendentes já são conhecidos (`members`) e a adjacência
+    de todos eles é carregada em uma única consulta
+    (`LineageAdjacency.preload`): os jobs pelos IDs e as tabelas no estado
+    atual do grafo, então arestas criadas depois do fecho também são
+    seguidas. A BFS então avança em Python e só consulta o Neptune para
+    tabelas fora do fecho.
 
-    edges = [
-        edge for edge in raw_edges + edges2 + edges3
-        if isinstance(edge, dict) and
-        edge.get("from") in valid_ids and
-        edge.get("to") in valid_ids
-    ]
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    tableIds (list): Nomes das tabelas.
+    level (int): Nível de profundidade para a busca de nós ascendentes e
+        descendentes.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
+    closure (LineageClosure): Fecho transitivo usado na pré-carga da
+        adjacência (`utils.lineage_closure`).
+
+    Returns:
+    -------
+    dict: Para cada nome, o mesmo dicionário retornado por
+        `get_subgraph_of_the_table`.
+    """
+    if level_down is None:
+        level_down = level
+    names = list(dict.fromkeys(tableIds))
+    start = start_vertices(g, VERTEX_LABEL_TABLE, names)
+    results = [] if start is None else query_metrics.to_list(
+        "tables_bfs_start",
+        start
+        .project("name", "table", "sourceJob")
+        .by("table_name")
+        .by(project_table(__.identity()))
+        .by(project_job(
+            __.inE("produce").outV()
+            .inE("has").outV()
+            .inE("schedule").outV()
+        ).fold())
+        )
+
+    selects, source_jobs = {}, {}
+    for result in results:
+        selects.setdefault(result["name"], []).append(result["table"])
+        jobs = source_jobs.setdefault(result["name"], {})
+        for job in result["sourceJob"]:
+            jobs.setdefault(job["id"], job)
+
+    searches = {
+        name: TableBfs(
+            selects[name], list(source_jobs[name].values()),
+            level, level_down
+        )
+        for name in names if name in selects
+    }
+
+    adjacency = LineageAdjacency(g)
+    if closure is not None:
+        adjacency.preload(*closure.lineage_members(
+            [search.table_id for search in searches.values()],
+            level, level_down
+        ))
+    run_tables_bfs(searches, adjacency, level, level_down)
+
+    logger.info(
+        f"Table BFS of {len(searches)} tables finished with "
+        f"{adjacency.queries} queries"
+    )
+
+    attached_by_table = get_attached_nodes_by_table(
+        g, attached_tables_of(searches)
+        )
 
-    ascendant_jobs = [
-        item for item in ascendant if item['label'] == VERTEX_LABEL_JOB
-    ]
-    ascendant_tables = [
-        item for item in ascendant
-        if item['label'] == VERTEX_LABEL_TABLE and item["id"] != table_id
-    ]
-    descendant_jobs = [
-        item for item in descendant if item['label'] == VERTEX_LABEL_JOB
-    ]
-    descendant_tables = [
-        item for item in descendant
-        if item['label'] == VERTEX_LABEL_TABLE and item["id"] != table_id
-    ]
     return {
-        "table": table_select[0] if table_select else {},
-        "sourceJob": source_job,
-        "ascendantJobs": ascendant_jobs,
-        "ascendantTables": ascendant_tables,
-        "descendantJobs": descendant_jobs,
-        "descendantTables": descendant_tables,
-        "features": features,
-        "models": models,
-        "datasets": datasets,
-        "analyses": analyses,
-        "dashboards": dashboards,
-        "edges": edges
+        name: searches[name].build(adjacency, attached_by_table)
+        if name in searches else build_table_subgraph(
+            [], [], [], [], [], [], [], [], [], []
+            )
+        for name in names
+    }
+
+
+def get_subgraph_of_the_table_bfs(
+        g: GremlinUtils,
+        tableId: str,
+        level: int = 10,
+        level_down: int = None
+        ) -> dict:
+    """Retorna o subgrafo de uma tabela com uma BFS nível a nível executada
+    em Python.
+
+    Em vez de `repeat(...).times(level)` no servidor, que recalcula a
+    execução mais recente de cada job para cada traverser em cada salto,
+    cada nível da busca é uma única consulta (`get_lineage_adjacency`) que
+    carrega a adjacência de toda a fronteira, nas duas direções. Os IDs já
+    visitados são descartados localmente e a busca termina quando as
+    fronteiras ficam vazias ou `level`/`level_down` é atingido. O resultado
+    segue o mesmo contrato de `get_subgraph_of_the_table`.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    tableId (str): Nome da tabela para a qual o subgrafo será recuperado.
+    level (int): Nível de profundidade para a busca de nós ascendentes e
+        descendentes.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
+
+    Returns:
+    -------
+    dict: O mesmo dicionário retornado por `get_subgraph_of_the_table`.
+    """
+    return get_subgraphs_of_the_tables_bfs(
+        g, [tableId], level, level_down
+        )[tableId]
+
+
+class JobBfs:
+    """Estado da BFS de um job: jobs e tabelas ascendentes e descendentes
+    já encontrados e as fronteiras do próximo nível."""
+
+    def __init__(self, job_select: list, start: dict,
+                 level: int, level_down: int):
+        self.job_select = job_select
+        self.level = level
+        self.level_down = level_down
+        self.job_id = start["job"]["id"]
+        self.ascendant_tables = {t["id"]: t for t in start["consumes"]}
+        self.descendant_tables = {t["id"]: t for t in start["produces"]}
+        self.ascendant_jobs, self.descendant_jobs = {}, {}
+        self.visited_up, self.visited_down = {self.job_id}, {self.job_id}
+        self.up_frontier, self.down_frontier = {self.job_id}, {self.job_id}
+        self.up_tables, self.down_tables = set(), set()
+
+    def frontiers(self, adjacency: "LineageAdjacency", depth: int) -> tuple:
+        self.up_tables = {
+            table["id"]
+            for current_job in self.up_frontier
+            for table in adjacency.rows[current_job]["consumes"]
+        } if depth < self.level else set()
+        self.down_tables = {
+            table["id"]
+            for current_job in self.down_frontier
+            for table in adjacency.rows[current_job]["produces"]
+        } if depth < self.level_down else set()
+        return self.up_tables, self.down_tables
+
+    def advance(self, adjacency: "LineageAdjacency") -> None:
+        # Produtores (em qualquer execução) das tabelas consumidas
+        next_up = set()
+        for current_table in self.up_tables:
+            for current_job in adjacency.any_run_producers[current_table]:
+                if current_job in self.visited_up:
+                    continue
+                self.visited_up.add(current_job)
+                next_up.add(current_job)
+                row = adjacency.rows[current_job]
+                self.ascendant_jobs[current_job] = row["job"]
+                for table in row["consumes"]:
+                    self.ascendant_tables.setdefault(table["id"], table)
+
+        # Consumidores (na execução mais recente) das tabelas produzidas
+        next_down = set()
+        for current_table in self.down_tables:
+            for current_job in adjacency.consumers.get(current_table, ()):
+                if current_job in self.visited_down:
+                    continue
+                self.visited_down.add(current_job)
+                next_down.add(current_job)
+                row = adjacency.rows[current_job]
+                self.descendant_jobs[current_job] = row["job"]
+                for table in row["produces"]:
+                    self.descendant_tables.setdefault(table["id"], table)
+
+        self.up_frontier, self.down_frontier = next_up, next_down
+
+    def attached_tables(self) -> list:
+        return list(self.descendant_tables)
+
+    def build(self, adjacency: "LineageAdjacency",
+              attached_by_table: dict) -> dict:
+        ascendant = list(self.ascendant_tables.values()) + \
+            list(self.ascendant_jobs.values())
+        descendant = list(self.descendant_tables.values()) + \
+            list(self.descendant_jobs.values())
+        features, models, datasets, analyses, dashboards, attached_edges = \
+            attached_of(attached_by_table, self.attached_tables())
+
+        edge_jobs = {self.job_id} | set(self.ascendant_jobs) | \
+            set(self.descendant_jobs)
+        edge_tables = set(self.ascendant_tables) | \
+            set(self.descendant_tables)
+
+        return build_job_subgraph(
+            self.job_select, ascendant, descendant, features, models,
+            datasets, analyses, dashboards,
+            adjacency.edges(edge_jobs, edge_tables) + attached_edges
+            )
+
+
+def run_jobs_bfs(searches: dict, adjacency: "LineageAdjacency",
+                 level: int, level_down: int) -> None:
+    """Avança as buscas (`JobBfs`) em conjunto, como em
+    `run_tables_bfs`."""
+    for depth in range(max(level, level_down)):
+        up_tables, down_tables = set(), set()
+        for search in searches.values():
+            up, down = search.frontiers(adjacency, depth)
+            up_tables |= up
+            down_tables |= down
+        if not up_tables and not down_tables:
+            break
+        adjacency.load(up_tables, down_tables)
+        for search in searches.values():
+            search.advance(adjacency)
+
+
+def get_subgraphs_of_the_jobs_bfs(
+        g: GremlinUtils,
+        jobIds: list,
+        level: int = 10,
+        level_down: int = None,
+        closure=None
+        ) -> dict:
+    """Retorna os subgrafos de vários jobs com BFS nível a nível executadas
+    em conjunto, compartilhando a adjacência carregada a cada nível, como
+    em `get_subgraphs_of_the_tables_bfs`.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    jobIds (list): Nomes dos jobs.
+    level (int): Nível de profundidade para a busca de nós ascendentes e
+        descendentes.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
+    closure (LineageClosure): Fecho transitivo usado na pré-carga da
+        adjacência (`utils.lineage_closure`).
+
+    Returns:
+    -------
+    dict: Para cada nome, o mesmo dicionário retornado por
+        `get_subgraph_of_the_job`.
+    """
+    if level_down is None:
+        level_down = level
+    names = list(dict.fromkeys(jobIds))
+    start = start_vertices(g, VERTEX_LABEL_JOB, names)
+    rows = [] if start is None else query_metrics.to_list(
+        "jobs_bfs_start",
+        start.union(job_adjacency())
+        )
+
+    adjacency = LineageAdjacency(g, with_links=True)
+    selects, starts = {}, {}
+    for row in rows:
+        name = row["job"]["name"]
+        selects.setdefault(name, []).append(row["job"])
+        starts.setdefault(name, row)
+        adjacency.add_row(row)
+
+    searches = {
+        name: JobBfs(selects[name], starts[name], level, level_down)
+        for name in names if name in starts
+    }
+
+    if closure is not None:
+        adjacency.preload(*closure.lineage_members(
+            [search.job_id for search in searches.values()],
+            level, level_down
+        ))
+    run_jobs_bfs(searches, adjacency, level, level_down)
+
+    logger.info(
+        f"Job BFS of {len(searches)} jobs finished with "
+        f"{adjacency.queries} queries"
+    )
+
+    attached_by_table = get_attached_nodes_by_table(
+        g, attached_tables_of(searches)
+        )
+
+    return {
+        name: searches[name].build(adjacency, attached_by_table)
+        if name in searches else build_job_subgraph(
+            selects.get(name, []), [], [], [], [], [], [], [], []
+            )
+        for name in names
     }
+
+
+def get_subgraph_of_the_job_bfs(
+        g: GremlinUtils,
+        jobId: str,
+        level: int = 10,
+        level_down: int = None
+        ) -> dict:
+    """Retorna o subgrafo de um job com uma BFS nível a nível executada em
+    Python, com uma consulta por nível para as duas direções. Segue o
+    mesmo contrato de `get_subgraph_of_the_job`.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    jobId (str): Nome do job para o qual o subgrafo será recuperado.
+    level (int): Nível de profundidade para a busca de nós ascendentes e
+        descendentes.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
+
+    Returns:
+    -------
+    dict: O mesmo dicionário retornado por `get_subgraph_of_the_job`.
+    """
+    return get_subgraphs_of_the_jobs_bfs(
+        g, [jobId], level, level_down
+        )[jobId]
+
+
+def merge_subgraphs(subgraphs: list, node_type: str) -> dict:
+    """Une os subgrafos de vários nós em um único subgrafo.
+
+    As seções de lista são concatenadas sem nós ou arestas repetidos e os
+    nós consultados ficam em `tables` ou `jobs`, conforme `node_type`.
+    """
+    start_key = "table" if node_type == VERTEX_LABEL_TABLE else "job"
+    merged = {f"{start_key}s": []}
+    seen = {}
+    for subgraph in subgraphs:
+        for section, value in subgraph.items():
+            if section == start_key:
+                items, section = ([value] if value else []), f"{start_key}s"
+            else:
+                items = value
+            merged.setdefault(section, [])
+            keys = seen.setdefault(section, set())
+            for item in items:
+                key = item["id"] if "id" in item \
+                    else (item["from"], item["to"])
+                if key not in keys:
+                    keys.add(key)
+                    merged[section].append(item)
+    return merged
@@ -0,0 +1,278 @@
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from neptune_python_utils.gremlin_utils import GremlinUtils, Endpoints
+from utils.connection_manager import is_reconnectable_error
+from utils.constants import (
+    VERTEX_LABEL_JOB,
+    VERTEX_LABEL_JOB_RUN,
+    VERTEX_LABEL_EXECUTION_PLAN,
+    VERTEX_LABEL_TABLE,
+    VERTEX_LABEL_FEATURE,
+    VERTEX_LABEL_MODEL,
+    VERTEX_LABEL_DATASET,
+    VERTEX_LABEL_ANALYSIS,
+    VERTEX_LABEL_DASHBOARD,
+    EDGE_LATEST_PRODUCES,
+    EDGE_LATEST_CONSUMED_BY
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Elementos removidos por requisição e conexões paralelas
+RESET_CHUNK_SIZE = int(os.getenv("GRAPH_RESET_CHUNK_SIZE", "500"))
+RESET_WORKERS = int(os.getenv("GRAPH_RESET_WORKERS", "4"))
+# Lotes de IDs buscados por rodada, por conexão
+CHUNKS_PER_WORKER = 4
+RESET_MAX_RETRIES = 8
+RETRY_BASE_DELAY = 0.1
+RETRY_MAX_DELAY = 5.0
+
+# As arestas são removidas antes dos vértices: sem elas, cada drop de
+# vértice é barato e lotes paralelos não disputam os mesmos vértices. Os
+# labels derivados vêm primeiro e um passo final sem label remove o que
+# sobrar
+EDGE_LABELS = (
+    EDGE_LATEST_PRODUCES,
+    EDGE_LATEST_CONSUMED_BY,
+    "consumed_by",
+    "produce",
+    "has",
+    "schedule",
+    "belongs_to_table",
+    "has_feature",
+    "read_by",
+    "uses_dataset",
+    "generate_by",
+    None
+)
+VERTEX_LABELS = (
+    VERTEX_LABEL_EXECUTION_PLAN,
+    VERTEX_LABEL_JOB_RUN,
+    VERTEX_LABEL_JOB,
+    VERTEX_LABEL_TABLE,
+    VERTEX_LABEL_FEATURE,
+    VERTEX_LABEL_MODEL,
+    VERTEX_LABEL_DATASET,
+    VERTEX_LABEL_ANALYSIS,
+    VERTEX_LABEL_DASHBOARD,
+    None
+)
+
+
+def is_concurrent_modification(e: Exception) -> bool:
+    return "ConcurrentModificationException" in str(e)
+
+
+class _Connection:
+    """Conexão de uma thread do reset, aberta sob demanda."""
+
+    def __init__(self, endpoints: Endpoints):
+        self.gremlin_utils = GremlinUtils(endpoints=endpoints)
+        self.g = None
+
+    def traversal_source(self):
+        if self.g is None:
+            conn = self.gremlin_utils.remote_connection()
+            self.g = self.gremlin_utils.traversal_source(connection=conn)
+        return self.g
+
+    def reconnect(self) -> None:
+        self.close()
+        self.g = None
+
+    def close(self) -> None:
+        try:
+            self.gremlin_utils.close()
+        except Exception as e:
+            logger.warning(f"Error closing Neptune connection: {e}")
+
+
+class GraphReset:
+    """Remove todos os vértices e arestas do grafo em lotes limitados.
+
+    Para cada label (arestas primeiro, depois vértices), os IDs são
+    buscados em rodadas de até `workers * CHUNKS_PER_WORKER` lotes,
+    ordenados e divididos em faixas contíguas de `chunk_size` IDs. Cada
+    faixa é removida em uma requisição própria (`g.V(...).drop()` ou
+    `g.E(...).drop()`), distribuídas entre `workers` conexões. Os drops são
+    idempotentes, então lotes com ConcurrentModificationException ou falha
+    de conexão são repetidos com backoff exponencial.
+
+    Args:
+    -----
+    endpoints (Endpoints): Endpoints do writer.
+    workers (int): Número de conexões paralelas.
+    chunk_size (int): Número de elementos removidos por requisição.
+    on_progress (callable): Recebe um dicionário com o progresso a cada
+        rodada (`element`, `label`, `dropped`, `total`, `elapsedMs`).
+    max_retries (int): Tentativas adicionais por lote.
+    """
+
+    def __init__(
+        self,
+        endpoints: Endpoints,
+        workers: int = RESET_WORKERS,
+        chunk_size: int = RESET_CHUNK_SIZE,
+        on_progress=None,
+        max_retries: int = RESET_MAX_RETRIES
+    ):
+        self.endpoints = endpoints
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.max_retries = max_retries
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._total = 0
+        self._started_at = 0.0
+
+    def _connection(self) -> _Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = _Connection(self.endpoints)
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def run_with_retry(self, query):
+        """Executa `query(g)` na conexão da thread, repetindo a chamada
+        após ConcurrentModificationException ou erros de conexão."""
+        connection = self._connection()
+        attempt = 0
+        while True:
+            try:
+                return query(connection.traversal_source())
+            except Exception as e:
+                reconnectable = is_reconnectable_error(e)
+                if attempt >= self.max_retries or not (
+                        reconnectable or is_concurrent_modification(e)):
+                    raise
+                attempt += 1
+                if reconnectable:
+                    connection.reconnect()
+                delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+                logger.warning(
+                    f"Retrying graph reset chunk after error: {e} "
+                    f"(attempt {attempt})"
+                )
+                time.sleep(random.uniform(0, delay))
+
+    def _source(self, g, element: str, label: str):
+        source = g.V() if element == "V" else g.E()
+        return source.hasLabel(label) if label else source
+
+    def _drop_chunk(self, element: str, ids: list) -> int:
+        self.run_with_retry(
+            lambda g: (g.V(*ids) if element == "V" else g.E(*ids))
+            .drop().iterate()
+        )
+        return len(ids)
+
+    def drop(self, executor: ThreadPoolExecutor, element: str,
+             label: str = None) -> int:
+        """Remove todos os vértices (`element` "V") ou arestas ("E") com o
+        label informado, ou de qualquer label se None."""
+        fetch_size = self.chunk_size * self.workers * CHUNKS_PER_WORKER
+        dropped = 0
+        while True:
+            ids = self.run_with_retry(
+                lambda g: self._source(g, element, label)
+                .limit(fetch_size).id_().toList()
+            )
+            if not ids:
+                break
+            ids = sorted(ids, key=str)
+            chunks = [
+                ids[start:start + self.chunk_size]
+                for start in range(0, len(ids), self.chunk_size)
+            ]
+            dropped += sum(executor.map(
+                lambda chunk: self._drop_chunk(element, chunk), chunks
+            ))
+            self._total += len(ids)
+            self._report(element, label, dropped)
+        return dropped
+
+    def _report(self, element: str, label: str, dropped: int) -> None:
+        elapsed = time.perf_counter() - self._started_at
+        progress = {
+            "element": "vertices" if element == "V" else "edges",
+            "label": label,
+            "dropped": dropped,
+            "total": self._total,
+            "elapsedMs": round(elapsed * 1000, 2),
+        }
+        logger.info(
+            f"Dropped {dropped} {progress['element']} "
+            f"({label or 'any label'}), {self._total} elements in "
+            f"{elapsed:.1f}s"
+        )
+        if self.on_progress is not None:
+            self.on_progress(progress)
+
+    def run(self) -> dict:
+        """Remove todo o grafo.
+
+        Returns:
+        -------
+        dict: Número de arestas e vértices removidos e a duração total.
+        """
+        self._total = 0
+        self._started_at = time.perf_counter()
+        edges = vertices = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for label in EDGE_LABELS:
+                    edges += self.drop(executor, "E", label)
+                for label in VERTEX_LABELS:
+                    vertices += self.drop(executor, "V", label)
+        finally:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+            self._local = threading.local()
+        summary = {
+            "edges": edges,
+            "vertices": vertices,
+            "seconds": round(time.perf_counter() - self._started_at, 2),
+        }
+        logger.info(f"Graph reset finished: {summary}")
+        return summary
+
+
+def reset_graph(
+        endpoints: Endpoints,
+        workers: int = RESET_WORKERS,
+        chunk_size: int = RESET_CHUNK_SIZE,
+        on_progress=None
+        ) -> dict:
+    """Remove todos os vértices e arestas do grafo com `GraphReset`."""
+    return GraphReset(endpoints, workers, chunk_size, on_progress).run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Remove todos os vértices e arestas do grafo em lotes"
+    )
+    parser.add_argument("--endpoint", required=True)
+    parser.add_argument("--port", default="8182")
+    parser.add_argument("--workers", type=int, default=RESET_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=RESET_CHUNK_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    reset_graph(
+        Endpoints(neptune_endpoint=args.endpoint, neptune_port=args.port),
+        args.workers,
+        args.chunk_size
+    )
+
+
+if __name__ == "__main__":
+    main()
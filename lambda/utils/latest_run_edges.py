@@ -0,0 +1,169 @@
+import logging
+from gremlin_python.process.graph_traversal import __
+from neptune_python_utils.gremlin_utils import GremlinUtils
+from utils.data_reader import latest_run, get_owner_jobs
+from utils.stream_checkpoint import (
+    is_checkpoint,
+    load_checkpoint,
+    save_checkpoint
+)
+from utils.stream_reader import StreamReader
+from utils.constants import (
+    VERTEX_LABEL_JOB,
+    VERTEX_LABEL_TABLE,
+    EDGE_LATEST_PRODUCES,
+    EDGE_LATEST_CONSUMED_BY
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+CHECKPOINT_NAME = "latest_run_edges"
+REFRESH_BATCH_SIZE = 50
+STREAM_MAX_RECORDS = 100000
+
+
+def refresh_latest_run_edges(
+        g: GremlinUtils,
+        job_ids,
+        batch_size: int = REFRESH_BATCH_SIZE
+        ) -> int:
+    """Recria as arestas derivadas `latest_produces` (JOB -> TABLE) e
+    `latest_consumed_by` (TABLE -> JOB) dos jobs informados.
+
+    As arestas antigas de cada job são removidas e as novas são criadas a
+    partir da execução mais recente (`latest_run`), na mesma travessia.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils conectada ao writer.
+    job_ids (iterable): IDs dos jobs a atualizar.
+    batch_size (int): Número de jobs por travessia.
+
+    Returns:
+    -------
+    int: Número de jobs atualizados.
+    """
+    job_ids = list(job_ids)
+    for start in range(0, len(job_ids), batch_size):
+        batch = job_ids[start:start + batch_size]
+        g.V(*batch).hasLabel(VERTEX_LABEL_JOB).as_("job") \
+            .sideEffect(__.outE(EDGE_LATEST_PRODUCES).drop()) \
+            .sideEffect(__.inE(EDGE_LATEST_CONSUMED_BY).drop()) \
+            .sideEffect(
+                latest_run().out("has").out("produce")
+                .hasLabel(VERTEX_LABEL_TABLE).dedup()
+                .addE(EDGE_LATEST_PRODUCES).from_("job")
+            ) \
+            .sideEffect(
+                latest_run().out("has").in_("consumed_by")
+                .hasLabel(VERTEX_LABEL_TABLE).dedup()
+                .addE(EDGE_LATEST_CONSUMED_BY).to("job")
+            ) \
+            .iterate()
+    logger.info(f"Refreshed latest run edges of {len(job_ids)} jobs")
+    return len(job_ids)
+
+
+def rebuild_latest_run_edges(
+        g: GremlinUtils,
+        batch_size: int = REFRESH_BATCH_SIZE
+        ) -> int:
+    """Recria as arestas derivadas de todos os jobs do grafo."""
+    job_ids = g.V().hasLabel(VERTEX_LABEL_JOB).id_().toList()
+    return refresh_latest_run_edges(g, job_ids, batch_size)
+
+
+def changed_jobs(records) -> tuple:
+    """Retorna os jobs afetados por um conjunto de registros do stream.
+
+    Apenas as arestas `schedule`, `has`, `produce` e `consumed_by` e o
+    `dt_update` das execuções são considerados; as arestas derivadas
+    (`latest_*`) e os vértices CHECKPOINT, gravados pelos próprios
+    consumidores do stream, são ignorados.
+
+    Returns:
+    -------
+    tuple: Uma tupla contendo:
+        - jobs: IDs de jobs com execuções adicionadas ou removidas.
+        - runs: IDs de JOB_RUNs e EXECUTION_PLANs alterados, que ainda
+          precisam ser resolvidos para os jobs donos.
+        - last_event_id: `EventId` do último registro lido.
+    """
+    jobs, runs = set(), set()
+    last_event_id = None
+    for record in records:
+        last_event_id = record.event_id
+        data = record.data
+        if data.type == "e":
+            if data.value == "schedule":
+                jobs.add(data.frm)
+            elif data.value in ("has", "produce"):
+                runs.add(data.frm)
+            elif data.value == "consumed_by":
+                runs.add(data.to)
+        elif data.type == "vp" and data.key == "dt_update" \
+                and not is_checkpoint(data.id):
+            # A ordem das execuções depende de dt_update
+            runs.add(data.id)
+    return jobs, runs, last_event_id
+
+
+def sync_latest_run_edges(
+        g: GremlinUtils,
+        reader: StreamReader,
+        max_records: int = STREAM_MAX_RECORDS
+        ) -> dict:
+    """Atualiza as arestas derivadas a partir do Neptune Stream.
+
+    Lê os registros posteriores ao checkpoint salvo no grafo, identifica os
+    jobs com novas execuções (ou execuções alteradas) e recria apenas as
+    arestas desses jobs. Sem checkpoint, todas as arestas são recriadas.
+
+    As arestas recriadas e o próprio checkpoint também geram registros no
+    stream, ignorados por `changed_jobs`. O checkpoint só é gravado quando
+    algum job foi atualizado ou quando a leitura chega a `max_records`;
+    caso contrário, cada execução gravaria o checkpoint por causa dos
+    registros da gravação anterior.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils conectada ao writer.
+    reader (StreamReader): Leitor do stream de alterações do cluster.
+    max_records (int): Número máximo de registros lidos por execução.
+
+    Returns:
+    -------
+    dict: Resumo com o número de registros lidos, de jobs atualizados e as
+        métricas da leitura do stream.
+    """
+    last_event_id = load_checkpoint(g, CHECKPOINT_NAME)
+    if last_event_id is None:
+        latest_event_id = reader.stream.latest_event_id()
+        refreshed = rebuild_latest_run_edges(g)
+        save_checkpoint(g, CHECKPOINT_NAME, latest_event_id)
+        return {"records": 0, "jobs": refreshed}
+
+    reader.reset_metrics()
+    # Cada lote é processado ao chegar (o seguinte já está sendo lido);
+    # apenas os jobs afetados são acumulados até o refresh
+    jobs, records = set(), 0
+    for response in reader.batches_after(last_event_id, max_records):
+        page_jobs, runs, last_event_id = changed_jobs(response.records())
+        jobs |= page_jobs
+        run_ids = list(runs)
+        for start in range(0, len(run_ids), REFRESH_BATCH_SIZE):
+            jobs.update(
+                get_owner_jobs(g, run_ids[start:start + REFRESH_BATCH_SIZE])
+            )
+        records += response.total_records
+    if not jobs and records < max_records:
+        return {"records": records, "jobs": 0, "stream": reader.metrics()}
+
+    refreshed = refresh_latest_run_edges(g, jobs) if jobs else 0
+    save_checkpoint(g, CHECKPOINT_NAME, last_event_id)
+    return {
+        "records": records,
+        "jobs": refreshed,
+        "stream": reader.metrics(),
+    }
@@ -0,0 +1,642 @@
+import argparse
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from array import array
+from neptune_python_utils.gremlin_utils import GremlinUtils
+from neptune_python_utils.streams import EventId
+from utils.data_reader import (
+    get_subgraphs_of_the_tables_bfs,
+    get_subgraphs_of_the_jobs_bfs
+)
+from utils.lineage_snapshot import LineageSnapshot, LABELS, read_export
+from utils.constants import VERTEX_LABEL_JOB, VERTEX_LABEL_TABLE
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+CLOSURE_MAGIC = b"LCLS"
+CLOSURE_VERSION = 1
+# magic, versão, número de nós e de componentes, commit e operação do
+# Neptune Stream (zero sem posição) e o início de cada seção do arquivo
+HEADER = struct.Struct("<4sIIIQI8Q")
+# Nós em ciclos não têm caminho mais longo
+UNBOUNDED = 0xFFFF
+ZLIB_LEVEL = 6
+# Com profundidades menores que o caminho mais longo (ou em ciclos), o fecho
+# só é carregado se tiver no máximo este número de tabelas
+CLOSURE_PREFETCH_MAX_TABLES = int(
+    os.getenv("LINEAGE_CLOSURE_PREFETCH_MAX_TABLES", "2000")
+)
+# Intervalo mínimo, em segundos, entre verificações do arquivo do fecho
+CLOSURE_CHECK_INTERVAL = int(
+    os.getenv("LINEAGE_CLOSURE_CHECK_INTERVAL", "5")
+)
+
+CLOSURE_LABELS = (VERTEX_LABEL_TABLE, VERTEX_LABEL_JOB)
+CLOSURE_CODES = {label: code for code, label in enumerate(CLOSURE_LABELS)}
+
+
+def lineage_edges(snapshot: LineageSnapshot) -> tuple:
+    """Grafo JOB/TABLE do snapshot usado no fecho.
+
+    Uma tabela aponta para os jobs que a consomem e um job para as tabelas
+    que produz, em qualquer execução. As BFS do `data_reader` seguem apenas
+    a execução mais recente em parte dos saltos, então o fecho deste grafo
+    contém os nós que elas visitam.
+
+    Returns:
+    -------
+    tuple: Os índices (no snapshot) das tabelas e jobs e as listas de
+        sucessores de cada um, indexadas pela posição em `nodes`.
+    """
+    codes = {LABELS.index(label) for label in CLOSURE_LABELS}
+    nodes = [
+        index for index, code in enumerate(snapshot.labels) if code in codes
+    ]
+    position = {index: number for number, index in enumerate(nodes)}
+    successors = [[] for _ in nodes]
+    table_code = LABELS.index(VERTEX_LABEL_TABLE)
+    for number, index in enumerate(nodes):
+        if snapshot.labels[index] != table_code:
+            continue
+        for job in snapshot.neighbors("consumers", index):
+            successors[number].append(position[job])
+        for job in snapshot.neighbors("producers", index):
+            successors[position[job]].append(number)
+    return nodes, [list(dict.fromkeys(values)) for values in successors]
+
+
+def strongly_connected(successors: list) -> list:
+    """Componentes fortemente conexas (Tarjan, iterativo), em ordem
+    topológica: cada componente vem antes das que ela alcança."""
+    size = len(successors)
+    order = [0] * size
+    low = [0] * size
+    visited = [False] * size
+    on_stack = [False] * size
+    stack, components = [], []
+    counter = 0
+    for root in range(size):
+        if visited[root]:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                visited[node] = on_stack[node] = True
+                order[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+            if child < len(successors[node]):
+                work.append((node, child + 1))
+                target = successors[node][child]
+                if not visited[target]:
+                    work.append((target, 0))
+                elif on_stack[target]:
+                    low[node] = min(low[node], order[target])
+                continue
+            for target in successors[node]:
+                if on_stack[target]:
+                    low[node] = min(low[node], low[target])
+            if low[node] == order[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    # Tarjan emite cada componente depois das que ela alcança
+    components.reverse()
+    return components
+
+
+def bitmap_positions(bitmap: int) -> list:
+    """Posições dos bits ligados de um inteiro, em ordem crescente."""
+    return [match.start() for match in re.finditer("1", bin(bitmap)[:1:-1])]
+
+
+def compress_bitmap(bitmap: int) -> bytes:
+    return zlib.compress(
+        bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"),
+        ZLIB_LEVEL
+    )
+
+
+def component_neighbors(components: list, successors: list,
+                        component_of: list, reverse: bool) -> list:
+    """Componentes vizinhas de cada componente: predecessoras (`reverse`)
+    ou sucessoras."""
+    neighbors = [set() for _ in components]
+    for number, component in enumerate(components):
+        for node in component:
+            for target in successors[node]:
+                other = component_of[target]
+                if other == number:
+                    continue
+                if reverse:
+                    neighbors[other].add(number)
+                else:
+                    neighbors[number].add(other)
+    return neighbors
+
+
+def is_cyclic(component: list, successors: list) -> bool:
+    return len(component) > 1 or any(
+        node in successors[node] for node in component
+    )
+
+
+def longest_paths(components: list, successors: list, component_of: list,
+                  reverse: bool) -> list:
+    """Caminho mais longo, em arestas, de cada componente até um
+    ascendente (`reverse`) ou descendente. `UNBOUNDED` para componentes em
+    ciclos ou que alcançam um ciclo."""
+    neighbors = component_neighbors(
+        components, successors, component_of, reverse
+    )
+    lengths = [0] * len(components)
+    numbers = range(len(components))
+    for number in numbers if reverse else reversed(numbers):
+        length = UNBOUNDED \
+            if is_cyclic(components[number], successors) else 0
+        for other in neighbors[number]:
+            length = max(length, min(UNBOUNDED, lengths[other] + 1))
+        lengths[number] = length
+    return lengths
+
+
+def closure_bitmaps(components: list, successors: list,
+                    component_of: list, reverse: bool):
+    """Calcula, por programação dinâmica sobre as componentes em ordem
+    topológica, o bitmap dos ascendentes (`reverse`) ou descendentes de
+    cada componente.
+
+    Os bits são os números dos nós. O bitmap de uma componente é a união
+    dos bitmaps (e dos membros) das vizinhas, então subárvores
+    compartilhadas são calculadas uma única vez; cada bitmap é descartado
+    assim que a última componente que depende dele é calculada.
+
+    Yields:
+    -------
+    tuple: (componente, bitmap).
+    """
+    neighbors = component_neighbors(
+        components, successors, component_of, reverse
+    )
+    pending = [0] * len(components)
+    for values in neighbors:
+        for other in values:
+            pending[other] += 1
+
+    members, bitmaps = {}, {}
+    numbers = range(len(components))
+    for number in numbers if reverse else reversed(numbers):
+        component = components[number]
+        bitmap = 0
+        for other in neighbors[number]:
+            bitmap |= bitmaps[other] | members[other]
+            pending[other] -= 1
+            if pending[other] == 0:
+                del bitmaps[other], members[other]
+        members[number] = 0
+        for node in component:
+            members[number] |= 1 << node
+        if is_cyclic(component, successors):
+            bitmap |= members[number]
+        if pending[number]:
+            bitmaps[number] = bitmap
+        else:
+            del members[number]
+        yield number, bitmap
+
+
+def topological_numbering(successors: list) -> tuple:
+    """Renumera os nós na ordem topológica das componentes fortemente
+    conexas, para que os bitmaps dos ascendentes fiquem nos bits baixos.
+
+    Returns:
+    -------
+    tuple: A ordem (número antigo de cada posição), as componentes e os
+        sucessores com a nova numeração e a componente de cada nó.
+    """
+    components = strongly_connected(successors)
+    order = [node for component in components for node in component]
+    renumber = [0] * len(order)
+    for number, node in enumerate(order):
+        renumber[node] = number
+    successors = [
+        [renumber[target] for target in successors[node]] for node in order
+    ]
+    start = 0
+    for number, component in enumerate(components):
+        components[number] = list(range(start, start + len(component)))
+        start += len(component)
+    component_of = [0] * len(order)
+    for number, component in enumerate(components):
+        for node in component:
+            component_of[node] = number
+    return order, components, successors, component_of
+
+
+def write_closure(path: str, ids: list, labels: bytes, component_of: list,
+                  lengths: array, blobs: list,
+                  event_id: EventId = None) -> None:
+    """Grava o arquivo do fecho (formato de `LineageClosure`).
+
+    Args:
+    -----
+    path (str): Arquivo de destino.
+    ids (list): ID de cada nó, pelo número do nó.
+    labels (bytes): Código (`CLOSURE_CODES`) de cada nó.
+    component_of (list): Componente de cada nó.
+    lengths (array): Caminhos mais longos das componentes, para cima e
+        depois para baixo.
+    blobs (list): Bitmaps comprimidos: ascendentes da componente c em 2c e
+        descendentes em 2c + 1.
+    event_id (EventId): Posição do Neptune Stream refletida no fecho.
+    """
+    size, count = len(ids), len(blobs) // 2
+    encoded = [vertex_id.encode() for vertex_id in ids]
+    id_offsets = array("Q", [0])
+    for value in encoded:
+        id_offsets.append(id_offsets[-1] + len(value))
+    by_id = array("I", sorted(range(size), key=ids.__getitem__))
+    set_offsets = array("Q", [0])
+    for blob in blobs:
+        set_offsets.append(set_offsets[-1] + len(blob))
+
+    sections = [
+        id_offsets.tobytes(),
+        b"".join(encoded),
+        by_id.tobytes(),
+        bytes(labels),
+        array("I", component_of).tobytes(),
+        lengths.tobytes(),
+        set_offsets.tobytes(),
+    ]
+    offsets, position = [], HEADER.size
+    with open(path, "wb") as file:
+        file.write(b"\0" * HEADER.size)
+        for section in sections:
+            padding = -position % 8
+            file.write(b"\0" * padding)
+            position += padding
+            offsets.append(position)
+            file.write(section)
+            position += len(section)
+        offsets.append(position)
+        for blob in blobs:
+            file.write(blob)
+        file.seek(0)
+        file.write(HEADER.pack(
+            CLOSURE_MAGIC, CLOSURE_VERSION, size, count,
+            event_id.commit_num if event_id else 0,
+            event_id.op_num if event_id else 0,
+            *offsets
+        ))
+
+
+class LineageClosure:
+    """Fecho transitivo da linhagem JOB/TABLE, lido de um arquivo mapeado
+    em memória (`mmap`).
+
+    Para cada componente fortemente conexa de tabelas e jobs (um único nó
+    fora de ciclos) o arquivo guarda os bitmaps comprimidos (zlib) dos
+    ascendentes e descendentes e o caminho mais longo em cada direção. Os
+    nós são numerados em ordem topológica, então os bitmaps dos ascendentes
+    ficam concentrados nos bits baixos e comprimem bem. Apenas os bitmaps
+    consultados são descomprimidos.
+
+    Seções do arquivo, depois do cabeçalho (`HEADER`):
+    - offsets (Q) e bytes UTF-8 dos IDs, na ordem topológica;
+    - nós ordenados por ID (I), para a busca binária;
+    - labels (B) e componente (I) de cada nó;
+    - caminhos mais longos (H) das componentes, para cima e para baixo;
+    - offsets (Q) dos bitmaps: ascendentes em 2c e descendentes em 2c + 1;
+    - bitmaps.
+    """
+
+    def __init__(self, buffer, close=None):
+        self.buffer = buffer
+        self._close = close
+        (magic, version, size, count, commit_num, op_num,
+         *sections) = HEADER.unpack_from(buffer)
+        if magic != CLOSURE_MAGIC or version != CLOSURE_VERSION:
+            raise ValueError(
+                f"Unsupported lineage closure file: {magic!r} v{version}"
+            )
+        self.size = size
+        self.count = count
+        self.event_id = EventId(commit_num, op_num) if commit_num else None
+        view = memoryview(buffer)
+        (id_offsets, id_bytes, by_id, labels, components, lengths,
+         set_offsets, sets) = sections
+
+        def section(start: int, length: int, code: str) -> memoryview:
+            return view[start:start + length].cast(code)
+
+        self.id_offsets = section(id_offsets, 8 * (size + 1), "Q")
+        self.id_bytes = id_bytes
+        self.by_id = section(by_id, 4 * size, "I")
+        self.labels = section(labels, size, "B")
+        self.components = section(components, 4 * size, "I")
+        self.lengths = section(lengths, 4 * count, "H")
+        self.set_offsets = section(set_offsets, 8 * (2 * count + 1), "Q")
+        self.sets = sets
+
+    @classmethod
+    def load(cls, path: str) -> "LineageClosure":
+        started_at = time.perf_counter()
+        file = open(path, "rb")
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        file.close()
+        closure = cls(buffer, close=buffer.close)
+        logger.info(
+            f"Mapped lineage closure with {closure.size} nodes "
+            f"({len(buffer) / 2 ** 20:.1f} MiB) in "
+            f"{(time.perf_counter() - started_at) * 1000:.0f} ms"
+        )
+        return closure
+
+    def close(self) -> None:
+        for view in (self.id_offsets, self.by_id, self.labels,
+                     self.components, self.lengths, self.set_offsets):
+            view.release()
+        if self._close is not None:
+            self._close()
+
+    # Construção
+
+    @staticmethod
+    def build(snapshot: LineageSnapshot, path: str,
+              event_id: EventId = None) -> int:
+        """Calcula o fecho dos jobs e tabelas do snapshot e grava o arquivo
+        em `path`.
+
+        Returns:
+        -------
+        int: Número de nós gravados.
+        """
+        nodes, successors = lineage_edges(snapshot)
+        order, components, successors, component_of = \
+            topological_numbering(successors)
+        count = len(components)
+        lengths = array("H", [0]) * (2 * count)
+        blobs = [b""] * (2 * count)
+        for direction, reverse in ((0, True), (1, False)):
+            lengths[count * direction:count * (direction + 1)] = array(
+                "H", longest_paths(
+                    components, successors, component_of, reverse
+                )
+            )
+            for number, bitmap in closure_bitmaps(
+                    components, successors, component_of, reverse):
+                blobs[2 * number + direction] = compress_bitmap(bitmap)
+        write_closure(
+            path,
+            [snapshot.ids[nodes[node]] for node in order],
+            bytes(
+                CLOSURE_CODES[LABELS[snapshot.labels[nodes[node]]]]
+                for node in order
+            ),
+            component_of,
+            lengths,
+            blobs,
+            event_id
+        )
+        return len(order)
+
+    # Consultas
+
+    def vertex_id(self, node: int) -> str:
+        start = self.id_bytes + self.id_offsets[node]
+        end = self.id_bytes + self.id_offsets[node + 1]
+        return bytes(self.buffer[start:end]).decode()
+
+    def node(self, vertex_id: str) -> int:
+        """Número do nó com o ID informado, ou None fora do fecho."""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.vertex_id(self.by_id[middle]) < vertex_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.size and \
+                self.vertex_id(self.by_id[low]) == vertex_id:
+            return self.by_id[low]
+        return None
+
+    def label(self, node: int) -> str:
+        return CLOSURE_LABELS[self.labels[node]]
+
+    def longest_path(self, node: int, descendants: bool) -> int:
+        """Caminho mais longo, em arestas, até um ascendente ou
+        descendente. `UNBOUNDED` para nós em ciclos."""
+        return self.lengths[
+            self.count * descendants + self.components[node]
+        ]
+
+    def members(self, node: int, descendants: bool) -> list:
+        """Números dos ascendentes ou descendentes do nó."""
+        index = 2 * self.components[node] + descendants
+        start = self.sets + self.set_offsets[index]
+        end = self.sets + self.set_offsets[index + 1]
+        bitmap = int.from_bytes(
+            zlib.decompress(self.buffer[start:end]), "little"
+        )
+        return bitmap_positions(bitmap)
+
+    def ancestors(self, vertex_id: str) -> list:
+        """IDs das tabelas e jobs ascendentes, ou None fora do fecho."""
+        node = self.node(vertex_id)
+        if node is None:
+            return None
+        return [self.vertex_id(member) for member in self.members(node, 0)]
+
+    def descendants(self, vertex_id: str) -> list:
+        """IDs das tabelas e jobs descendentes, ou None fora do fecho."""
+        node = self.node(vertex_id)
+        if node is None:
+            return None
+        return [self.vertex_id(member) for member in self.members(node, 1)]
+
+    def lineage_members(self, vertex_ids: list, level: int,
+                        level_down: int) -> tuple:
+        """Jobs e tabelas que as BFS de `vertex_ids` podem visitar.
+
+        Os ascendentes de um nó incluem os produtores (em qualquer execução)
+        de todas as tabelas ascendentes, e os descendentes os consumidores
+        das descendentes, então os membros do fecho são um superconjunto dos
+        nós visitados pela BFS no grafo em que o fecho foi calculado.
+
+        Cada direção é carregada inteira quando `level`/`level_down` cobre
+        o caminho mais longo do nó. Com profundidades menores (ou nós em
+        ciclos), o fecho pode trazer mais nós do que a BFS visita e só é
+        carregado com até `CLOSURE_PREFETCH_MAX_TABLES` tabelas. IDs fora
+        do fecho (criados depois do arquivo) são ignorados e a BFS consulta
+        as suas tabelas nível a nível.
+
+        Returns:
+        -------
+        tuple: Os jobs e as tabelas para cima e para baixo, no formato de
+            `LineageAdjacency.preload`.
+        """
+        table = CLOSURE_CODES[VERTEX_LABEL_TABLE]
+        jobs, up, down = set(), set(), set()
+        for vertex_id in vertex_ids:
+            node = self.node(vertex_id)
+            if node is None:
+                continue
+            for tables, descendants, depth in \
+                    ((up, 0, level), (down, 1, level_down)):
+                members = self.members(node, descendants)
+                member_tables = [
+                    member for member in members
+                    if self.labels[member] == table
+                ]
+                if (self.longest_path(node, descendants) + 1) // 2 > depth \
+                        and len(member_tables) > CLOSURE_PREFETCH_MAX_TABLES:
+                    continue
+                if self.labels[node] == table:
+                    tables.add(vertex_id)
+                tables.update(
+                    self.vertex_id(member) for member in member_tables
+                )
+                jobs.update(
+                    self.vertex_id(member) for member in members
+                    if self.labels[member] != table
+                )
+        return jobs, up, down
+
+
+class ClosureStore:
+    """Fecho da linhagem do container, mapeado na primeira consulta.
+
+    O fecho indica quais jobs e tabelas a BFS pode visitar; a adjacência
+    deles é lida do Neptune em uma única consulta, com os produtores e
+    consumidores das tabelas no estado atual do grafo, e as BFS seguem essa
+    adjacência. Um arquivo desatualizado custa consultas a mais (para os
+    nós alcançados fora do fecho), não respostas erradas.
+
+    Quando o arquivo é substituído (por exemplo pelo consumidor do stream
+    de `utils/lineage_closure_index.py`, em um volume compartilhado), o
+    fecho é mapeado de novo na primeira consulta depois de
+    `check_interval` segundos.
+
+    Args:
+    -----
+    path (str): Arquivo do fecho (em `/tmp`, em uma Lambda layer ou no EFS).
+    check_interval (int): Intervalo mínimo, em segundos, entre verificações
+        da data de modificação do arquivo.
+    """
+
+    def __init__(self, path: str,
+                 check_interval: int = CLOSURE_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.closure = None
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._last_check = 0.0
+
+    def get(self) -> LineageClosure:
+        with self._lock:
+            now = time.time()
+            if self.closure is not None and \
+                    now - self._last_check < self.check_interval:
+                return self.closure
+            self._last_check = now
+            mtime = os.stat(self.path).st_mtime_ns
+            if self.closure is None or mtime != self._mtime:
+                # O mapeamento anterior continua válido para as consultas
+                # em andamento e é liberado pelo coletor
+                self.closure = LineageClosure.load(self.path)
+                self._mtime = mtime
+            return self.closure
+
+    def get_subgraph_of_the_table(
+            self,
+            g: GremlinUtils,
+            tableId: str,
+            level: int = 10,
+            level_down: int = None
+            ) -> dict:
+        """Mesmo contrato de `get_subgraph_of_the_table`, com a adjacência
+        dos membros do fecho carregada pelos IDs."""
+        return get_subgraphs_of_the_tables_bfs(
+            g, [tableId], level, level_down, closure=self.get()
+            )[tableId]
+
+    def get_subgraph_of_the_job(
+            self,
+            g: GremlinUtils,
+            jobId: str,
+            level: int = 10,
+            level_down: int = None
+            ) -> dict:
+        """Mesmo contrato de `get_subgraph_of_the_job`, com a adjacência
+        dos membros do fecho carregada pelos IDs."""
+        return get_subgraphs_of_the_jobs_bfs(
+            g, [jobId], level, level_down, closure=self.get()
+            )[jobId]
+
+    def get_subgraphs(self, g: GremlinUtils, node_type: str,
+                      node_names: list, level: int,
+                      level_down: int = None) -> dict:
+        """Subgrafos de vários nós, como no modo em lote do engine bfs."""
+        batch_reader = get_subgraphs_of_the_tables_bfs \
+            if node_type == VERTEX_LABEL_TABLE \
+            else get_subgraphs_of_the_jobs_bfs
+        return batch_reader(
+            g, node_names, level, level_down, closure=self.get()
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Calcula o fecho transitivo da linhagem a partir de uma "
+        "exportação completa do grafo ou de um snapshot"
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--input",
+        help="Arquivo JSON (formato de utils/data.json) ou diretório CSV"
+    )
+    source.add_argument(
+        "--snapshot", help="Snapshot gravado por utils/lineage_snapshot.py"
+    )
+    parser.add_argument("--output", required=True)
+    parser.add_argument(
+        "--commit-num", type=int,
+        help="Commit do Neptune Stream no momento da exportação"
+    )
+    parser.add_argument("--op-num", type=int, default=1)
+    args = parser.parse_args()
+
+    started_at = time.perf_counter()
+    event_id = EventId(args.commit_num, args.op_num) \
+        if args.commit_num else None
+    if args.snapshot:
+        snapshot = LineageSnapshot.load(args.snapshot)
+        event_id = event_id or snapshot.event_id
+    else:
+        snapshot = LineageSnapshot.build(read_export(args.input), event_id)
+    size = LineageClosure.build(snapshot, args.output, event_id)
+    print(
+        f"{size:,} nodes, "
+        f"{os.path.getsize(args.output) / 2 ** 20:.1f} MiB on disk, "
+        f"built in {time.perf_counter() - started_at:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
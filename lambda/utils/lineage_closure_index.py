@@ -0,0 +1,735 @@
+import argparse
+import logging
+import os
+import pickle
+import time
+from array import array
+from neptune_python_utils.gremlin_utils import Endpoints
+from neptune_python_utils.streams import EventId, NeptuneStream
+from utils.lineage_snapshot import RUN_EDGES, read_export
+from utils.stream_reader import StreamReader
+from utils.lineage_closure import (
+    CLOSURE_CODES,
+    UNBOUNDED,
+    bitmap_positions,
+    closure_bitmaps,
+    compress_bitmap,
+    is_cyclic,
+    longest_paths,
+    strongly_connected,
+    topological_numbering,
+    write_closure
+)
+from utils.constants import VERTEX_LABEL_JOB, VERTEX_LABEL_TABLE
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+INDEX_VERSION = 2
+# Registros no log do índice a partir dos quais o checkpoint regrava o
+# índice inteiro e esvazia o log (compactação)
+INDEX_COMPACT_RECORDS = int(
+    os.getenv("LINEAGE_CLOSURE_COMPACT_RECORDS", "200000")
+)
+# Registros aplicados entre dois checkpoints
+STREAM_MAX_RECORDS = int(
+    os.getenv("LINEAGE_CLOSURE_STREAM_MAX_RECORDS", "10000")
+)
+# Intervalo (s) entre leituras do stream sem registros novos
+STREAM_POLL_INTERVAL = int(
+    os.getenv("LINEAGE_CLOSURE_POLL_INTERVAL", "10")
+)
+
+TABLE_CODE = CLOSURE_CODES[VERTEX_LABEL_TABLE]
+JOB_CODE = CLOSURE_CODES[VERTEX_LABEL_JOB]
+
+
+def replace_file(path: str, write) -> None:
+    """Grava `path` por meio de um arquivo temporário renomeado no final,
+    para que leitores (e reinícios) nunca vejam um arquivo pela metade."""
+    temporary = f"{path}.tmp"
+    write(temporary)
+    os.replace(temporary, path)
+
+
+def log_path(path: str) -> str:
+    """Log das operações aplicadas depois da última gravação completa do
+    índice em `path`."""
+    return f"{path}.log"
+
+
+class ClosureIndex:
+    """Fecho transitivo da linhagem JOB/TABLE mantido incrementalmente
+    pelo Neptune Stream.
+
+    O grafo do fecho é o mesmo de `LineageClosure`: uma tabela aponta para
+    os jobs que a consomem e um job para as tabelas que produz, em qualquer
+    execução. Para derivá-lo dos registros do stream, o índice guarda a
+    estrutura das execuções (`schedule` e `has`) e as tabelas produzidas e
+    consumidas por plano (`produce` e `consumed_by`), além do número de
+    caminhos job-tabela que sustentam cada aresta do fecho. Uma aresta só
+    entra no fecho quando o primeiro caminho aparece e só sai quando o
+    último é removido.
+
+    Os ascendentes e descendentes de cada nó são bitmaps (inteiros) pelos
+    números dos nós. A cada lote de registros:
+    - arestas removidas recalculam apenas a região afetada: os
+      descendentes do destino (ascendentes) e os ascendentes da origem
+      (descendentes), por programação dinâmica sobre as componentes
+      fortemente conexas da região;
+    - arestas novas unem os ascendentes da origem aos descendentes do
+      destino, e nada é feito se a origem já alcançava o destino.
+
+    Os caminhos mais longos e as componentes fortemente conexas também são
+    mantidos por nó e recalculados apenas para os nós que alcançam (ou são
+    alcançados por) uma aresta alterada, então `write_closure` não percorre
+    o grafo inteiro.
+
+    O índice é gravado inteiro por `save` e, a cada `checkpoint`, apenas as
+    operações aplicadas desde o checkpoint anterior são acrescentadas a um
+    log; o log é compactado (o índice regravado inteiro) a cada
+    `INDEX_COMPACT_RECORDS` operações. O `EventId` do último registro
+    aplicado é gravado com cada entrada, então um reinício (`load`) continua
+    exatamente do registro seguinte.
+
+    Args:
+    -----
+    event_id (EventId): Posição do Neptune Stream refletida no índice.
+    """
+
+    def __init__(self, event_id: EventId = None):
+        self.event_id = event_id
+        self.ids = []
+        self.numbers = {}
+        self.labels = bytearray()
+        # Arestas do fecho, com o número de caminhos de cada uma
+        self.successors = []
+        self.predecessors = []
+        self.ancestors = []
+        self.descendants = []
+        # Caminhos mais longos, para cima e para baixo, e o menor nó da
+        # componente fortemente conexa de cada nó
+        self.lengths = (array("H"), array("H"))
+        self.component = []
+        # Estrutura das execuções
+        self.run_job = {}
+        self.plan_run = {}
+        self.run_plans = {}
+        self.plan_tables = {"produce": {}, "consumed_by": {}}
+        # Arestas do fecho alteradas no lote e se existiam antes dele
+        self._touched = {}
+        # Bitmaps comprimidos na última gravação do fecho, por nó
+        self._blobs = ({}, {})
+        # Operações aplicadas desde o último checkpoint e registradas no log
+        # desde a última compactação
+        self._log = []
+        self._logged = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def node(self, vertex_id: str, label_code: int) -> int:
+        number = self.numbers.get(vertex_id)
+        if number is None:
+            number = self.numbers[vertex_id] = len(self.ids)
+            self.ids.append(vertex_id)
+            self.labels.append(label_code)
+            self.successors.append({})
+            self.predecessors.append({})
+            self.ancestors.append(0)
+            self.descendants.append(0)
+            for lengths in self.lengths:
+                lengths.append(0)
+            self.component.append(number)
+        return number
+
+    # Estrutura das execuções
+
+    def _count(self, source: int, target: int, delta: int) -> None:
+        """Soma `delta` aos caminhos da aresta do fecho source -> target."""
+        successors = self.successors[source]
+        before = successors.get(target, 0)
+        self._touched.setdefault((source, target), before > 0)
+        after = before + delta
+        if after > 0:
+            successors[target] = after
+            self.predecessors[target][source] = after
+        else:
+            successors.pop(target, None)
+            self.predecessors[target].pop(source, None)
+
+    def _link(self, job_id: str, edge_label: str, tables: dict,
+              sign: int) -> None:
+        job = self.node(job_id, JOB_CODE)
+        for table_id, count in tables.items():
+            table = self.node(table_id, TABLE_CODE)
+            if edge_label == "produce":
+                self._count(job, table, sign * count)
+            else:
+                self._count(table, job, sign * count)
+
+    def _link_plan(self, job_id: str, plan_id: str, sign: int) -> None:
+        for edge_label, tables in self.plan_tables.items():
+            if plan_id in tables:
+                self._link(job_id, edge_label, tables[plan_id], sign)
+
+    def _plan_job(self, plan_id: str) -> str:
+        return self.run_job.get(self.plan_run.get(plan_id))
+
+    def add_edge(self, edge_label: str, from_id: str, to_id: str) -> None:
+        if edge_label == "schedule":
+            if to_id in self.run_job:
+                return
+            self.run_job[to_id] = from_id
+            for plan_id in self.run_plans.get(to_id, ()):
+                self._link_plan(from_id, plan_id, 1)
+        elif edge_label == "has":
+            if to_id in self.plan_run:
+                return
+            self.plan_run[to_id] = from_id
+            self.run_plans.setdefault(from_id, set()).add(to_id)
+            job_id = self.run_job.get(from_id)
+            if job_id is not None:
+                self._link_plan(job_id, to_id, 1)
+        else:
+            # consumed_by vai da tabela para o plano
+            plan_id, table_id = (from_id, to_id) \
+                if edge_label == "produce" else (to_id, from_id)
+            tables = self.plan_tables[edge_label].setdefault(plan_id, {})
+            tables[table_id] = tables.get(table_id, 0) + 1
+            job_id = self._plan_job(plan_id)
+            if job_id is not None:
+                self._link(job_id, edge_label, {table_id: 1}, 1)
+
+    def remove_edge(self, edge_label: str, from_id: str, to_id: str) -> None:
+        if edge_label == "schedule":
+            if self.run_job.get(to_id) != from_id:
+                return
+            for plan_id in self.run_plans.get(to_id, ()):
+                self._link_plan(from_id, plan_id, -1)
+            del self.run_job[to_id]
+        elif edge_label == "has":
+            if self.plan_run.get(to_id) != from_id:
+                return
+            job_id = self.run_job.get(from_id)
+            if job_id is not None:
+                self._link_plan(job_id, to_id, -1)
+            del self.plan_run[to_id]
+            self.run_plans[from_id].discard(to_id)
+            if not self.run_plans[from_id]:
+                del self.run_plans[from_id]
+        else:
+            plan_id, table_id = (from_id, to_id) \
+                if edge_label == "produce" else (to_id, from_id)
+            tables = self.plan_tables[edge_label].get(plan_id, {})
+            if table_id not in tables:
+                return
+            tables[table_id] -= 1
+            if not tables[table_id]:
+                del tables[table_id]
+                if not tables:
+                    del self.plan_tables[edge_label][plan_id]
+            job_id = self._plan_job(plan_id)
+            if job_id is not None:
+                self._link(job_id, edge_label, {table_id: 1}, -1)
+
+    # Fecho
+
+    def _recompute(self, region: int, inserted: set, up: bool) -> int:
+        """Recalcula os ascendentes (`up`) ou descendentes dos nós de
+        `region` (bitmap) sem as arestas de `inserted`, a partir dos nós de
+        fora da região, que não mudam.
+
+        Returns:
+        -------
+        int: Número de nós com conjuntos alterados.
+        """
+        nodes = bitmap_positions(region)
+        local = {node: number for number, node in enumerate(nodes)}
+        sets = self.ancestors if up else self.descendants
+        before = self.predecessors if up else self.successors
+        after = self.successors if up else self.predecessors
+
+        def kept(source, target):
+            return ((source, target) if up else (target, source)) \
+                not in inserted
+
+        successors = [
+            [local[target] for target in after[node]
+             if target in local and kept(node, target)]
+            for node in nodes
+        ]
+        # Em ordem topológica (no sentido de `up`): as componentes
+        # anteriores da região já foram recalculadas
+        changed = 0
+        for component in strongly_connected(successors):
+            members = [nodes[number] for number in component]
+            inside = set(component)
+            bitmap = 0
+            for node in members:
+                for other in before[node]:
+                    if local.get(other) in inside or not kept(other, node):
+                        continue
+                    bitmap |= sets[other] | 1 << other
+            if is_cyclic(component, successors):
+                for node in members:
+                    bitmap |= 1 << node
+            for node in members:
+                if sets[node] != bitmap:
+                    sets[node] = bitmap
+                    changed += 1
+        return changed
+
+    def _insert(self, source: int, target: int) -> int:
+        """Une os ascendentes de `source` aos descendentes de `target`.
+
+        Returns:
+        -------
+        int: Número de nós com conjuntos alterados.
+        """
+        if self.ancestors[target] >> source & 1:
+            return 0
+        up = self.ancestors[source] | 1 << source
+        down = self.descendants[target] | 1 << target
+        affected = 0
+        for sets, nodes, bitmap in ((self.ancestors, down, up),
+                                    (self.descendants, up, down)):
+            for node in bitmap_positions(nodes):
+                value = sets[node] | bitmap
+                if value != sets[node]:
+                    sets[node] = value
+                    affected += 1
+        return affected
+
+    def _update_lengths(self, region: int, up: bool) -> None:
+        """Recalcula os caminhos mais longos para cima (`up`) ou para baixo
+        e as componentes dos nós de `region` (bitmap), a partir dos nós de
+        fora da região, que não mudam."""
+        nodes = bitmap_positions(region)
+        local = {node: number for number, node in enumerate(nodes)}
+        neighbors = self.predecessors if up else self.successors
+        lengths = self.lengths[0 if up else 1]
+        successors = [
+            [local[other] for other in neighbors[node] if other in local]
+            for node in nodes
+        ]
+        # Cada componente vem antes das que ela alcança
+        for component in reversed(strongly_connected(successors)):
+            members = [nodes[number] for number in component]
+            inside = set(members)
+            length = UNBOUNDED if is_cyclic(component, successors) else 0
+            for node in members:
+                for other in neighbors[node]:
+                    if other not in inside:
+                        length = max(
+                            length, min(UNBOUNDED, lengths[other] + 1)
+                        )
+            representative = min(members)
+            for node in members:
+                lengths[node] = length
+                self.component[node] = representative
+
+    def _regions(self, edges: list) -> tuple:
+        """Nós que alcançam a origem e nós alcançados pelo destino das
+        arestas, com os conjuntos atuais."""
+        sources = targets = 0
+        for source, target in edges:
+            sources |= self.ancestors[source] | 1 << source
+            targets |= self.descendants[target] | 1 << target
+        return sources, targets
+
+    def _update_closure(self) -> dict:
+        """Atualiza os conjuntos, os caminhos mais longos e as componentes
+        com as arestas alteradas no lote."""
+        changes = [
+            (edge, existed) for edge, existed in self._touched.items()
+            if existed != (edge[1] in self.successors[edge[0]])
+        ]
+        self._touched = {}
+        # Os caminhos mais longos só mudam nos nós que alcançam uma aresta
+        # alterada, antes ou depois do lote
+        sources, targets = self._regions([edge for edge, _ in changes])
+        removed = [edge for edge, existed in changes if existed]
+        inserted = {edge for edge, existed in changes if not existed}
+        affected = 0
+        if removed:
+            # Regiões calculadas com os conjuntos de antes do lote
+            down = up = 0
+            for source, target in removed:
+                down |= self.descendants[target] | 1 << target
+                up |= self.ancestors[source] | 1 << source
+            affected += self._recompute(down, inserted, up=True)
+            affected += self._recompute(up, inserted, up=False)
+        for source, target in inserted:
+            affected += self._insert(source, target)
+        after = self._regions([edge for edge, _ in changes])
+        self._update_lengths(sources | after[0], up=False)
+        self._update_lengths(targets | after[1], up=True)
+        return {
+            "insertedEdges": len(inserted),
+            "removedEdges": len(removed),
+            "affectedNodes": affected,
+        }
+
+    def apply(self, batches: list) -> dict:
+        """Aplica lotes de registros do Neptune Stream.
+
+        Os lotes são lidos como colunas (`NeptuneStreamColumns`): apenas
+        as arestas `schedule`, `has`, `produce` e `consumed_by` e os labels
+        de tabelas e jobs novos são considerados, sem criar um objeto por
+        registro. Uma aresta adicionada e removida nos mesmos lotes não
+        altera o fecho.
+
+        Returns:
+        -------
+        dict: Arestas do fecho inseridas e removidas e conjuntos de nós
+            alterados.
+        """
+        for columns in batches:
+            if not len(columns):
+                continue
+            ops = columns.op
+            for index, (kind, value) in enumerate(
+                    zip(columns.type, columns.value)):
+                if kind == "e" and value in RUN_EDGES:
+                    operation = (
+                        kind, ops[index] == "ADD", value,
+                        columns.frm[index], columns.to[index]
+                    )
+                elif kind == "vl" and value in CLOSURE_CODES \
+                        and ops[index] == "ADD":
+                    operation = (kind, True, value, columns.id[index], None)
+                else:
+                    continue
+                self._apply_operation(*operation)
+                self._log.append(operation)
+            self.event_id = columns.event_id(len(columns) - 1)
+        return self._update_closure()
+
+    def _apply_operation(self, kind: str, add: bool, value: str,
+                         first: str, second: str) -> None:
+        """Aplica uma operação registrada por `apply`: uma aresta (label,
+        origem e destino) ou um nó novo (label e ID)."""
+        if kind == "vl":
+            self.node(first, CLOSURE_CODES[value])
+        elif add:
+            self.add_edge(value, first, second)
+        else:
+            self.remove_edge(value, first, second)
+
+    # Construção e gravação
+
+    @classmethod
+    def build(cls, items, event_id: EventId = None) -> "ClosureIndex":
+        """Constrói o índice a partir de uma exportação completa do grafo
+        (`read_export`), numerando os nós em ordem topológica."""
+        index = cls(event_id)
+        for kind, item in items:
+            if kind == "vertex":
+                if item["~label"] in CLOSURE_CODES:
+                    index.node(item["~id"], CLOSURE_CODES[item["~label"]])
+            elif item["~label"] in RUN_EDGES:
+                index.add_edge(item["~label"], item["~from"], item["~to"])
+        index._touched = {}
+
+        order, components, successors, component_of = \
+            topological_numbering([list(values) for values in
+                                   index.successors])
+        renumber = [0] * len(order)
+        for number, node in enumerate(order):
+            renumber[node] = number
+        index.ids = [index.ids[node] for node in order]
+        index.numbers = {
+            vertex_id: number for number, vertex_id in enumerate(index.ids)
+        }
+        index.labels = bytearray(index.labels[node] for node in order)
+        for name in ("successors", "predecessors"):
+            values = getattr(index, name)
+            setattr(index, name, [
+                {renumber[other]: count
+                 for other, count in values[node].items()}
+                for node in order
+            ])
+        for sets, reverse in ((index.ancestors, True),
+                              (index.descendants, False)):
+            for number, bitmap in closure_bitmaps(
+                    components, successors, component_of, reverse):
+                for node in components[number]:
+                    sets[node] = bitmap
+        index.lengths = tuple(
+            array("H", (paths[number] for number in component_of))
+            for paths in (
+                longest_paths(components, successors, component_of, reverse)
+                for reverse in (True, False)
+            )
+        )
+        # A numeração topológica deixa cada componente contígua
+        index.component = [
+            components[component_of[node]][0] for node in range(len(order))
+        ]
+        return index
+
+    def save(self, path: str) -> None:
+        """Grava o índice inteiro e a posição do stream em um único arquivo
+        e esvazia o log de operações (compactação)."""
+        state = {
+            "version": INDEX_VERSION,
+            "eventId": self.event_id.to_dict() if self.event_id else None,
+            "ids": self.ids,
+            "labels": bytes(self.labels),
+            "successors": self.successors,
+            "ancestors": self.ancestors,
+            "descendants": self.descendants,
+            "lengths": [lengths.tobytes() for lengths in self.lengths],
+            "component": array("I", self.component).tobytes(),
+            "runJob": self.run_job,
+            "planRun": self.plan_run,
+            "planTables": self.plan_tables,
+        }
+
+        def write(temporary):
+            with open(temporary, "wb") as file:
+                pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        replace_file(path, write)
+        # Entradas do log que sobrarem de uma falha antes deste ponto já
+        # estão no índice e são ignoradas por `load`
+        open(log_path(path), "wb").close()
+        self._log = []
+        self._logged = 0
+
+    def checkpoint(self, path: str,
+                   compact_records: int = INDEX_COMPACT_RECORDS) -> None:
+        """Acrescenta ao log do índice gravado em `path` as operações
+        aplicadas desde o checkpoint anterior, com a posição do stream. Com
+        `compact_records` operações no log, o índice é regravado inteiro
+        (`save`)."""
+        if not self._log:
+            return
+        if self._logged + len(self._log) >= compact_records:
+            self.save(path)
+            return
+        entry = {"eventId": self.event_id.to_dict(), "operations": self._log}
+        with open(log_path(path), "ab") as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        self._logged += len(self._log)
+        self._log = []
+
+    @classmethod
+    def load(cls, path: str) -> "ClosureIndex":
+        """Carrega um índice gravado por `save` e reaplica as operações do
+        log. Os arquivos devem vir de uma fonte confiável, já que são lidos
+        com pickle."""
+        with open(path, "rb") as file:
+            state = pickle.load(file)
+        if state.get("version") != INDEX_VERSION:
+            raise ValueError(
+                f"Unsupported lineage closure index version: "
+                f"{state.get('version')}"
+            )
+        event_id = state["eventId"]
+        index = cls(
+            EventId(event_id["commitNum"], event_id["opNum"])
+            if event_id else None
+        )
+        index.ids = state["ids"]
+        index.numbers = {
+            vertex_id: number for number, vertex_id in enumerate(index.ids)
+        }
+        index.labels = bytearray(state["labels"])
+        index.successors = state["successors"]
+        index.predecessors = [{} for _ in index.ids]
+        for source, targets in enumerate(index.successors):
+            for target, count in targets.items():
+                index.predecessors[target][source] = count
+        index.ancestors = state["ancestors"]
+        index.descendants = state["descendants"]
+        index.lengths = tuple(
+            array("H", lengths) for lengths in state["lengths"]
+        )
+        index.component = array("I", state["component"]).tolist()
+        index.run_job = state["runJob"]
+        index.plan_run = state["planRun"]
+        index.plan_tables = state["planTables"]
+        for plan_id, run_id in index.plan_run.items():
+            index.run_plans.setdefault(run_id, set()).add(plan_id)
+        index._replay(log_path(path))
+        return index
+
+    def _replay(self, path: str) -> None:
+        """Reaplica as entradas do log posteriores à posição do índice. Uma
+        entrada incompleta no final (falha durante o checkpoint) é
+        descartada e os registros dela são lidos de novo do stream."""
+        try:
+            file = open(path, "r+b")
+        except FileNotFoundError:
+            return
+        with file:
+            while True:
+                position = file.tell()
+                try:
+                    entry = pickle.load(file)
+                except (EOFError, pickle.UnpicklingError):
+                    if position < os.fstat(file.fileno()).st_size:
+                        logger.warning(
+                            f"Discarding incomplete lineage closure index "
+                            f"log entry at byte {position}"
+                        )
+                        file.truncate(position)
+                    break
+                event_id = EventId(
+                    entry["eventId"]["commitNum"], entry["eventId"]["opNum"]
+                )
+                self._logged += len(entry["operations"])
+                if self.event_id is not None and \
+                        (event_id.commit_num, event_id.op_num) <= \
+                        (self.event_id.commit_num, self.event_id.op_num):
+                    continue
+                for operation in entry["operations"]:
+                    self._apply_operation(*operation)
+                self._update_closure()
+                self.event_id = event_id
+
+    def write_closure(self, path: str) -> None:
+        """Grava o fecho no formato de `LineageClosure`, com a numeração do
+        índice. Os caminhos mais longos e as componentes já são mantidos por
+        `apply`; apenas os bitmaps alterados desde a última gravação são
+        comprimidos."""
+        component_of, representatives, numbers = [], [], {}
+        for representative in self.component:
+            number = numbers.get(representative)
+            if number is None:
+                number = numbers[representative] = len(representatives)
+                representatives.append(representative)
+            component_of.append(number)
+        lengths = array("H")
+        for values in self.lengths:
+            lengths.extend(values[node] for node in representatives)
+        blobs = []
+        for node in representatives:
+            for sets, cache in zip((self.ancestors, self.descendants),
+                                   self._blobs):
+                # Conjuntos não alterados são o mesmo objeto da gravação
+                # anterior e não são comprimidos de novo
+                cached = cache.get(node)
+                if cached is None or cached[0] is not sets[node]:
+                    cached = cache[node] = \
+                        (sets[node], compress_bitmap(sets[node]))
+                blobs.append(cached[1])
+        replace_file(path, lambda temporary: write_closure(
+            temporary, self.ids, self.labels, component_of, lengths, blobs,
+            self.event_id
+        ))
+
+
+def sync_closure_index(index: ClosureIndex, reader: StreamReader,
+                       max_records: int = STREAM_MAX_RECORDS) -> dict:
+    """Aplica ao índice os registros do stream posteriores ao seu
+    `EventId`, até `max_records` registros.
+
+    Returns:
+    -------
+    dict: Registros lidos, o resumo de `ClosureIndex.apply`, a posição
+        final e as métricas da leitura do stream.
+    """
+    if index.event_id is None:
+        raise ValueError(
+            "Lineage closure index has no stream position, rebuild it with "
+            "--commit-num"
+        )
+    reader.reset_metrics()
+    summary = {"insertedEdges": 0, "removedEdges": 0, "affectedNodes": 0}
+    records, seconds = 0, 0.0
+    # Cada lote é aplicado ao chegar (o seguinte já está sendo lido), sem
+    # manter os registros já aplicados em memória
+    for response in reader.batches_after(index.event_id, max_records):
+        columns = response.columns()
+        started_at = time.perf_counter()
+        for key, value in index.apply([columns]).items():
+            summary[key] += value
+        seconds += time.perf_counter() - started_at
+        records += len(columns)
+    summary.update({
+        "records": records,
+        "commitNum": index.event_id.commit_num,
+        "opNum": index.event_id.op_num,
+        "seconds": round(seconds, 3),
+        "stream": reader.metrics(),
+    })
+    if records:
+        logger.info(f"Lineage closure index updated: {summary}")
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Mantém o fecho transitivo da linhagem atualizado pelo "
+        "Neptune Stream"
+    )
+    parser.add_argument(
+        "--index", required=True,
+        help="Arquivo do índice, com a posição do stream"
+    )
+    parser.add_argument(
+        "--input",
+        help="Exportação completa do grafo (JSON ou diretório CSV) usada "
+        "para criar o índice"
+    )
+    parser.add_argument(
+        "--commit-num", type=int,
+        help="Commit do Neptune Stream no momento da exportação"
+    )
+    parser.add_argument("--op-num", type=int, default=1)
+    parser.add_argument(
+        "--output", help="Arquivo do fecho (LineageClosure) gravado a cada "
+        "checkpoint"
+    )
+    parser.add_argument("--endpoint", help="Endpoint do Neptune")
+    parser.add_argument("--port", default="8182")
+    parser.add_argument(
+        "--follow", action="store_true",
+        help="Continua lendo o stream até ser interrompido"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.input:
+        started_at = time.perf_counter()
+        index = ClosureIndex.build(
+            read_export(args.input),
+            EventId(args.commit_num, args.op_num)
+            if args.commit_num else None
+        )
+        index.save(args.index)
+        print(
+            f"{len(index):,} nodes, built in "
+            f"{time.perf_counter() - started_at:.1f}s"
+        )
+    else:
+        index = ClosureIndex.load(args.index)
+
+    written = False
+    if args.endpoint:
+        reader = StreamReader(NeptuneStream(endpoints=Endpoints(
+            neptune_endpoint=args.endpoint, neptune_port=args.port
+        )))
+        while True:
+            summary = sync_closure_index(index, reader)
+            if summary["records"]:
+                # Checkpoint: as operações e a posição são gravadas juntas
+                index.checkpoint(args.index)
+                if args.output:
+                    index.write_closure(args.output)
+                    written = True
+            elif args.follow:
+                time.sleep(STREAM_POLL_INTERVAL)
+            else:
+                break
+    if args.output and not written:
+        index.write_closure(args.output)
+
+
+if __name__ == "__main__":
+    main()
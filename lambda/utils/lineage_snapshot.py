@@ -0,0 +1,1178 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from gremlin_python.process.traversal import T
+from gremlin_python.process.graph_traversal import __
+from neptune_python_utils.gremlin_utils import GremlinUtils
+from neptune_python_utils.streams import EventId, NeptuneStream
+from utils.project_properties import project_table
+from utils.query_metrics import measured
+from utils.latest_run_edges import changed_jobs
+from utils.stream_checkpoint import is_checkpoint
+from utils.stream_reader import StreamBackoff, StreamReader
+from utils.data_reader import (
+    get_owner_jobs,
+    get_subgraphs_of_the_tables_bfs,
+    get_subgraphs_of_the_jobs_bfs,
+    job_adjacency,
+    tag,
+    build_table_subgraph,
+    build_job_subgraph,
+    attached_nodes_of_table,
+    LineageAdjacency,
+    TableBfs,
+    JobBfs,
+    run_tables_bfs,
+    run_jobs_bfs,
+    attached_tables_of
+)
+from utils.constants import (
+    VERTEX_LABEL_JOB,
+    VERTEX_LABEL_JOB_RUN,
+    VERTEX_LABEL_EXECUTION_PLAN,
+    VERTEX_LABEL_TABLE,
+    VERTEX_LABEL_FEATURE,
+    VERTEX_LABEL_MODEL,
+    VERTEX_LABEL_DATASET,
+    VERTEX_LABEL_ANALYSIS,
+    VERTEX_LABEL_DASHBOARD
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SNAPSHOT_VERSION = 1
+
+# Labels mantidos no snapshot, na ordem dos códigos de `labels`. JOB_RUN e
+# EXECUTION_PLAN são usados apenas na construção, para calcular a
+# execução mais recente de cada job
+LABELS = (
+    VERTEX_LABEL_TABLE,
+    VERTEX_LABEL_JOB,
+    VERTEX_LABEL_FEATURE,
+    VERTEX_LABEL_MODEL,
+    VERTEX_LABEL_DATASET,
+    VERTEX_LABEL_ANALYSIS,
+    VERTEX_LABEL_DASHBOARD
+)
+LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+
+# Propriedades de cada label, na ordem das projeções do `data_reader`
+# (`project_table`, `project_job` e `attached_nodes_of_table`)
+PROPERTIES = {
+    VERTEX_LABEL_TABLE: (
+        "table_name", "db_name", "location_path", "status", "dt_update"
+    ),
+    VERTEX_LABEL_JOB: (
+        "name", "account_id", "sigla", "tool", "status", "dt_update"
+    ),
+    VERTEX_LABEL_FEATURE: ("feature_name",),
+    VERTEX_LABEL_MODEL: ("model_name",),
+    VERTEX_LABEL_DATASET: ("dataset_name",),
+    VERTEX_LABEL_ANALYSIS: ("analysis_name",),
+    VERTEX_LABEL_DASHBOARD: ("dashboard_name",),
+}
+NAME_PROPERTIES = {
+    VERTEX_LABEL_TABLE: "table_name",
+    VERTEX_LABEL_JOB: "name",
+}
+MISSING = "N/A"
+
+# Arestas do snapshot (origem -> destinos), com o label exigido no destino:
+# - produces/consumes: tabelas da execução mais recente de cada job;
+# - producers/consumers: jobs que produzem/consomem a tabela em qualquer
+#   execução;
+# - demais: arestas do grafo até modelos e dashboards.
+ATTACHED_EDGES = {
+    "belongs_to_table": VERTEX_LABEL_FEATURE,
+    "has_feature": VERTEX_LABEL_MODEL,
+    "read_by": VERTEX_LABEL_DATASET,
+    "uses_dataset": VERTEX_LABEL_ANALYSIS,
+    "generate_by": VERTEX_LABEL_DASHBOARD,
+}
+ATTACHED_LABELS = tuple(ATTACHED_EDGES.values())
+RUN_EDGES = ("schedule", "has", "produce", "consumed_by")
+
+# Leitura do Neptune Stream pelo overlay
+STREAM_REFRESH_INTERVAL = int(
+    os.getenv("LINEAGE_SNAPSHOT_STREAM_INTERVAL", "5")
+)
+STREAM_BATCH_SIZE = 250
+# Registros lidos do stream por consulta; os demais ficam para as consultas
+# seguintes, para limitar o trabalho feito no caminho da consulta
+STREAM_MAX_RECORDS = int(
+    os.getenv("LINEAGE_SNAPSHOT_STREAM_MAX_RECORDS", "500")
+)
+OVERLAY_BATCH_SIZE = 100
+# Acima deste número de jobs, tabelas e nós ligados alterados o snapshot é
+# descartado e as consultas usam o engine bfs até ele ser reconstruído
+OVERLAY_MAX_ENTRIES = int(
+    os.getenv("LINEAGE_SNAPSHOT_OVERLAY_MAX_ENTRIES", "50000")
+)
+
+
+def csr(size: int, lists: dict) -> tuple:
+    """Converte listas de adjacência {origem: [destinos]} nos arrays
+    (offsets, targets) de uma matriz CSR com `size` linhas."""
+    offsets = array("I", [0]) * (size + 1)
+    targets = array("I")
+    for source in range(size):
+        targets.extend(lists.get(source, ()))
+        offsets[source + 1] = len(targets)
+    return offsets, targets
+
+
+class SnapshotOverlay:
+    """Alterações gravadas no grafo depois da exportação do snapshot.
+
+    Os jobs alterados têm a adjacência (`job_adjacency`) e as tabelas
+    produzidas e consumidas em qualquer execução substituídas pelas atuais;
+    as tabelas e jobs alterados têm a projeção substituída. Um valor None
+    indica um vértice removido. As tabelas cujos nós ligados (features,
+    modelos, datasets, análises e dashboards) mudaram têm os resultados de
+    `attached_nodes_of_table` substituídos em `attached`.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.nodes = {}
+        self.attached = {}
+        # Nós ligados que aparecem em `attached`, inclusive os criados
+        # depois da exportação
+        self.attached_ids = set()
+        self.any_produces = {}
+        self.any_consumes = {}
+        self.producers = {}
+        self.consumers = {}
+        self.names = {}
+
+    def __len__(self) -> int:
+        return len(self.rows) + len(self.nodes) + len(self.attached)
+
+    def add_name(self, node: dict) -> None:
+        label = node["label"]
+        self.names.setdefault(
+            (label, node[NAME_PROPERTIES[label]]), set()
+        ).add(node["id"])
+
+    def set_node(self, node_id: str, node: dict) -> None:
+        self.nodes[node_id] = node
+        if node is not None:
+            self.add_name(node)
+
+    def set_job(self, job_id: str, row: dict,
+                produces: list, consumes: list) -> None:
+        for table_id in self.any_produces.get(job_id, ()):
+            self.producers[table_id].discard(job_id)
+        for table_id in self.any_consumes.get(job_id, ()):
+            self.consumers[table_id].discard(job_id)
+        self.rows[job_id] = row
+        self.any_produces[job_id] = set(produces)
+        self.any_consumes[job_id] = set(consumes)
+        for table_id in produces:
+            self.producers.setdefault(table_id, set()).add(job_id)
+        for table_id in consumes:
+            self.consumers.setdefault(table_id, set()).add(job_id)
+        if row is not None:
+            self.add_name(row["job"])
+
+    def set_attached(self, table_id: str, items: list) -> None:
+        self.attached[table_id] = items
+        self.attached_ids.update(
+            item["item"]["id"] for item in items
+            if item["section"] == "attached"
+        )
+
+
+class LineageSnapshot:
+    """Snapshot compacto, em memória, da linhagem JOB/TABLE e dos nós
+    ligados às tabelas.
+
+    Os vértices são identificados por inteiros (a posição do ID em `ids`,
+    ordenado, então o inteiro de um ID é encontrado por busca binária) e as
+    arestas ficam em arrays CSR (offsets, targets) por tipo de aresta. A
+    execução mais recente de cada job é calculada na construção: o snapshot
+    guarda, por job, as tabelas produzidas e consumidas por ela
+    (`produces`/`consumes`) e, por tabela, os jobs que a produzem ou
+    consomem em qualquer execução (`producers`/`consumers`), que é tudo o
+    que as BFS do `data_reader` consultam.
+
+    As propriedades das projeções ficam em um array de índices para uma
+    tabela de strings sem repetições. O `overlay` guarda as alterações
+    lidas do Neptune Stream depois da exportação.
+    """
+
+    def __init__(self, ids: list, labels: array, strings: list,
+                 properties: tuple, adjacency: dict,
+                 event_id: EventId = None):
+        self.ids = ids
+        self.labels = labels
+        self.strings = strings
+        self.property_offsets, self.property_values = properties
+        self.adjacency = adjacency
+        self.event_id = event_id
+        self.overlay = SnapshotOverlay()
+        # Origens das arestas dos nós ligados, por destino; montado apenas
+        # quando o stream traz alterações desses nós
+        self._attached_parents = None
+        self.names = {}
+        for index, code in enumerate(labels):
+            label = LABELS[code]
+            if label in NAME_PROPERTIES:
+                key = (label, self.node(index)[NAME_PROPERTIES[label]])
+                self.names.setdefault(key, []).append(index)
+
+    # Construção
+
+    @classmethod
+    def build(cls, items, event_id: EventId = None) -> "LineageSnapshot":
+        """Constrói o snapshot a partir de uma exportação completa do grafo,
+        uma sequência de ("vertex", item) e ("edge", item) no formato de
+        `utils/data.json` (`read_export`).
+
+        Args:
+        -----
+        items (iterable): Vértices e arestas da exportação.
+        event_id (EventId): Posição do Neptune Stream no momento da
+            exportação, a partir da qual o overlay é atualizado.
+
+        Returns:
+        -------
+        LineageSnapshot: O snapshot construído.
+        """
+        index = {}
+        labels = {}
+        properties = {}
+        run_dates = {}
+        edges = {label: {} for label in RUN_EDGES + tuple(ATTACHED_EDGES)}
+
+        def intern(vertex_id):
+            return index.setdefault(vertex_id, len(index))
+
+        for kind, item in items:
+            if kind == "vertex":
+                vertex = intern(item["~id"])
+                label = item["~label"]
+                values = {
+                    key.split(":")[0]: value
+                    for key, value in item.items()
+                    if not key.startswith("~") and value != ""
+                }
+                labels[vertex] = label
+                if label == VERTEX_LABEL_JOB_RUN:
+                    if "dt_update" in values:
+                        run_dates[vertex] = values["dt_update"]
+                elif label in PROPERTIES:
+                    properties[vertex] = tuple(
+                        values.get(key, MISSING)
+                        for key in PROPERTIES[label]
+                    )
+            elif item["~label"] in edges:
+                from_vertex, to_vertex = \
+                    intern(item["~from"]), intern(item["~to"])
+                # consumed_by vai da tabela para o plano; o snapshot guarda
+                # as tabelas lidas por plano
+                if item["~label"] == "consumed_by":
+                    from_vertex, to_vertex = to_vertex, from_vertex
+                edges[item["~label"]].setdefault(from_vertex, []) \
+                    .append(to_vertex)
+
+        def targets(edge_label, source, label):
+            return [
+                target for target in edges[edge_label].get(source, ())
+                if labels.get(target) == label
+            ]
+
+        def tables_of(run, edge_label):
+            return [
+                table
+                for plan in targets("has", run, VERTEX_LABEL_EXECUTION_PLAN)
+                for table in targets(edge_label, plan, VERTEX_LABEL_TABLE)
+            ]
+
+        produces, consumes, producers, consumers = {}, {}, {}, {}
+        for job, label in labels.items():
+            if label != VERTEX_LABEL_JOB:
+                continue
+            runs = [
+                run for run in targets("schedule", job, VERTEX_LABEL_JOB_RUN)
+                if run in run_dates
+            ]
+            # Mais recente por dt_update; em empate, a primeira encontrada
+            latest = None
+            for run in runs:
+                if latest is None or run_dates[run] > run_dates[latest]:
+                    latest = run
+            if latest is not None:
+                produces[job] = tables_of(latest, "produce")
+                consumes[job] = tables_of(latest, "consumed_by")
+            for run in runs:
+                for table in tables_of(run, "produce"):
+                    producers.setdefault(table, {})[job] = None
+                for table in tables_of(run, "consumed_by"):
+                    consumers.setdefault(table, {})[job] = None
+
+        # Apenas os labels das respostas entram no snapshot, ordenados por ID
+        kept = sorted(
+            (vertex_id, vertex) for vertex_id, vertex in index.items()
+            if labels.get(vertex) in LABEL_CODES
+        )
+        del index
+        renumber = {vertex: new for new, (_, vertex) in enumerate(kept)}
+
+        strings = {MISSING: 0}
+        property_lists = {}
+        for new, (_, vertex) in enumerate(kept):
+            property_lists[new] = [
+                strings.setdefault(value, len(strings))
+                for value in properties.get(vertex, ())
+            ]
+
+        def renumbered(lists):
+            return {
+                renumber[source]: [
+                    renumber[target] for target in dict.fromkeys(values)
+                    if target in renumber
+                ]
+                for source, values in lists.items() if source in renumber
+            }
+
+        size = len(kept)
+        adjacency = {
+            "produces": csr(size, renumbered(produces)),
+            "consumes": csr(size, renumbered(consumes)),
+            "producers": csr(size, renumbered(producers)),
+            "consumers": csr(size, renumbered(consumers)),
+        }
+        for edge_label, label in ATTACHED_EDGES.items():
+            adjacency[edge_label] = csr(size, renumbered({
+                source: [
+                    target for target in values
+                    if labels.get(target) == label
+                ]
+                for source, values in edges[edge_label].items()
+            }))
+
+        return cls(
+            [vertex_id for vertex_id, _ in kept],
+            array("B", [LABEL_CODES[labels[vertex]] for _, vertex in kept]),
+            list(strings),
+            csr(size, property_lists),
+            adjacency,
+            event_id
+        )
+
+    def save(self, path: str) -> None:
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "eventId": self.event_id.to_dict() if self.event_id else None,
+            "ids": self.ids,
+            "labels": self.labels,
+            "strings": self.strings,
+            "properties": (self.property_offsets, self.property_values),
+            "adjacency": self.adjacency,
+        }
+        with open(path, "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> "LineageSnapshot":
+        """Carrega um snapshot gravado por `save`. O arquivo deve vir de uma
+        fonte confiável (o build do snapshot), já que é lido com pickle."""
+        started_at = time.perf_counter()
+        with open(path, "rb") as file:
+            state = pickle.load(file)
+        if state.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"Unsupported lineage snapshot version: {state.get('version')}"
+            )
+        event_id = state["eventId"]
+        snapshot = cls(
+            state["ids"],
+            state["labels"],
+            state["strings"],
+            state["properties"],
+            state["adjacency"],
+            EventId(event_id["commitNum"], event_id["opNum"])
+            if event_id else None
+        )
+        logger.info(
+            f"Loaded lineage snapshot with {len(snapshot.ids)} vertices "
+            f"({snapshot.memory_usage() / 2 ** 20:.1f} MiB) in "
+            f"{(time.perf_counter() - started_at) * 1000:.0f} ms"
+        )
+        return snapshot
+
+    def memory_usage(self) -> int:
+        """Tamanho aproximado, em bytes, do snapshot em memória."""
+        arrays = [self.labels, self.property_offsets, self.property_values]
+        arrays += [array for pair in self.adjacency.values()
+                   for array in pair]
+        size = sum(
+            sys.getsizeof(value) for value in self.ids + self.strings
+        )
+        size += sys.getsizeof(self.ids) + sys.getsizeof(self.strings)
+        size += sum(sys.getsizeof(array) for array in arrays)
+        size += sys.getsizeof(self.names) + sum(
+            sys.getsizeof(indexes) for indexes in self.names.values()
+        )
+        return size
+
+    # Consultas por inteiro
+
+    def index(self, vertex_id: str) -> int:
+        position = bisect_left(self.ids, vertex_id)
+        if position < len(self.ids) and self.ids[position] == vertex_id:
+            return position
+        return None
+
+    def neighbors(self, edge: str, index: int) -> array:
+        offsets, targets = self.adjacency[edge]
+        return targets[offsets[index]:offsets[index + 1]]
+
+    def node(self, index: int) -> dict:
+        label = LABELS[self.labels[index]]
+        values = self.property_values[
+            self.property_offsets[index]:self.property_offsets[index + 1]
+        ]
+        node = {"id": self.ids[index], "label": label}
+        node.update(zip(PROPERTIES[label], map(self.strings.__getitem__,
+                                                values)))
+        return node
+
+    # Consultas por ID, considerando o overlay
+
+    def vertex(self, vertex_id: str) -> dict:
+        """Projeção de uma tabela ou job, ou None se ele não existir."""
+        if vertex_id in self.overlay.nodes:
+            return self.overlay.nodes[vertex_id]
+        row = self.overlay.rows.get(vertex_id)
+        if row is not None:
+            return row["job"]
+        if vertex_id in self.overlay.rows:
+            return None
+        index = self.index(vertex_id)
+        return self.node(index) if index is not None else None
+
+    def find(self, label: str, name: str) -> list:
+        """IDs das tabelas ou jobs com o nome informado."""
+        candidates = [
+            self.ids[index] for index in self.names.get((label, name), ())
+        ]
+        candidates += sorted(self.overlay.names.get((label, name), ()))
+        found = []
+        for vertex_id in dict.fromkeys(candidates):
+            node = self.vertex(vertex_id)
+            if node is not None and node["label"] == label \
+                    and node[NAME_PROPERTIES[label]] == name:
+                found.append(vertex_id)
+        return found
+
+    def job_row(self, job_id: str) -> dict:
+        """Adjacência do job no formato de `job_adjacency`."""
+        if job_id in self.overlay.rows:
+            return self.overlay.rows[job_id]
+        index = self.index(job_id)
+        if index is None or LABELS[self.labels[index]] != VERTEX_LABEL_JOB:
+            return None
+        job = self.overlay.nodes[job_id] if job_id in self.overlay.nodes \
+            else self.node(index)
+        if job is None:
+            return None
+        return {
+            "job": job,
+            "produces": self.tables(self.neighbors("produces", index)),
+            "consumes": self.tables(self.neighbors("consumes", index)),
+        }
+
+    def tables(self, indexes) -> list:
+        nodes = self.overlay.nodes
+        tables = []
+        for index in indexes:
+            table_id = self.ids[index]
+            table = nodes[table_id] if table_id in nodes \
+                else self.node(index)
+            if table is not None:
+                tables.append(table)
+        return tables
+
+    def any_run_jobs(self, edge: str, table_id: str) -> list:
+        """Jobs que produzem (`producers`) ou consomem (`consumers`) a
+        tabela em qualquer execução."""
+        overlay = self.overlay
+        changed = overlay.any_produces if edge == "producers" \
+            else overlay.any_consumes
+        added = overlay.producers if edge == "producers" \
+            else overlay.consumers
+        index = self.index(table_id)
+        jobs = [
+            self.ids[job] for job in self.neighbors(edge, index)
+        ] if index is not None else []
+        jobs = [
+            job_id for job_id in jobs
+            if job_id not in changed or table_id in changed[job_id]
+        ]
+        jobs += sorted(added.get(table_id, ()))
+        return list(dict.fromkeys(jobs))
+
+    def attached(self, table_id: str) -> list:
+        """Resultados marcados de `attached_nodes_of_table` para a
+        tabela."""
+        if table_id in self.overlay.attached:
+            return self.overlay.attached[table_id]
+        index = self.index(table_id)
+        if index is None:
+            return []
+        features = self.neighbors("belongs_to_table", index)
+        datasets = self.neighbors("read_by", index)
+        items = []
+        for feature in features:
+            items.append(self.node(feature))
+            items += [
+                self.node(model)
+                for model in self.neighbors("has_feature", feature)
+            ]
+        for dataset in datasets:
+            items.append(self.node(dataset))
+            for analysis in self.neighbors("uses_dataset", dataset):
+                items.append(self.node(analysis))
+                items += [
+                    self.node(dashboard)
+                    for dashboard in self.neighbors("generate_by", analysis)
+                ]
+        analyses = [
+            (dataset, analysis) for dataset in datasets
+            for analysis in self.neighbors("uses_dataset", dataset)
+        ]
+        edges = [(index, feature) for feature in features]
+        edges += [
+            (feature, model) for feature in features
+            for model in self.neighbors("has_feature", feature)
+        ]
+        edges += [(index, dataset) for dataset in datasets]
+        edges += analyses
+        edges += [
+            (analysis, dashboard) for _, analysis in analyses
+            for dashboard in self.neighbors("generate_by", analysis)
+        ]
+        return [
+            {"section": "attached", "item": item} for item in items
+        ] + [
+            {
+                "section": "edge",
+                "item": {"from": self.ids[frm], "to": self.ids[to]}
+            }
+            for frm, to in edges
+        ]
+
+
+    def is_attached(self, vertex_id: str) -> bool:
+        """Se o vértice é um nó ligado às tabelas no snapshot ou no
+        overlay."""
+        if vertex_id in self.overlay.attached_ids:
+            return True
+        index = self.index(vertex_id)
+        return index is not None and \
+            LABELS[self.labels[index]] in ATTACHED_LABELS
+
+    def attached_owners(self, vertex_ids) -> set:
+        """Tabelas de onde os vértices são alcançados pelas arestas dos nós
+        ligados, no estado da exportação."""
+        if self._attached_parents is None:
+            parents = {}
+            for edge in ATTACHED_EDGES:
+                offsets, targets = self.adjacency[edge]
+                for source in range(len(offsets) - 1):
+                    for target in targets[offsets[source]:
+                                          offsets[source + 1]]:
+                        parents.setdefault(target, []).append(source)
+            self._attached_parents = parents
+        table_code = LABEL_CODES[VERTEX_LABEL_TABLE]
+        frontier = {self.index(vertex_id) for vertex_id in vertex_ids}
+        frontier.discard(None)
+        owners, visited = set(), set()
+        while frontier:
+            visited |= frontier
+            owners |= {
+                index for index in frontier
+                if self.labels[index] == table_code
+            }
+            frontier = {
+                parent for index in frontier
+                if self.labels[index] != table_code
+                for parent in self._attached_parents.get(index, ())
+            } - visited
+        return {self.ids[index] for index in owners}
+
+
+class SnapshotAdjacency(LineageAdjacency):
+    """`LineageAdjacency` servida pelo snapshot, sem consultas ao
+    Neptune: cada nível da BFS é resolvido com os arrays CSR."""
+
+    def __init__(self, snapshot: LineageSnapshot, with_links: bool = False):
+        super().__init__(None, with_links)
+        self.snapshot = snapshot
+
+    def fetch(self, up_tables: set, down_tables: set) -> tuple:
+        links = set()
+        candidates = {}
+        for table_id in up_tables:
+            for job_id in self.snapshot.any_run_jobs("producers", table_id):
+                candidates[job_id] = None
+                if self.with_links:
+                    links.add((table_id, job_id))
+        for table_id in down_tables:
+            for job_id in self.snapshot.any_run_jobs("consumers", table_id):
+                candidates[job_id] = None
+        rows = []
+        for job_id in candidates:
+            if job_id in self.rows:
+                continue
+            row = self.snapshot.job_row(job_id)
+            if row is not None:
+                rows.append(row)
+        return links, rows
+
+
+def attached_by_table_of(snapshot: LineageSnapshot, tables_ids: list) -> dict:
+    """Equivalente a `get_attached_nodes_by_table`, lido do snapshot."""
+    return {table_id: snapshot.attached(table_id) for table_id in tables_ids}
+
+
+def get_subgraphs_of_the_tables_snapshot(
+        snapshot: LineageSnapshot,
+        tableIds: list,
+        level: int = 10,
+        level_down: int = None
+        ) -> dict:
+    """Retorna os subgrafos de várias tabelas com as BFS de
+    `get_subgraphs_of_the_tables_bfs` executadas sobre o snapshot.
+
+    Args:
+    -----
+    snapshot (LineageSnapshot): Snapshot da linhagem.
+    tableIds (list): Nomes das tabelas.
+    level (int): Nível de profundidade para a busca de nós ascendentes e
+        descendentes.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
+
+    Returns:
+    -------
+    dict: Para cada nome, o mesmo dicionário retornado por
+        `get_subgraph_of_the_table`.
+    """
+    if level_down is None:
+        level_down = level
+    names = list(dict.fromkeys(tableIds))
+
+    searches = {}
+    for name in names:
+        tables_ids = snapshot.find(VERTEX_LABEL_TABLE, name)
+        if not tables_ids:
+            continue
+        source_job = {}
+        for table_id in tables_ids:
+            for job_id in snapshot.any_run_jobs("producers", table_id):
+                job = snapshot.vertex(job_id)
+                if job is not None:
+                    source_job.setdefault(job_id, job)
+        searches[name] = TableBfs(
+            [snapshot.vertex(table_id) for table_id in tables_ids],
+            list(source_job.values()),
+            level, level_down
+        )
+
+    adjacency = SnapshotAdjacency(snapshot)
+    run_tables_bfs(searches, adjacency, level, level_down)
+    attached_by_table = attached_by_table_of(
+        snapshot, attached_tables_of(searches)
+        )
+
+    return {
+        name: searches[name].build(adjacency, attached_by_table)
+        if name in searches else build_table_subgraph(
+            [], [], [], [], [], [], [], [], [], []
+            )
+        for name in names
+    }
+
+
+def get_subgraphs_of_the_jobs_snapshot(
+        snapshot: LineageSnapshot,
+        jobIds: list,
+        level: int = 10,
+        level_down: int = None
+        ) -> dict:
+    """Retorna os subgrafos de vários jobs com as BFS de
+    `get_subgraphs_of_the_jobs_bfs` executadas sobre o snapshot.
+
+    Args:
+    -----
+    snapshot (LineageSnapshot): Snapshot da linhagem.
+    jobIds (list): Nomes dos jobs.
+    level (int): Nível de profundidade para a busca de nós ascendentes e
+        descendentes.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
+
+    Returns:
+    -------
+    dict: Para cada nome, o mesmo dicionário retornado por
+        `get_subgraph_of_the_job`.
+    """
+    if level_down is None:
+        level_down = level
+    names = list(dict.fromkeys(jobIds))
+
+    adjacency = SnapshotAdjacency(snapshot, with_links=True)
+    selects, starts = {}, {}
+    for name in names:
+        for job_id in snapshot.find(VERTEX_LABEL_JOB, name):
+            row = snapshot.job_row(job_id)
+            if row is None:
+                continue
+            selects.setdefault(name, []).append(row["job"])
+            starts.setdefault(name, row)
+            adjacency.add_row(row)
+
+    searches = {
+        name: JobBfs(selects[name], starts[name], level, level_down)
+        for name in names if name in starts
+    }
+    run_jobs_bfs(searches, adjacency, level, level_down)
+    attached_by_table = attached_by_table_of(
+        snapshot, attached_tables_of(searches)
+        )
+
+    return {
+        name: searches[name].build(adjacency, attached_by_table)
+        if name in searches else build_job_subgraph(
+            selects.get(name, []), [], [], [], [], [], [], [], []
+            )
+        for name in names
+    }
+
+
+@measured()
+def get_overlay_changes(g: GremlinUtils, job_ids: list,
+                        vertex_ids: list) -> tuple:
+    """Busca o estado atual dos jobs e vértices alterados.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    job_ids (list): IDs dos jobs com execuções alteradas.
+    vertex_ids (list): IDs dos vértices com propriedades alteradas.
+
+    Returns:
+    -------
+    tuple: Uma tupla contendo:
+        - tables: Projeções das tabelas de `vertex_ids` que existem.
+        - jobs: Para cada job de `job_ids` (e de `vertex_ids`) que existe,
+          a adjacência (`job_adjacency`) e os IDs das tabelas produzidas e
+          consumidas em qualquer execução.
+    """
+    tables, job_ids = [], set(job_ids)
+    if vertex_ids:
+        results = g.V(*vertex_ids).union(
+            tag("table", project_table(__.hasLabel(VERTEX_LABEL_TABLE))),
+            tag("job", __.hasLabel(VERTEX_LABEL_JOB).id_())
+        ).toList()
+        for result in results:
+            if result["section"] == "table":
+                tables.append(result["item"])
+            else:
+                job_ids.add(result["item"])
+    if not job_ids:
+        return tables, []
+    jobs = g.V(*job_ids).hasLabel(VERTEX_LABEL_JOB) \
+        .project("id", "row", "produces", "consumes") \
+        .by(T.id) \
+        .by(job_adjacency()) \
+        .by(
+            __.out("schedule").out("has").out("produce")
+            .hasLabel(VERTEX_LABEL_TABLE).id_().dedup().fold()
+        ) \
+        .by(
+            __.out("schedule").out("has").in_("consumed_by")
+            .hasLabel(VERTEX_LABEL_TABLE).id_().dedup().fold()
+        ) \
+        .toList()
+    return tables, jobs
+
+
+def update_overlay(g: GremlinUtils, snapshot: LineageSnapshot,
+                   job_ids: set, vertex_ids: set) -> None:
+    """Aplica ao overlay do snapshot o estado atual dos jobs e vértices
+    alterados. Os IDs não encontrados no grafo são marcados como
+    removidos."""
+    overlay = snapshot.overlay
+    # Jobs e tabelas conhecidos entre os vértices alterados, para marcar os
+    # removidos
+    known_tables, known_jobs = set(), set(job_ids)
+    for vertex_id in vertex_ids:
+        node = snapshot.vertex(vertex_id)
+        if vertex_id in overlay.rows or \
+                (node is not None and node["label"] == VERTEX_LABEL_JOB):
+            known_jobs.add(vertex_id)
+        elif vertex_id in overlay.nodes or \
+                (node is not None and node["label"] == VERTEX_LABEL_TABLE):
+            known_tables.add(vertex_id)
+
+    ids = sorted(known_jobs | set(vertex_ids))
+    found_tables, found_jobs = set(), set()
+    for start in range(0, len(ids), OVERLAY_BATCH_SIZE):
+        batch = ids[start:start + OVERLAY_BATCH_SIZE]
+        tables, jobs = get_overlay_changes(
+            g,
+            [job_id for job_id in batch if job_id in known_jobs],
+            [vertex_id for vertex_id in batch if vertex_id in vertex_ids]
+        )
+        for table in tables:
+            found_tables.add(table["id"])
+            overlay.set_node(table["id"], table)
+        for job in jobs:
+            found_jobs.add(job["id"])
+            overlay.set_job(
+                job["id"], job["row"], job["produces"], job["consumes"]
+            )
+            # Tabelas novas, criadas depois da exportação
+            row = job["row"]
+            for table in row["produces"] + row["consumes"]:
+                if snapshot.vertex(table["id"]) is None:
+                    overlay.set_node(table["id"], table)
+
+    for table_id in known_tables - found_tables:
+        overlay.set_node(table_id, None)
+    for job_id in known_jobs - found_jobs:
+        overlay.set_job(job_id, None, [], [])
+
+
+def changed_attached(snapshot: LineageSnapshot, records) -> set:
+    """Vértices cujas tabelas donas têm os nós ligados alterados: as
+    origens das arestas dos nós ligados adicionadas ou removidas e os nós
+    ligados com label ou propriedades alteradas."""
+    vertex_ids = set()
+    for record in records:
+        data = record.data
+        if data.type == "e":
+            if data.value in ATTACHED_EDGES:
+                vertex_ids.add(data.frm)
+        elif data.type == "vl":
+            if data.value in ATTACHED_LABELS:
+                vertex_ids.add(data.id)
+        elif data.type == "vp" and snapshot.is_attached(data.id):
+            vertex_ids.add(data.id)
+    return vertex_ids
+
+
+@measured()
+def get_attached_changes(g: GremlinUtils, vertex_ids: list,
+                         table_ids: list) -> tuple:
+    """Busca as tabelas donas dos vértices alterados e o estado atual dos
+    nós ligados a elas.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    vertex_ids (list): IDs retornados por `changed_attached`.
+    table_ids (list): Tabelas donas dos vértices no snapshot.
+
+    Returns:
+    -------
+    list: Para cada tabela dona que existe, o ID e os resultados de
+        `attached_nodes_of_table`.
+    """
+    owners = set(table_ids)
+    if vertex_ids:
+        owners.update(
+            g.V(*vertex_ids)
+            .until(__.hasLabel(VERTEX_LABEL_TABLE))
+            .repeat(__.in_(*ATTACHED_EDGES))
+            .dedup().id_().toList()
+        )
+    if not owners:
+        return []
+    return g.V(*owners).hasLabel(VERTEX_LABEL_TABLE) \
+        .project("id", "attached") \
+        .by(T.id) \
+        .by(attached_nodes_of_table().fold()) \
+        .toList()
+
+
+def update_attached(g: GremlinUtils, snapshot: LineageSnapshot,
+                    vertex_ids: set) -> None:
+    """Substitui no overlay os nós ligados das tabelas donas dos vértices
+    alterados, no snapshot ou no grafo. As tabelas removidas ficam sem nós
+    ligados."""
+    vertex_ids = sorted(vertex_ids)
+    for start in range(0, len(vertex_ids), OVERLAY_BATCH_SIZE):
+        batch = vertex_ids[start:start + OVERLAY_BATCH_SIZE]
+        owners = snapshot.attached_owners(batch)
+        found = set()
+        for table in get_attached_changes(g, batch, sorted(owners)):
+            found.add(table["id"])
+            snapshot.overlay.set_attached(table["id"], table["attached"])
+        for table_id in owners - found:
+            snapshot.overlay.set_attached(table_id, [])
+
+
+class SnapshotStore:
+    """Snapshot da linhagem do container, carregado na primeira consulta
+    e mantido atualizado pelo Neptune Stream.
+
+    A cada consulta (no máximo a cada `refresh_interval` segundos), até
+    `max_records` registros do stream posteriores à exportação do snapshot
+    (ou à última leitura) são lidos em lotes (`StreamReader`) e, a cada
+    lote, os jobs, vértices e nós ligados alterados são buscados no grafo e
+    gravados no overlay; os registros restantes ficam para as consultas
+    seguintes. Se a leitura falhar, ela é repetida com backoff
+    (`StreamBackoff`) e `staleness` indica há quanto tempo o snapshot não
+    recebe as alterações.
+
+    Quando o overlay passa de `max_entries` entradas, o snapshot é
+    descartado (o overlay não cresce sem limite) e as consultas passam a
+    ser respondidas pelo engine bfs, no grafo, até o container ser
+    reiniciado com um snapshot reconstruído.
+
+    Args:
+    -----
+    path (str): Arquivo do snapshot (em `/tmp` ou em uma Lambda layer).
+    stream (NeptuneStream): Stream usado no overlay. Se None, o snapshot
+        é usado sem atualizações.
+    refresh_interval (int): Intervalo mínimo, em segundos, entre leituras
+        do stream.
+    max_records (int): Registros lidos do stream por consulta.
+    max_entries (int): Entradas do overlay a partir das quais o snapshot é
+        descartado.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        stream: NeptuneStream = None,
+        refresh_interval: int = STREAM_REFRESH_INTERVAL,
+        max_records: int = STREAM_MAX_RECORDS,
+        max_entries: int = OVERLAY_MAX_ENTRIES
+    ):
+        self.path = path
+        self.stream = stream
+        self.reader = StreamReader(
+            stream, batch_size=min(STREAM_BATCH_SIZE, max_records)
+        ) if stream is not None else None
+        self.refresh_interval = refresh_interval
+        self.max_records = max_records
+        self.max_entries = max_entries
+        self.backoff = StreamBackoff()
+        self.snapshot = None
+        self.disabled = False
+        self._lock = threading.Lock()
+        self._last_event_id = None
+        self._last_refresh = 0.0
+
+    def get(self, g: GremlinUtils) -> LineageSnapshot:
+        """Retorna o snapshot atualizado, ou None depois de descartado."""
+        with self._lock:
+            if self.disabled:
+                return None
+            if self.snapshot is None:
+                self.snapshot = LineageSnapshot.load(self.path)
+                self._last_event_id = self.snapshot.event_id
+            self.refresh(g)
+            return self.snapshot
+
+    def staleness(self) -> dict:
+        """Estado da atualização do snapshot, para as respostas; None
+        quando a última leitura do stream teve sucesso ou quando as
+        consultas já são respondidas pelo grafo."""
+        if self.disabled:
+            return None
+        return self.backoff.staleness()
+
+    def refresh(self, g: GremlinUtils) -> None:
+        if self.stream is None:
+            return
+        now = time.time()
+        if now - self._last_refresh < self.refresh_interval or \
+                not self.backoff.ready():
+            return
+        self._last_refresh = now
+
+        if self._last_event_id is None:
+            try:
+                self._last_event_id = self.stream.latest_event_id()
+            except Exception as e:
+                self.backoff.failed(e)
+                return
+            self.backoff.succeeded()
+            logger.warning(
+                "Lineage snapshot has no stream position, changes before "
+                f"commit {self._last_event_id.commit_num} are not visible"
+            )
+            return
+
+        count = 0
+        try:
+            for response in self.reader.batches_after(
+                    self._last_event_id, self.max_records):
+                records = list(response.records())
+                self.apply(g, records)
+                count += len(records)
+                if self.disabled:
+                    return
+        except Exception as e:
+            # Os lotes já aplicados não são lidos de novo
+            self.backoff.failed(e)
+            return
+        self.backoff.succeeded()
+        if count:
+            logger.info(
+                f"Processed {count} stream records, lineage snapshot "
+                f"overlay has {len(self.snapshot.overlay)} entries"
+            )
+
+    def apply(self, g: GremlinUtils, records: list) -> None:
+        """Grava no overlay o estado atual dos vértices alterados por um
+        lote de registros e avança a posição do stream."""
+        job_ids, run_ids, last_event_id = changed_jobs(records)
+        vertex_ids = {
+            record.data.id for record in records
+            if record.data.type in ("vl", "vp")
+            and not is_checkpoint(record.data.id)
+        } - run_ids
+        run_ids = list(run_ids)
+        for start in range(0, len(run_ids), OVERLAY_BATCH_SIZE):
+            job_ids.update(get_owner_jobs(
+                g, run_ids[start:start + OVERLAY_BATCH_SIZE]
+            ))
+        update_overlay(g, self.snapshot, job_ids, vertex_ids)
+        update_attached(g, self.snapshot, changed_attached(
+            self.snapshot, records
+        ))
+        self._last_event_id = last_event_id
+
+        entries = len(self.snapshot.overlay)
+        if entries > self.max_entries:
+            logger.error(
+                f"Lineage snapshot overlay has {entries} entries (limit "
+                f"{self.max_entries}), answering with the bfs engine until "
+                "the snapshot is rebuilt"
+            )
+            self.snapshot = None
+            self.disabled = True
+
+    def get_subgraph_of_the_table(
+            self,
+            g: GremlinUtils,
+            tableId: str,
+            level: int = 10,
+            level_down: int = None
+            ) -> dict:
+        """Mesmo contrato de `get_subgraph_of_the_table`, respondido pelo
+        snapshot."""
+        return self.get_subgraphs(
+            g, VERTEX_LABEL_TABLE, [tableId], level, level_down
+            )[tableId]
+
+    def get_subgraph_of_the_job(
+            self,
+            g: GremlinUtils,
+            jobId: str,
+            level: int = 10,
+            level_down: int = None
+            ) -> dict:
+        """Mesmo contrato de `get_subgraph_of_the_job`, respondido pelo
+        snapshot."""
+        return self.get_subgraphs(
+            g, VERTEX_LABEL_JOB, [jobId], level, level_down
+            )[jobId]
+
+    def get_subgraphs(self, g: GremlinUtils, node_type: str,
+                      node_names: list, level: int,
+                      level_down: int = None) -> dict:
+        """Subgrafos de vários nós, como no modo em lote do engine bfs."""
+        snapshot = self.get(g)
+        if snapshot is None:
+            batch_reader = get_subgraphs_of_the_tables_bfs \
+                if node_type == VERTEX_LABEL_TABLE \
+                else get_subgraphs_of_the_jobs_bfs
+            return batch_reader(g, node_names, level, level_down)
+        batch_reader = get_subgraphs_of_the_tables_snapshot \
+            if node_type == VERTEX_LABEL_TABLE \
+            else get_subgraphs_of_the_jobs_snapshot
+        return batch_reader(snapshot, node_names, level, level_down)
+
+
+def read_export(path: str):
+    """Lê uma exportação completa do grafo como ("vertex", item) e
+    ("edge", item): um arquivo JSON no formato de `utils/data.json` ou um
+    diretório com os CSV do bulk loader do Neptune."""
+    if not os.path.isdir(path):
+        with open(path) as file:
+            data = json.load(file)
+        for vertices in data["nodes"].values():
+            for item in vertices:
+                yield "vertex", item
+        for item in data["edges"]:
+            yield "edge", item
+        return
+
+    vertex_files, edge_files = [], []
+    for name in sorted(os.listdir(path)):
+        if not name.endswith(".csv"):
+            continue
+        with open(os.path.join(path, name), newline="") as file:
+            header = next(csv.reader(file), [])
+        files = edge_files if "~from" in header else vertex_files
+        files.append(os.path.join(path, name))
+    for kind, files in (("vertex", vertex_files), ("edge", edge_files)):
+        for file_path in files:
+            with open(file_path, newline="") as file:
+                for item in csv.DictReader(file):
+                    yield kind, item
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Constrói o snapshot da linhagem a partir de uma "
+        "exportação completa do grafo"
+    )
+    parser.add_argument(
+        "--input", required=True,
+        help="Arquivo JSON (formato de utils/data.json) ou diretório CSV"
+    )
+    parser.add_argument("--output", required=True)
+    parser.add_argument(
+        "--commit-num", type=int,
+        help="Commit do Neptune Stream no momento da exportação"
+    )
+    parser.add_argument("--op-num", type=int, default=1)
+    args = parser.parse_args()
+
+    started_at = time.perf_counter()
+    snapshot = LineageSnapshot.build(
+        read_export(args.input),
+        EventId(args.commit_num, args.op_num) if args.commit_num else None
+    )
+    snapshot.save(args.output)
+    print(
+        f"{len(snapshot.ids):,} vertices, "
+        f"{snapshot.memory_usage() / 2 ** 20:.1f} MiB in memory, "
+        f"{os.path.getsize(args.output) / 2 ** 20:.1f} MiB on disk, "
+        f"built in {time.perf_counter() - started_at:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import logging
+import os
+import threading
+import time
+from gremlin_python.process.traversal import T, P
+from neptune_python_utils.gremlin_utils import GremlinUtils
+from neptune_python_utils.streams import NeptuneStream
+from utils.query_metrics import measured
+from utils.constants import VERTEX_LABEL_JOB, VERTEX_LABEL_TABLE
+from utils.stream_reader import StreamBackoff
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Intervalo (s) mínimo entre duas leituras do Neptune Stream
+NAME_INDEX_REFRESH_INTERVAL = \
+    int(os.getenv("NAME_INDEX_REFRESH_INTERVAL", "5"))
+# Registros lidos do stream, no máximo, em cada atualização
+STREAM_MAX_RECORDS = \
+    int(os.getenv("NAME_INDEX_STREAM_MAX_RECORDS", "1000"))
+
+# Propriedade com o nome de cada label indexado
+NAME_PROPERTIES = {
+    VERTEX_LABEL_TABLE: "table_name",
+    VERTEX_LABEL_JOB: "name",
+}
+
+# Índice registrado pelo container, usado por `start_vertices`
+_index = None
+
+
+class NameIndex:
+    """Índice em memória de nome para IDs dos vértices TABLE e JOB.
+
+    O índice é carregado com uma consulta por label (`load`) e mantido
+    atualizado pelo Neptune Stream: a cada uso (no máximo a cada
+    `refresh_interval` segundos), os registros posteriores à última leitura
+    são aplicados diretamente, sem consultas ao grafo. Os registros `vl`
+    indicam o label dos vértices novos e removidos e os `vp` da propriedade
+    de nome (`NAME_PROPERTIES`) adicionam ou removem os nomes.
+
+    O índice é carregado no primeiro `get`, não na inicialização do
+    container. Cada atualização lê no máximo `max_records` registros; o
+    restante fica para as próximas consultas. Após uma falha do stream, a
+    leitura é repetida com backoff (`StreamBackoff`) e o índice continua
+    em uso, apenas atrasado; se a carga falhar, as consultas buscam os
+    nomes pela propriedade até a próxima tentativa.
+
+    Como o índice pode estar atrasado, um nome fora dele não garante que o
+    vértice não existe: ele é buscado no grafo pela propriedade (`resolve`)
+    antes do 404. Só os nomes presentes no índice evitam a consulta; um
+    nome inexistente ainda custa uma busca indexada, em troca de não
+    responder 404 para vértices criados desde a última leitura.
+
+    Args:
+    -----
+    stream (NeptuneStream): Stream usado nas atualizações.
+    refresh_interval (int): Intervalo mínimo, em segundos, entre leituras do
+        stream.
+    max_records (int): Registros lidos, no máximo, em cada atualização.
+    """
+
+    def __init__(
+        self,
+        stream: NeptuneStream,
+        refresh_interval: int = NAME_INDEX_REFRESH_INTERVAL,
+        max_records: int = STREAM_MAX_RECORDS
+    ):
+        self.stream = stream
+        self.refresh_interval = refresh_interval
+        self.max_records = max_records
+        self.backoff = StreamBackoff()
+        self.loaded = False
+        self._ids = {label: {} for label in NAME_PROPERTIES}
+        self._vertices = {}
+        self._lock = threading.RLock()
+        self._last_event_id = None
+        self._last_refresh = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.stream is not None
+
+    def __len__(self) -> int:
+        return len(self._vertices)
+
+    @measured("name_index_load")
+    def load(self, g: GremlinUtils) -> int:
+        """Carrega os nomes de todas as tabelas e jobs.
+
+        A posição do stream é lida antes das consultas, então as alterações
+        feitas durante a carga são aplicadas de novo na próxima leitura.
+
+        Returns:
+        -------
+        int: Número de vértices indexados.
+        """
+        with self._lock:
+            if not self.enabled or not self.backoff.ready():
+                return 0
+            try:
+                last_event_id = self.stream.latest_event_id()
+            except Exception as e:
+                self.backoff.failed(e)
+                return 0
+            self.backoff.succeeded()
+            started_at = time.perf_counter()
+            self.clear()
+            for label, key in NAME_PROPERTIES.items():
+                for vertex in g.V().has(label, key) \
+                        .project("id", "name") \
+                        .by(T.id) \
+                        .by(key) \
+                        .toList():
+                    self._vertices[vertex["id"]] = (label, None)
+                    self._add(vertex["id"], vertex["name"])
+            self._last_event_id = last_event_id
+            self._last_refresh = time.time()
+            self.loaded = True
+            logger.info(
+                f"Name index loaded with {len(self._vertices)} vertices in "
+                f"{time.perf_counter() - started_at:.2f}s"
+            )
+            return len(self._vertices)
+
+    def clear(self) -> None:
+        """Descarta o índice; ele é carregado de novo no próximo `get`."""
+        with self._lock:
+            self._ids = {label: {} for label in NAME_PROPERTIES}
+            self._vertices = {}
+            self.loaded = False
+
+    def get(self, g: GremlinUtils):
+        """Retorna o índice atualizado, carregando-o se necessário, ou None
+        quando ele não pode ser usado."""
+        with self._lock:
+            if not self.enabled:
+                return None
+            if not self.loaded:
+                self.load(g)
+            else:
+                self.refresh()
+            return self if self.loaded else None
+
+    def _add(self, vertex_id: str, name: str) -> None:
+        label, previous = self._vertices[vertex_id]
+        if previous is not None:
+            self._remove_name(vertex_id)
+        ids = self._ids[label].setdefault(name, [])
+        if vertex_id not in ids:
+            ids.append(vertex_id)
+        self._vertices[vertex_id] = (label, name)
+
+    def _remove_name(self, vertex_id: str) -> None:
+        label, name = self._vertices[vertex_id]
+        ids = self._ids[label].get(name)
+        if ids and vertex_id in ids:
+            ids.remove(vertex_id)
+            if not ids:
+                del self._ids[label][name]
+        self._vertices[vertex_id] = (label, None)
+
+    def apply(self, record) -> None:
+        """Aplica um registro do Neptune Stream ao índice."""
+        data = record.data
+        if data.type == "vl":
+            if data.value not in NAME_PROPERTIES:
+                return
+            if record.op == "ADD":
+                self._vertices.setdefault(data.id, (data.value, None))
+            elif data.id in self._vertices:
+                self._remove_name(data.id)
+                del self._vertices[data.id]
+        elif data.type == "vp" and data.id in self._vertices:
+            label, name = self._vertices[data.id]
+            if data.key != NAME_PROPERTIES[label]:
+                return
+            if record.op == "ADD":
+                self._add(data.id, data.value)
+            elif name == data.value:
+                self._remove_name(data.id)
+
+    def refresh(self) -> None:
+        """Aplica até `max_records` registros do stream posteriores à
+        última leitura, com uma única requisição."""
+        if not self.enabled or not self.loaded:
+            return
+        now = time.time()
+        if now - self._last_refresh < self.refresh_interval or \
+                not self.backoff.ready():
+            return
+        self._last_refresh = now
+
+        try:
+            response = self.stream.poll_after(
+                self._last_event_id, self.max_records
+            )
+        except Exception as e:
+            self.backoff.failed(e)
+            return
+        self.backoff.succeeded()
+        if response is None or response.total_records == 0:
+            return
+
+        count = 0
+        for record in response.records():
+            self.apply(record)
+            self._last_event_id = record.event_id
+            count += 1
+        if count >= self.max_records:
+            # Há mais registros pendentes: a próxima consulta continua a
+            # leitura sem esperar o intervalo
+            self._last_refresh = 0.0
+        if count:
+            logger.info(
+                f"Processed {count} stream records, name index has "
+                f"{len(self._vertices)} vertices"
+            )
+
+    @measured("name_index_resolve")
+    def resolve(self, g: GremlinUtils, label: str, names: list) -> dict:
+        """Busca no grafo, pela propriedade, os nomes fora do índice e os
+        acrescenta a ele.
+
+        Returns:
+        -------
+        dict: Os IDs de cada nome encontrado.
+        """
+        key = NAME_PROPERTIES[label]
+        found = {}
+        for vertex in g.V().has(label, key, P.within(names)) \
+                .project("id", "name") \
+                .by(T.id) \
+                .by(key) \
+                .toList():
+            found.setdefault(vertex["name"], []).append(vertex["id"])
+        if found:
+            logger.info(
+                f"Name index missed {len(found)} existing {label} names"
+            )
+            with self._lock:
+                if self.loaded:
+                    for name, ids in found.items():
+                        for vertex_id in ids:
+                            self._vertices.setdefault(
+                                vertex_id, (label, None)
+                            )
+                            self._add(vertex_id, name)
+        return found
+
+    def ids(self, label: str, names: list) -> dict:
+        """Retorna os IDs de cada nome conhecido, na ordem de `names`."""
+        index = self._ids[label]
+        return {name: list(index[name]) for name in names if name in index}
+
+    def contains(self, label: str, name: str) -> bool:
+        return name in self._ids.get(label, {})
+
+
+def register_name_index(index: NameIndex) -> None:
+    """Registra o índice usado por `start_vertices`."""
+    global _index
+    _index = index
+
+
+def start_vertices(source, label: str, names: list):
+    """Travessia a partir dos vértices `label` com os nomes informados.
+
+    Com um índice registrado e carregado que conhece todos os nomes, parte
+    dos IDs (`g.V(ids)`); caso contrário (inclusive quando algum nome está
+    fora do índice, que pode estar atrasado em relação ao grafo), busca os
+    nomes pela propriedade.
+
+    Args:
+    -----
+    source: Fonte da travessia (`g` ou `g.with_(...)`).
+    label (str): Label dos vértices (TABLE ou JOB).
+    names (list): Nomes buscados.
+    """
+    if _index is not None and _index.loaded:
+        known = _index.ids(label, names)
+        if len(known) == len(set(names)):
+            return source.V(*[
+                vertex_id for ids in known.values() for vertex_id in ids
+            ])
+    key = NAME_PROPERTIES[label]
+    if len(names) == 1:
+        return source.V().has(label, key, names[0])
+    return source.V().has(label, key, P.within(names))
@@ -0,0 +1,148 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Habilita a medição das consultas, o registro JSON por requisição e o
+# header Server-Timing
+QUERY_METRICS = os.getenv("QUERY_METRICS", "false").lower() == "true"
+
+DEPTH_ARGUMENTS = ("level", "level_down")
+
+# Medições da requisição corrente. O contexto é copiado para as tasks do
+# asyncio, que registram na mesma lista
+_current = contextvars.ContextVar("query_metrics", default=None)
+
+
+def result_size(result) -> int:
+    """Número de itens de um resultado. Tuplas (como as de
+    `get_nodes_until_models`) e dicionários de listas (como os subgrafos)
+    somam o tamanho das listas que contêm."""
+    if isinstance(result, tuple):
+        return sum(result_size(item) for item in result)
+    if isinstance(result, dict):
+        lists = [value for value in result.values()
+                 if isinstance(value, list)]
+        return sum(len(value) for value in lists) if lists else 1
+    if isinstance(result, (list, set)):
+        return len(result)
+    return 0 if result is None else 1
+
+
+def result_bytes(result) -> int:
+    """Tamanho aproximado, em bytes, do resultado serializado em JSON."""
+    try:
+        return len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+def record(name: str, started_at: float, result, depth: dict = None) -> None:
+    """Registra uma consulta iniciada em `started_at` (`time.perf_counter`)
+    na requisição corrente. Não faz nada quando não há medição ativa."""
+    queries = _current.get()
+    if queries is None:
+        return
+    entry = {
+        "query": name,
+        "ms": round((time.perf_counter() - started_at) * 1000, 2),
+        "count": result_size(result),
+        "bytes": result_bytes(result),
+    }
+    if depth:
+        entry.update(depth)
+    queries.append(entry)
+
+
+def is_active() -> bool:
+    return _current.get() is not None
+
+
+def to_list(name: str, traversal, depth: dict = None) -> list:
+    """Executa `traversal.toList()` registrando a consulta como `name`."""
+    if _current.get() is None:
+        return traversal.toList()
+    started_at = time.perf_counter()
+    result = traversal.toList()
+    record(name, started_at, result, depth)
+    return result
+
+
+def measured(name: str = None):
+    """Decorator que mede cada chamada da função: tempo, número de itens,
+    bytes aproximados e as profundidades (`level`/`level_down`) pedidas.
+
+    Sem medição ativa, a função é chamada diretamente, com o custo de uma
+    leitura do `ContextVar`.
+    """
+    def decorator(func):
+        query_name = name or func.__name__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            depth = {
+                key: bound[key] for key in DEPTH_ARGUMENTS if key in bound
+            }
+            started_at = time.perf_counter()
+            result = func(*args, **kwargs)
+            record(query_name, started_at, result, depth)
+            return result
+        return wrapper
+    return decorator
+
+
+def server_timing(queries: list, total_ms: float) -> str:
+    """Monta o header Server-Timing, somando as consultas de mesmo nome."""
+    durations = {}
+    for entry in queries:
+        durations[entry["query"]] = \
+            durations.get(entry["query"], 0) + entry["ms"]
+    metrics = [
+        f"{query};dur={duration:.2f}"
+        for query, duration in durations.items()
+    ]
+    metrics.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(metrics)
+
+
+def with_query_metrics(handler):
+    """Decorator do handler: mede as consultas da requisição, emite um
+    registro JSON com todas elas e adiciona o header Server-Timing à
+    resposta. Com `QUERY_METRICS` desligado, chama o handler diretamente."""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if not QUERY_METRICS:
+            return handler(event, context)
+        queries = []
+        token = _current.set(queries)
+        started_at = time.perf_counter()
+        try:
+            response = handler(event, context)
+        finally:
+            _current.reset(token)
+        total_ms = round((time.perf_counter() - started_at) * 1000, 2)
+
+        # Com o LoggingConfig JSON, os campos de `extra` viram chaves do
+        # registro
+        logger.info("Query metrics", extra={
+            "queryMetrics": {
+                "parameters": event.get("queryStringParameters") or {},
+                "totalMs": total_ms,
+                "statusCode": response.get("statusCode"),
+                "queries": queries,
+            }
+        })
+        headers = dict(response.get("headers") or {})
+        headers["Server-Timing"] = server_timing(queries, total_ms)
+        return dict(response, headers=headers)
+    return wrapper
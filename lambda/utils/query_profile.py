@@ -0,0 +1,189 @@
+import logging
+from neptune_python_utils.gremlin_utils import GremlinUtils
+from utils.constants import (
+    ENGINE_DEFAULT,
+    ENGINE_SINGLE_TRIP,
+    ENGINE_SHORTCUT,
+    VERTEX_LABEL_TABLE
+)
+from utils.data_reader import (
+    LineageSteps,
+    ShortcutLineageSteps,
+    table_single_trip,
+    job_single_trip,
+    ascendant_nodes_from_table,
+    descendant_nodes_from_table,
+    edges_from_table,
+    ascendant_nodes_from_job,
+    descendant_nodes_from_job,
+    edges_from_job,
+    nodes_until_models,
+    nodes_until_dashboards
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DEBUG_PROFILE = "profile"
+# Engines cujas travessias podem ser reexecutadas com profile(); os demais
+# (bfs, snapshot, closure) montam o subgrafo em Python a partir de várias
+# consultas que dependem dos resultados anteriores
+PROFILE_ENGINES = (ENGINE_DEFAULT, ENGINE_SINGLE_TRIP, ENGINE_SHORTCUT)
+
+
+def lineage_traversals(
+        g: GremlinUtils,
+        node_type: str,
+        node_id: str,
+        tables_ids: list,
+        level: int,
+        level_down: int
+        ) -> list:
+    """Retorna as travessias de `get_subgraph_of_the_table` ou
+    `get_subgraph_of_the_job`, sem executá-las, como pares (nome,
+    travessia)."""
+    if node_type == VERTEX_LABEL_TABLE:
+        traversals = [
+            ("ascendant_nodes_from_table",
+             ascendant_nodes_from_table(g, [node_id], level)),
+            ("descendant_nodes_from_table",
+             descendant_nodes_from_table(g, [node_id], level_down)),
+            ("edges_from_table",
+             edges_from_table(g, [node_id], level, level_down)),
+        ]
+    else:
+        traversals = [
+            ("ascendant_nodes_from_job",
+             ascendant_nodes_from_job(g, [node_id], level)),
+            ("descendant_nodes_from_job",
+             descendant_nodes_from_job(g, [node_id], level_down)),
+            ("edges_from_job",
+             edges_from_job(g, [node_id], level, level_down)),
+        ]
+    models_nodes, models_edges = nodes_until_models(g, tables_ids)
+    dashboards_nodes, dashboards_edges = \
+        nodes_until_dashboards(g, tables_ids)
+    return traversals + [
+        ("nodes_until_models", models_nodes),
+        ("edges_until_models", models_edges),
+        ("nodes_until_dashboards", dashboards_nodes),
+        ("edges_until_dashboards", dashboards_edges),
+    ]
+
+
+def single_trip_traversals(
+        g: GremlinUtils,
+        node_type: str,
+        node_name: str,
+        level: int,
+        level_down: int,
+        steps: LineageSteps = LineageSteps
+        ) -> list:
+    """Retorna a travessia de `get_subgraph_of_the_table_single_trip` ou
+    `get_subgraph_of_the_job_single_trip`, sem executá-la, como par (nome,
+    travessia)."""
+    if node_type == VERTEX_LABEL_TABLE:
+        name = "table_single_trip"
+        traversal = table_single_trip(g, node_name, level, level_down, steps)
+    else:
+        name = "job_single_trip"
+        traversal = job_single_trip(g, node_name, level, level_down, steps)
+    return [(name, traversal)] if traversal is not None else []
+
+
+def flatten_metrics(metrics: list, depth: int = 0) -> list:
+    """Converte as métricas do `profile()` em uma lista de passos com
+    traversers, elementos e tempo. Os passos aninhados (dentro de
+    `repeat`, `local`, `union`, ...) vêm logo depois do passo pai, com
+    `depth` maior."""
+    steps = []
+    for metric in metrics or []:
+        counts = metric.get("counts") or {}
+        annotations = metric.get("annotations") or {}
+        steps.append({
+            "step": metric.get("name"),
+            "depth": depth,
+            "traversers": counts.get("traverserCount"),
+            "elements": counts.get("elementCount"),
+            "ms": metric.get("dur"),
+            "percentDur": annotations.get("percentDur"),
+        })
+        steps.extend(flatten_metrics(metric.get("metrics"), depth + 1))
+    return steps
+
+
+def profile_traversal(traversal) -> dict:
+    """Executa a travessia com `profile()` e resume o resultado."""
+    metrics = traversal.profile().next()
+    return {
+        "ms": metrics.get("dur"),
+        "steps": flatten_metrics(metrics.get("metrics")),
+    }
+
+
+def profile_subgraph(
+        g: GremlinUtils,
+        node_type: str,
+        subgraph: dict,
+        level: int,
+        level_down: int,
+        engine: str = ENGINE_DEFAULT
+        ) -> list:
+    """Executa novamente, com `profile()`, cada travessia usada pelo engine
+    `engine` para montar `subgraph`.
+
+    No engine default, as travessias dos nós ligados às tabelas usam as
+    tabelas do próprio subgrafo, como na consulta original. Os engines
+    single_trip e shortcut têm uma única travessia, que parte do nome do
+    nó.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    node_type (str): Tipo do nó consultado (TABLE ou JOB).
+    subgraph (dict): Subgrafo retornado para o nó.
+    level (int): Profundidade da busca de ascendentes.
+    level_down (int): Profundidade da busca de descendentes.
+    engine (str): Engine que montou o subgrafo, um de `PROFILE_ENGINES`.
+
+    Returns:
+    -------
+    list: Uma entrada por travessia, com o nome, a duração total e os
+        passos com número de traversers, elementos e tempo.
+
+    Raises:
+    -------
+    ValueError: Se o engine não estiver em `PROFILE_ENGINES`.
+    """
+    if engine not in PROFILE_ENGINES:
+        raise ValueError(f"Engine {engine} cannot be profiled")
+    if node_type == VERTEX_LABEL_TABLE:
+        start = subgraph.get("table") or {}
+        tables_ids = [start["id"]] if start else []
+    else:
+        start = subgraph.get("job") or {}
+        tables_ids = []
+    if not start:
+        return []
+    if engine == ENGINE_DEFAULT:
+        tables_ids += [
+            table["id"] for table in subgraph.get("descendantTables", [])
+        ]
+        traversals = lineage_traversals(
+            g, node_type, start["id"], tables_ids, level, level_down
+        )
+    else:
+        node_name = start.get("table_name") \
+            if node_type == VERTEX_LABEL_TABLE else start.get("name")
+        traversals = single_trip_traversals(
+            g, node_type, node_name, level, level_down,
+            ShortcutLineageSteps if engine == ENGINE_SHORTCUT
+            else LineageSteps
+        )
+
+    profiles = []
+    for name, traversal in traversals:
+        logger.info(f"Profiling {name}")
+        profiles.append(dict(query=name, **profile_traversal(traversal)))
+    return profiles
@@ -0,0 +1,58 @@
+import logging
+from gremlin_python.process.traversal import T, Cardinality
+from gremlin_python.process.graph_traversal import __
+from neptune_python_utils.gremlin_utils import GremlinUtils
+from neptune_python_utils.streams import EventId
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+VERTEX_LABEL_CHECKPOINT = "CHECKPOINT"
+CHECKPOINT_ID_PREFIX = "checkpoint-"
+
+
+def checkpoint_id(name: str) -> str:
+    return f"{CHECKPOINT_ID_PREFIX}{name}"
+
+
+def is_checkpoint(vertex_id) -> bool:
+    """Se o vértice é um CHECKPOINT. As gravações dos checkpoints também
+    geram registros no stream, que os consumidores devem ignorar."""
+    return isinstance(vertex_id, str) and \
+        vertex_id.startswith(CHECKPOINT_ID_PREFIX)
+
+
+def load_checkpoint(g: GremlinUtils, name: str) -> EventId:
+    """Retorna o último `EventId` do Neptune Stream processado pelo
+    consumidor `name`, ou None se ele ainda não tiver checkpoint."""
+    checkpoint = g.V(checkpoint_id(name)) \
+        .hasLabel(VERTEX_LABEL_CHECKPOINT) \
+        .project("commit_num", "op_num") \
+        .by("commit_num") \
+        .by("op_num") \
+        .toList()
+    if not checkpoint:
+        return None
+    return EventId(
+        int(checkpoint[0]["commit_num"]),
+        int(checkpoint[0]["op_num"])
+    )
+
+
+def save_checkpoint(g: GremlinUtils, name: str, event_id: EventId) -> None:
+    """Grava o `EventId` processado pelo consumidor `name` em um vértice
+    CHECKPOINT do próprio grafo, para que reinícios continuem do mesmo
+    ponto do stream."""
+    vertex_id = checkpoint_id(name)
+    g.V(vertex_id).fold() \
+        .coalesce(
+            __.unfold(),
+            __.addV(VERTEX_LABEL_CHECKPOINT).property(T.id, vertex_id)
+        ) \
+        .property(Cardinality.single, "commit_num", event_id.commit_num) \
+        .property(Cardinality.single, "op_num", event_id.op_num) \
+        .iterate()
+    logger.info(
+        f"Checkpoint '{name}' saved at commit {event_id.commit_num}, "
+        f"op {event_id.op_num}"
+    )
@@ -0,0 +1,254 @@
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from neptune_python_utils.streams import EventId, NeptuneStream
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Registros pedidos no primeiro lote e limites do ajuste (o Neptune aceita
+# até 100000 por requisição)
+STREAM_READER_BATCH_SIZE = int(
+    os.getenv("STREAM_READER_BATCH_SIZE", "1000")
+)
+STREAM_READER_MIN_BATCH_SIZE = 100
+STREAM_READER_MAX_BATCH_SIZE = 100000
+# Tempo (s) de processamento de um lote buscado pelo ajuste do `limit`
+STREAM_READER_TARGET_SECONDS = float(
+    os.getenv("STREAM_READER_TARGET_SECONDS", "1.0")
+)
+# Espera (s) após a primeira falha de leitura do stream e o limite dela
+STREAM_RETRY_DELAY = float(os.getenv("STREAM_RETRY_DELAY", "5"))
+STREAM_RETRY_MAX_DELAY = float(os.getenv("STREAM_RETRY_MAX_DELAY", "300"))
+
+
+class StreamBackoff:
+    """Intervalo entre leituras do stream pelos consumidores do caminho de
+    leitura depois de uma falha.
+
+    Em vez de desabilitar o stream, o consumidor espera (backoff
+    exponencial com jitter, de `delay` até `max_delay` segundos) e tenta
+    de novo. `failures` e `failing_since` indicam, nas respostas, há quanto
+    tempo os dados servidos não recebem as alterações do grafo.
+
+    Args:
+    -----
+    delay (float): Espera após a primeira falha.
+    max_delay (float): Espera máxima entre tentativas.
+    """
+
+    def __init__(
+        self,
+        delay: float = STREAM_RETRY_DELAY,
+        max_delay: float = STREAM_RETRY_MAX_DELAY
+    ):
+        self.delay = delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.failing_since = None
+        self._retry_at = 0.0
+
+    def ready(self) -> bool:
+        """Se a próxima leitura pode ser feita."""
+        return time.time() >= self._retry_at
+
+    def failed(self, error: Exception) -> float:
+        """Registra uma falha e retorna a espera até a próxima tentativa."""
+        now = time.time()
+        self.failures += 1
+        if self.failing_since is None:
+            self.failing_since = now
+        wait = min(self.max_delay, self.delay * 2 ** (self.failures - 1))
+        wait = random.uniform(wait / 2, wait)
+        self._retry_at = now + wait
+        logger.warning(
+            f"Neptune stream read failed ({self.failures} in a row), "
+            f"retrying in {wait:.1f}s: {error}"
+        )
+        return wait
+
+    def succeeded(self) -> None:
+        if self.failures:
+            logger.info(
+                f"Neptune stream read recovered after {self.failures} "
+                "failures"
+            )
+        self.failures = 0
+        self.failing_since = None
+        self._retry_at = 0.0
+
+    def staleness(self) -> dict:
+        """Estado da leitura do stream, para as respostas; None quando a
+        última leitura teve sucesso."""
+        if not self.failures:
+            return None
+        return {
+            "streamFailures": self.failures,
+            "staleSeconds": round(time.time() - self.failing_since, 1),
+        }
+
+
+class StreamReader:
+    """Leitor do Neptune Stream em pipeline.
+
+    Enquanto o consumidor processa o lote N, o lote N + 1 (que começa no
+    `last_event_id` do lote N) é buscado em uma thread. As requisições
+    usam a `Session` do `NeptuneStream` (conexões keep-alive), que repete
+    as respostas de throttling e erros de conexão com backoff exponencial
+    e jitter.
+
+    O `limit` de cada requisição acompanha a velocidade do consumidor:
+    os lotes têm o número de registros que ele processa em
+    `target_seconds`, no máximo dobrando ou caindo pela metade a cada lote,
+    e só crescem enquanto o stream devolve lotes cheios.
+
+    Args:
+    -----
+    stream (NeptuneStream): Stream lido.
+    batch_size (int): `limit` do primeiro lote.
+    target_seconds (float): Tempo de processamento buscado por lote.
+    """
+
+    def __init__(
+        self,
+        stream: NeptuneStream,
+        batch_size: int = STREAM_READER_BATCH_SIZE,
+        target_seconds: float = STREAM_READER_TARGET_SECONDS
+    ):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.target_seconds = target_seconds
+        self._executor = None
+        self.reset_metrics()
+
+    def reset_metrics(self) -> None:
+        self.records = 0
+        self.batches = 0
+        self.fetch_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.consume_seconds = 0.0
+        self.lag_ms = None
+        self._retries = self.stream.retries
+
+    def metrics(self) -> dict:
+        """Métricas desde o último `reset_metrics`.
+
+        - recordsPerSecond: registros por segundo de leitura (espera pelas
+          requisições mais processamento);
+        - fetchMs / waitMs: tempo total das requisições e o tempo em que o
+          consumidor ficou parado esperando por elas;
+        - lagMs: distância entre o último commit do stream e o do último
+          registro lido;
+        - retries: requisições repetidas por throttling ou falha.
+        """
+        elapsed = self.wait_seconds + self.consume_seconds
+        return {
+            "records": self.records,
+            "batches": self.batches,
+            "recordsPerSecond": round(self.records / elapsed, 1)
+            if elapsed else 0.0,
+            "batchSize": self.batch_size,
+            "fetchMs": round(self.fetch_seconds * 1000, 2),
+            "waitMs": round(self.wait_seconds * 1000, 2),
+            "lagMs": self.lag_ms,
+            "retries": self.stream.retries - self._retries,
+        }
+
+    def _fetch(self, event_id: EventId, limit: int) -> tuple:
+        started_at = time.perf_counter()
+        response = self.stream.poll_after(event_id, limit)
+        return response, time.perf_counter() - started_at
+
+    def _submit(self, event_id: EventId, limit: int):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="stream-reader"
+            )
+        return self._executor.submit(self._fetch, event_id, limit)
+
+    def _adapt(self, count: int, limit: int, seconds: float) -> None:
+        """Ajusta o `limit` ao ritmo do consumidor no último lote."""
+        if seconds <= 0:
+            wanted = 2 * self.batch_size
+        else:
+            wanted = int(count / seconds * self.target_seconds)
+        if count < limit:
+            # Lote incompleto: o stream não tem mais registros para um
+            # lote maior
+            wanted = min(wanted, self.batch_size)
+        self.batch_size = max(
+            STREAM_READER_MIN_BATCH_SIZE,
+            min(STREAM_READER_MAX_BATCH_SIZE, 2 * self.batch_size,
+                max(self.batch_size // 2, wanted))
+        )
+
+    def _limit(self, remaining: int) -> int:
+        if remaining is None:
+            return self.batch_size
+        return max(1, min(self.batch_size, remaining))
+
+    def batches_after(self, event_id: EventId, max_records: int = None):
+        """Lotes (`NeptuneStreamResponse`) posteriores a `event_id`, até
+        `max_records` registros.
+
+        A leitura termina quando o stream não tem mais registros. Erros
+        que não são repetidos (ou que persistem) são propagados. O tempo
+        até o pedido do lote seguinte é o tempo de processamento usado no
+        ajuste do `limit`.
+
+        Yields:
+        -------
+        NeptuneStreamResponse: Os lotes, em ordem. `columns()` expõe os
+            registros como colunas, sem um objeto por registro.
+        """
+        remaining = max_records
+        limit = self._limit(remaining)
+        future = self._submit(event_id, limit)
+        try:
+            while future is not None:
+                started_at = time.perf_counter()
+                response, fetch_seconds = future.result()
+                self.wait_seconds += time.perf_counter() - started_at
+                self.fetch_seconds += fetch_seconds
+                future = None
+                if response is None or response.total_records == 0:
+                    return
+                count = response.total_records
+                if remaining is not None:
+                    remaining -= count
+                # Busca o próximo lote antes de entregar este
+                next_limit = self._limit(remaining)
+                if remaining is None or remaining > 0:
+                    future = self._submit(response.last_event_id, next_limit)
+
+                started_at = time.perf_counter()
+                yield response
+                seconds = time.perf_counter() - started_at
+                self.consume_seconds += seconds
+                self.records += count
+                self.batches += 1
+                self.lag_ms = response.last_transaction_timestamp - \
+                    response.records_json[-1]["commitTimestamp"]
+                self._adapt(count, limit, seconds)
+                limit = next_limit
+        finally:
+            if future is not None:
+                future.cancel()
+
+    def records_after(self, event_id: EventId, max_records: int = None):
+        """Registros posteriores a `event_id`, até `max_records`, como em
+        `batches_after`.
+
+        Yields:
+        -------
+        NeptuneStreamRecord: Os registros, em ordem.
+        """
+        for response in self.batches_after(event_id, max_records):
+            yield from response.records()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
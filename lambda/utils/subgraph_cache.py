@@ -0,0 +1,259 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from neptune_python_utils.streams import NeptuneStream
+from utils.stream_checkpoint import is_checkpoint
+from utils.stream_reader import StreamBackoff
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+SUBGRAPH_CACHE_SIZE = int(os.getenv("SUBGRAPH_CACHE_SIZE", "128"))
+SUBGRAPH_CACHE_TTL = int(os.getenv("SUBGRAPH_CACHE_TTL", "300"))
+# Intervalo (s) mínimo entre duas leituras do Neptune Stream
+STREAM_REFRESH_INTERVAL = int(os.getenv("SUBGRAPH_CACHE_STREAM_INTERVAL", "5"))
+# Registros lidos do stream por consulta ao cache (uma requisição); com
+# mais alterações pendentes, o cache inteiro é descartado
+STREAM_MAX_RECORDS = int(
+    os.getenv("SUBGRAPH_CACHE_STREAM_MAX_RECORDS", "1000")
+)
+
+# Arestas com uma ponta em JOB_RUN/EXECUTION_PLAN, vértices que não aparecem
+# na resposta e precisam ser resolvidos para o JOB dono antes da invalidação
+RUN_EDGE_LABELS = ("has", "produce", "consumed_by")
+
+
+def collect_ids(subgraph: dict) -> set:
+    """Retorna os IDs de todos os vértices presentes em um subgrafo."""
+    ids = set()
+    for value in subgraph.values():
+        if isinstance(value, dict):
+            value = [value]
+        if not isinstance(value, list):
+            continue
+        for item in value:
+            if not isinstance(item, dict):
+                continue
+            for key in ("id", "from", "to"):
+                if key in item:
+                    ids.add(item[key])
+    return ids
+
+
+class _CacheEntry:
+
+    __slots__ = ("value", "ids", "created_at", "commit_num")
+
+    def __init__(self, value, ids, created_at, commit_num):
+        self.value = value
+        self.ids = ids
+        self.created_at = created_at
+        self.commit_num = commit_num
+
+
+class SubgraphCache:
+    """Cache LRU em memória dos subgrafos calculados pelo container.
+
+    As entradas são indexadas por (node_type, node_name, level, level_down,
+    sections, engine), limitadas a `max_entries` e expiram após `ttl`
+    segundos.
+    Quando um `NeptuneStream` é informado, cada consulta ao cache lê (no
+    máximo a cada `refresh_interval` segundos) os registros do stream
+    posteriores ao último commit processado e remove apenas as entradas que
+    contêm algum vértice alterado desde o commit em que foram armazenadas.
+
+    Alterações em JOB_RUN e EXECUTION_PLAN (arestas e o `dt_update`, que
+    define a execução mais recente) não são visíveis na resposta; os IDs
+    desses vértices são convertidos nos JOBs donos por `resolve_owners`.
+
+    Args:
+    -----
+    max_entries (int): Número máximo de subgrafos no cache. Zero desabilita
+        o cache.
+    ttl (int): Tempo de vida, em segundos, de cada entrada.
+    stream (NeptuneStream): Stream usado na invalidação. Se None, apenas o
+        TTL é utilizado.
+    resolve_owners (callable): Recebe uma lista de IDs de JOB_RUN e
+        EXECUTION_PLAN e retorna os IDs dos JOBs correspondentes.
+    refresh_interval (int): Intervalo mínimo, em segundos, entre leituras do
+        stream.
+    max_records (int): Registros lidos do stream por consulta ao cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SUBGRAPH_CACHE_SIZE,
+        ttl: int = SUBGRAPH_CACHE_TTL,
+        stream: NeptuneStream = None,
+        resolve_owners=None,
+        refresh_interval: int = STREAM_REFRESH_INTERVAL,
+        max_records: int = STREAM_MAX_RECORDS
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stream = stream
+        self.resolve_owners = resolve_owners
+        self.refresh_interval = refresh_interval
+        self.max_records = max_records
+        self.backoff = StreamBackoff()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_event_id = None
+        self._last_refresh = 0.0
+
+    @staticmethod
+    def key(node_type: str, node_name: str, level: int, level_down: int,
+            sections: list = None, engine: str = None) -> tuple:
+        return (
+            node_type,
+            node_name,
+            level,
+            level_down,
+            tuple(sorted(sections)) if sections else None,
+            engine
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: tuple):
+        if not self.enabled:
+            return None
+        self.refresh()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.created_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry.value
+
+    def put(self, key: tuple, value, ids: set = None) -> None:
+        if not self.enabled:
+            return
+        if ids is None:
+            ids = collect_ids(value)
+        commit_num = self._last_event_id.commit_num \
+            if self._last_event_id else 0
+        with self._lock:
+            self._entries[key] = _CacheEntry(
+                value, frozenset(ids), time.time(), commit_num
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, changes: dict) -> int:
+        """Remove as entradas que contêm algum dos vértices alterados.
+
+        Args:
+        -----
+        changes (dict): Mapa de ID do vértice para o commit da alteração.
+
+        Returns:
+        -------
+        int: Número de entradas removidas.
+        """
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if any(
+                    changes.get(vertex_id, 0) > entry.commit_num
+                    for vertex_id in entry.ids
+                )
+            ]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def refresh(self) -> None:
+        """Aplica as alterações do stream desde a última leitura.
+
+        Cada chamada faz no máximo uma requisição ao stream, de até
+        `max_records` registros, para limitar o trabalho feito no caminho
+        da consulta. Com mais registros pendentes, o cache inteiro é
+        descartado e a leitura continua a partir do fim do stream. Após uma
+        falha, a leitura é repetida com backoff (`StreamBackoff`); enquanto
+        isso as entradas expiram apenas pelo TTL e, quando o stream volta,
+        as alterações desde a última posição lida são aplicadas.
+        """
+        if self.stream is None:
+            return
+        now = time.time()
+        if now - self._last_refresh < self.refresh_interval or \
+                not self.backoff.ready():
+            return
+        self._last_refresh = now
+
+        if self._last_event_id is None:
+            try:
+                self._last_event_id = self.stream.latest_event_id()
+            except Exception as e:
+                self.backoff.failed(e)
+                return
+            self.backoff.succeeded()
+            # Entradas gravadas sem a posição do stream não podem ser
+            # invalidadas pelas alterações
+            self.clear()
+            return
+
+        try:
+            response = self.stream.poll_after(
+                self._last_event_id, self.max_records
+            )
+        except Exception as e:
+            self.backoff.failed(e)
+            return
+        self.backoff.succeeded()
+        if response is None or response.total_records == 0:
+            return
+
+        count = response.total_records
+        if count >= self.max_records:
+            logger.info("Too many graph changes, clearing subgraph cache")
+            self.clear()
+            self._last_event_id = None
+            self._last_refresh = 0.0
+            return
+
+        changes = {}
+        run_ids = {}
+        columns = response.columns()
+        for commit_num, vertex_id, element_type, key, value, frm, to in zip(
+                columns.commit_num, columns.id, columns.type, columns.key,
+                columns.value, columns.frm, columns.to):
+            if is_checkpoint(vertex_id):
+                continue
+            changes[vertex_id] = commit_num
+            if frm:
+                changes[frm] = commit_num
+            if to:
+                changes[to] = commit_num
+            if element_type == "e" and value in RUN_EDGE_LABELS:
+                run_id = to if value == "consumed_by" else frm
+                run_ids[run_id] = commit_num
+            elif element_type == "vp" and key == "dt_update":
+                # A execução mais recente do job dono pode ter mudado, como
+                # em `changed_jobs`
+                run_ids[vertex_id] = commit_num
+
+        if run_ids and self.resolve_owners is not None:
+            commit_num = max(run_ids.values())
+            for job_id in self.resolve_owners(list(run_ids)):
+                changes[job_id] = max(changes.get(job_id, 0), commit_num)
+        self._last_event_id = response.last_event_id
+
+        removed = self.invalidate(changes)
+        logger.info(
+            f"Processed {count} stream records, "
+            f"invalidated {removed} cached subgraphs"
+        )
@@ -0,0 +1,485 @@
+import base64
+import binascii
+import json
+import logging
+import os
+from gremlin_python.process.traversal import T, P
+from gremlin_python.process.graph_traversal import __
+from neptune_python_utils.gremlin_utils import GremlinUtils
+from utils.project_properties import project_job, project_table
+from utils.data_reader import \
+    LineageSteps, \
+    ShortcutLineageSteps, \
+    tag, \
+    visit_once
+from utils.name_index import start_vertices
+from utils.constants import (
+    ENGINE_DEFAULT,
+    ENGINE_SHORTCUT,
+    VERTEX_LABEL_JOB,
+    VERTEX_LABEL_TABLE,
+    VERTEX_LABEL_FEATURE,
+    VERTEX_LABEL_MODEL,
+    VERTEX_LABEL_DATASET,
+    VERTEX_LABEL_ANALYSIS,
+    VERTEX_LABEL_DASHBOARD
+)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Número padrão e máximo de itens (nós + arestas) por página
+PAGE_SIZE = int(os.getenv("SUBGRAPH_PAGE_SIZE", "1000"))
+MAX_PAGE_SIZE = int(os.getenv("SUBGRAPH_MAX_PAGE_SIZE", "5000"))
+# Tamanho dos lotes em que o Neptune devolve os resultados de cada consulta
+RESULT_BATCH_SIZE = 256
+
+# Saltos de linhagem da paginação por engine; os engines ausentes usam
+# `LineageSteps`
+PAGE_STEPS = {ENGINE_SHORTCUT: ShortcutLineageSteps}
+
+TABLE_SECTIONS = (
+    "table", "sourceJob", "ascendantJobs", "ascendantTables",
+    "descendantJobs", "descendantTables", "features", "models",
+    "datasets", "analyses", "dashboards", "edges"
+)
+JOB_SECTIONS = (
+    "job", "ascendantJobs", "ascendantTables", "descendantJobs",
+    "descendantTables", "features", "models", "datasets", "analyses",
+    "dashboards", "edges"
+)
+# Seções que não dependem das buscas ascendente e descendente
+WITHOUT_WALK = ("table", "job", "sourceJob")
+
+# Nós ligados às tabelas: (seção de origem, aresta, label do destino). Sem
+# seção de origem, o salto parte das tabelas do subgrafo
+ATTACHED_HOPS = {
+    "features": (None, "belongs_to_table", VERTEX_LABEL_FEATURE),
+    "models": ("features", "has_feature", VERTEX_LABEL_MODEL),
+    "datasets": (None, "read_by", VERTEX_LABEL_DATASET),
+    "analyses": ("datasets", "uses_dataset", VERTEX_LABEL_ANALYSIS),
+    "dashboards": ("analyses", "generate_by", VERTEX_LABEL_DASHBOARD),
+}
+ATTACHED_NAMES = {
+    VERTEX_LABEL_FEATURE: "feature_name",
+    VERTEX_LABEL_MODEL: "model_name",
+    VERTEX_LABEL_DATASET: "dataset_name",
+    VERTEX_LABEL_ANALYSIS: "analysis_name",
+    VERTEX_LABEL_DASHBOARD: "dashboard_name",
+}
+
+
+def encode_cursor(state: dict) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decodifica um cursor gerado por `encode_cursor`.
+
+    Raises:
+    -------
+    ValueError: Se o cursor não for válido.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    required = ("node_type", "node_name", "level", "level_down", "engine",
+                "section")
+    if not isinstance(state, dict) or any(k not in state for k in required):
+        raise ValueError("Invalid cursor: missing fields")
+    if not all(isinstance(state[k], int)
+               for k in ("level", "level_down", "section")):
+        raise ValueError("Invalid cursor: bad position")
+    after = state.get("after")
+    if after is not None and not isinstance(after, (str, list)):
+        raise ValueError("Invalid cursor: bad position")
+    return state
+
+
+def project_attached(traversal, label: str):
+    return traversal.project("id", "label", ATTACHED_NAMES[label]) \
+        .by(T.id) \
+        .by(T.label) \
+        .by(ATTACHED_NAMES[label])
+
+
+def edge_projection(edge_label: str, target_label: str):
+    """Arestas `edge_label` do vértice corrente até vértices
+    `target_label`, no formato {"from": ..., "to": ...}."""
+    return __.outE(edge_label) \
+        .where(__.inV().hasLabel(target_label)) \
+        .project("from", "to") \
+        .by(__.outV().id_()) \
+        .by(__.inV().id_())
+
+
+class TableLineagePaths:
+    """Travessias, por seção, do subgrafo de uma tabela.
+
+    Cada método retorna uma travessia anônima que parte da lista (`fold`)
+    de tabelas homônimas e emite os vértices da seção, com a mesma
+    semântica de `get_subgraph_of_the_table_single_trip`.
+
+    Com `materialized`, as buscas ascendente e descendente não são
+    refeitas: os vértices são lidos dos side-effects `up_nodes` e
+    `down_nodes`, preenchidos antes por `materialize`. É o que permite à
+    seção de arestas calcular todos os nós do subgrafo com uma única busca
+    em cada direção.
+    """
+
+    sections = TABLE_SECTIONS
+    start_label = VERTEX_LABEL_TABLE
+
+    def __init__(self, level: int, level_down: int,
+                 steps: LineageSteps = LineageSteps,
+                 materialized: bool = False):
+        self.level = level
+        self.level_down = level_down
+        self.steps = steps
+        self.materialized = materialized
+
+    def start(self):
+        return __.unfold().limit(1)
+
+    def walk_up(self):
+        return self.start() \
+            .aggregate("visited_up") \
+            .repeat(visit_once(self.steps.asc_table(), "visited_up")) \
+            .emit().times(self.level) \
+            .dedup().hasLabel(VERTEX_LABEL_TABLE)
+
+    def walk_down(self):
+        return self.start() \
+            .aggregate("visited_down") \
+            .repeat(visit_once(self.steps.desc_table(), "visited_down")) \
+            .emit().times(self.level_down) \
+            .dedup().hasLabel(VERTEX_LABEL_TABLE)
+
+    def up_nodes(self):
+        if self.materialized:
+            return __.select("up_nodes").unfold()
+        return self.walk_up()
+
+    def down_nodes(self):
+        if self.materialized:
+            return __.select("down_nodes").unfold()
+        return self.walk_down()
+
+    def materialize(self, traversal):
+        return traversal \
+            .sideEffect(self.walk_up().aggregate("up_nodes")) \
+            .sideEffect(self.walk_down().aggregate("down_nodes"))
+
+    def desc_tables(self):
+        return self.down_nodes()
+
+    def attached_tables(self):
+        """Tabelas homônimas e descendentes, de onde partem as features,
+        modelos, datasets, análises e dashboards."""
+        return __.union(__.unfold(), self.desc_tables()).dedup()
+
+    def nodes(self, section: str):
+        if section == "table":
+            return self.start()
+        if section == "sourceJob":
+            return __.unfold() \
+                .in_("produce").in_("has").in_("schedule").dedup()
+        if section == "ascendantJobs":
+            return self.up_nodes() \
+                .flatMap(self.steps.producer_jobs()).dedup()
+        if section == "ascendantTables":
+            return self.up_nodes()
+        if section == "descendantJobs":
+            return __.union(self.start(), self.down_nodes()) \
+                .flatMap(self.steps.consumer_jobs()).dedup()
+        if section == "descendantTables":
+            return self.down_nodes()
+        return self.attached(section)
+
+    def attached(self, section: str):
+        source, edge_label, target_label = ATTACHED_HOPS[section]
+        traversal = self.attached(source) if source \
+            else self.attached_tables()
+        return traversal.out(edge_label).hasLabel(target_label).dedup()
+
+    def lineage_edges(self):
+        return __.union(self.start(), self.up_nodes(), self.down_nodes()) \
+            .dedup().flatMap(self.steps.table_edges())
+
+    def raw_edges(self):
+        edges = [self.lineage_edges()]
+        for source, edge_label, target_label in ATTACHED_HOPS.values():
+            traversal = self.attached(source) if source \
+                else self.attached_tables()
+            edges.append(
+                traversal.flatMap(edge_projection(edge_label, target_label))
+            )
+        return __.union(*edges)
+
+    def project(self, section: str, traversal):
+        if section in ("table", "ascendantTables", "descendantTables"):
+            return project_table(traversal)
+        if section in ("job", "sourceJob", "ascendantJobs", "descendantJobs"):
+            return project_job(traversal)
+        return project_attached(traversal, ATTACHED_HOPS[section][2])
+
+
+class JobLineagePaths(TableLineagePaths):
+    """Travessias, por seção, do subgrafo de um job, com a mesma semântica
+    de `get_subgraph_of_the_job_single_trip`."""
+
+    sections = JOB_SECTIONS
+    start_label = VERTEX_LABEL_JOB
+
+    def walk_up(self):
+        return self.start() \
+            .aggregate("visited_up") \
+            .repeat(visit_once(self.steps.asc_job(), "visited_up")) \
+            .emit().times(self.level) \
+            .dedup().hasLabel(VERTEX_LABEL_JOB)
+
+    def walk_down(self):
+        return self.start() \
+            .aggregate("visited_down") \
+            .repeat(visit_once(self.steps.desc_job(), "visited_down")) \
+            .emit().times(self.level_down) \
+            .dedup().hasLabel(VERTEX_LABEL_JOB)
+
+    def desc_tables(self):
+        return __.union(self.start(), self.down_nodes()) \
+            .flatMap(self.steps.produced_tables()) \
+            .hasLabel(VERTEX_LABEL_TABLE).dedup()
+
+    def attached_tables(self):
+        return self.desc_tables()
+
+    def nodes(self, section: str):
+        if section == "job":
+            return self.start()
+        if section == "ascendantJobs":
+            return self.up_nodes()
+        if section == "ascendantTables":
+            return __.union(self.start(), self.up_nodes()) \
+                .flatMap(self.steps.consumed_tables()) \
+                .hasLabel(VERTEX_LABEL_TABLE).dedup()
+        if section == "descendantJobs":
+            return self.down_nodes()
+        if section == "descendantTables":
+            return self.desc_tables()
+        return self.attached(section)
+
+    def lineage_edges(self):
+        return __.union(self.start(), self.up_nodes(), self.down_nodes()) \
+            .dedup().flatMap(self.steps.job_edges())
+
+
+def seek(section: str, after):
+    """Filtro dos itens da seção posteriores a `after` (o último item da
+    página anterior), na ordem de `section_order`: um ID ou, nas arestas,
+    o par [from, to]."""
+    if section != "edges":
+        return __.has(T.id, P.gt(after))
+    after_from, after_to = after
+    return __.or_(
+        __.select("from").is_(P.gt(after_from)),
+        __.and_(
+            __.select("from").is_(P.eq(after_from)),
+            __.select("to").is_(P.gt(after_to))
+        )
+    )
+
+
+def section_order(section: str, traversal):
+    if section != "edges":
+        return traversal.order().by(T.id)
+    return traversal.order().by(__.select("from")).by(__.select("to"))
+
+
+def section_branch(paths: TableLineagePaths, section: str, after=None):
+    """Itens de uma seção, posteriores a `after` e ordenados, marcados com
+    a seção (`tag`).
+
+    As arestas são filtradas no servidor: apenas as que ligam dois nós do
+    subgrafo (acumulados no side-effect `nodes`) são emitidas.
+    """
+    if section == "edges":
+        traversal = __.sideEffect(
+            __.union(*[
+                paths.nodes(name)
+                for name in paths.sections if name != "edges"
+            ]).id_().aggregate("nodes")
+        ) \
+            .flatMap(paths.raw_edges()) \
+            .where(__.select("from").where(P.within("nodes"))) \
+            .where(__.select("to").where(P.within("nodes"))) \
+            .dedup()
+        if after is not None:
+            traversal = traversal.filter_(seek(section, after))
+        return tag(section, section_order(section, traversal))
+    traversal = __.flatMap(paths.nodes(section))
+    if after is not None:
+        traversal = traversal.filter_(seek(section, after))
+    return tag(
+        section, paths.project(section, section_order(section, traversal))
+    )
+
+
+def page_traversal(g: GremlinUtils, paths: TableLineagePaths,
+                   node_name: str, names: list, after, page_size: int):
+    """Monta a travessia de uma página: as seções `names`, em ordem, a
+    primeira a partir de `after`, até `page_size` itens.
+
+    As buscas ascendente e descendente são feitas uma única vez por
+    página (`materialize`) e compartilhadas por todas as seções. Cada
+    seção continua do último item da página anterior com um filtro por
+    chave (`seek`), em vez de pular os itens já entregues com `range()`.
+
+    O cursor guarda apenas a posição, não os nós já visitados: toda página
+    refaz as duas buscas completas e ordena cada seção sobre a linhagem
+    inteira antes do filtro. O custo de uma página é proporcional à
+    linhagem, não a `page_size`, e o de percorrer o subgrafo todo é
+    O(páginas × linhagem). A paginação limita a memória e o tamanho de
+    cada resposta, não o trabalho do Neptune; em linhagens grandes,
+    páginas maiores (até `MAX_PAGE_SIZE`) reduzem o total de buscas.
+    """
+    traversal = start_vertices(
+        g.with_("batchSize", RESULT_BATCH_SIZE), paths.start_label,
+        [node_name]
+    ).fold()
+    if any(name not in WITHOUT_WALK for name in names):
+        paths = type(paths)(
+            paths.level, paths.level_down, paths.steps, materialized=True
+        )
+        traversal = paths.materialize(traversal)
+    return traversal.union(*[
+        section_branch(paths, name, after if i == 0 else None)
+        for i, name in enumerate(names)
+    ]).limit(page_size)
+
+
+def item_key(section: str, item: dict):
+    if section == "edges":
+        return [item["from"], item["to"]]
+    return item["id"]
+
+
+def get_subgraph_page(
+        g: GremlinUtils,
+        node_type: str,
+        node_name: str,
+        level: int = 10,
+        level_down: int = None,
+        cursor: str = None,
+        page_size: int = PAGE_SIZE,
+        sections: list = None,
+        engine: str = ENGINE_DEFAULT
+        ) -> dict:
+    """Retorna uma página do subgrafo de uma tabela ou de um job.
+
+    As seções da resposta (as mesmas de `get_subgraph_of_the_table` e
+    `get_subgraph_of_the_job`) são percorridas em ordem e cada seção é
+    ordenada por ID no servidor. A página é uma única consulta
+    (`page_traversal`) que consome até `page_size` itens, recebidos em
+    lotes de `RESULT_BATCH_SIZE`. Apenas a página fica em memória,
+    independentemente do tamanho da linhagem, mas cada página refaz as
+    buscas da linhagem inteira (ver `page_traversal`).
+
+    O cursor retornado é opaco e guarda os parâmetros da consulta
+    (incluindo o engine, para que a paginação não troque de engine no
+    meio), a seção e a chave do último item entregue. Quando informado,
+    os parâmetros gravados no cursor prevalecem sobre os argumentos.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils para realizar
+        consultas em grafos.
+    node_type (str): Tipo do nó (TABLE ou JOB).
+    node_name (str): Nome da tabela ou do job.
+    level (int): Nível de profundidade para a busca de nós ascendentes e
+        descendentes.
+    level_down (int): Nível de profundidade para a busca de nós
+        descendentes. Se None, usa `level`.
+    cursor (str): Cursor retornado pela página anterior.
+    page_size (int): Número máximo de itens (nós e arestas) na página.
+    sections (list): Seções da resposta a percorrer. Se None, todas.
+    engine (str): Engine da consulta. O engine shortcut usa as arestas
+        derivadas da execução mais recente (`ShortcutLineageSteps`); os
+        demais, as travessias do engine single_trip (`LineageSteps`).
+
+    Returns:
+    -------
+    dict: Um dicionário com `data` (as seções presentes na página) e
+        `cursor` (None quando não há mais páginas).
+
+    Raises:
+    -------
+    ValueError: Se o cursor não for válido.
+    """
+    if level_down is None:
+        level_down = level
+    section_index, after = 0, None
+    if cursor:
+        state = decode_cursor(cursor)
+        node_type = state["node_type"]
+        node_name = state["node_name"]
+        level = state["level"]
+        level_down = state["level_down"]
+        engine = state["engine"]
+        section_index = state["section"]
+        after = state.get("after")
+        sections = state.get("sections") or sections
+
+    paths_class = TableLineagePaths if node_type == VERTEX_LABEL_TABLE \
+        else JobLineagePaths
+    paths = paths_class(
+        level, level_down, PAGE_STEPS.get(engine, LineageSteps)
+    )
+    names = [
+        (index, name) for index, name in enumerate(paths.sections)
+        if index >= section_index and (not sections or name in sections)
+    ]
+    if not names:
+        return {"data": {}, "cursor": None}
+
+    traversal = page_traversal(
+        g, paths, node_name, [name for _, name in names], after, page_size
+    )
+    results = traversal.toList()
+
+    data = {}
+    for result in results:
+        data.setdefault(result["section"], []).append(result["item"])
+
+    next_cursor = None
+    if len(results) >= page_size:
+        # Página cheia: a próxima continua depois do último item
+        last = results[-1]
+        last_index = next(
+            index for index, name in names if name == last["section"]
+        )
+        names = [(i, name) for i, name in names if i <= last_index]
+        next_cursor = encode_cursor({
+            "node_type": node_type,
+            "node_name": node_name,
+            "level": level,
+            "level_down": level_down,
+            "engine": engine,
+            "section": last_index,
+            "after": item_key(last["section"], last["item"]),
+            "sections": sections
+        })
+    for _, name in names:
+        if name in ("table", "job"):
+            items = data.get(name)
+            data[name] = items[0] if items else {}
+        else:
+            data.setdefault(name, [])
+    logger.info(
+        f"Subgraph page of {node_type} {node_name}: "
+        f"{len(results)} items, next section "
+        f"{'-' if next_cursor is None else names[-1][1]}"
+    )
+    return {"data": data, "cursor": next_cursor}
@@ -1,13 +1,33 @@
 import json
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from neptune_python_utils.gremlin_utils import GremlinUtils, Endpoints
-from gremlin_python.process.traversal import T
+from neptune_python_utils.batch_utils import BatchUtils
+from neptune_python_utils.mappings import Mappings
+from gremlin_python.process.traversal import T, Scope
 from gremlin_python.process.graph_traversal import __
+from utils.latest_run_edges import rebuild_latest_run_edges
+from utils.graph_reset import reset_graph
+from utils.query_metrics import measured
+from utils.name_index import start_vertices
+from utils.constants import VERTEX_LABEL_TABLE
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Elementos por requisição e conexões paralelas na carga dos dados mock
+MOCK_LOAD_BATCH_SIZE = int(os.getenv("MOCK_LOAD_BATCH_SIZE", "100"))
+MOCK_LOAD_WORKERS = int(os.getenv("MOCK_LOAD_WORKERS", "4"))
+
+# Pares por requisição na mesclagem de tabelas e, para duplicadas com mais
+# de MERGE_HUB_EDGES arestas, arestas movidas por travessia
+MERGE_BATCH_SIZE = 50
+MERGE_CHUNK_SIZE = 500
+MERGE_HUB_EDGES = 2000
+
 
 def create_connection(neptune_endpoint: str, neptune_port: str) -> tuple:
     GremlinUtils.init_statics(globals=globals())
@@ -28,55 +48,404 @@ def create_mock() -> dict:
     return data
 
 
-def bulk_load_data(g: GremlinUtils, load_mock: bool = False) -> None:
+def load_rows(
+        endpoints: Endpoints,
+        rows: list,
+        operation: str,
+        batch_size: int = MOCK_LOAD_BATCH_SIZE,
+        workers: int = MOCK_LOAD_WORKERS
+        ) -> int:
+    """Carrega vértices ou arestas com `BatchUtils`, em lotes de
+    `batch_size` elementos por requisição distribuídos entre `workers`
+    threads.
+
+    Cada thread usa o seu próprio `BatchUtils` (e a sua conexão) e o seu
+    próprio `Mappings`, que converte as chaves `nome:Tipo` nas
+    propriedades com o tipo correspondente. Os lotes com
+    ConcurrentModificationException ou falhas de conexão são repetidos
+    pelo `BatchUtils`.
+
+    Args:
+    -----
+    endpoints (Endpoints): Endpoints do writer.
+    rows (list): Vértices ou arestas no formato de `utils/data.json`.
+    operation (str): Método do `BatchUtils` (`add_vertices` ou
+        `add_edges`).
+    batch_size (int): Número de elementos por requisição.
+    workers (int): Número de conexões paralelas.
+
+    Returns:
+    -------
+    int: Número de elementos carregados.
+    """
+    local = threading.local()
+    clients = []
+    lock = threading.Lock()
+
+    def load_batch(batch):
+        if not hasattr(local, "client"):
+            local.client = BatchUtils(endpoints)
+            local.mappings = Mappings(mappings={})
+            with lock:
+                clients.append(local.client)
+        getattr(local.client, operation)(
+            batch_size=batch_size, rows=batch, mappings=local.mappings
+        )
+
+    batches = [
+        rows[start:start + batch_size]
+        for start in range(0, len(rows), batch_size)
+    ]
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            # list() propaga a primeira exceção dos lotes
+            list(executor.map(load_batch, batches))
+    finally:
+        for client in clients:
+            client.close()
+    return len(rows)
+
+
+@measured()
+def bulk_load_data(
+        g: GremlinUtils,
+        load_mock: bool = False,
+        endpoints: Endpoints = None,
+        batch_size: int = MOCK_LOAD_BATCH_SIZE,
+        workers: int = MOCK_LOAD_WORKERS
+        ) -> None:
+    """Recria o grafo com os dados de `utils/data.json`.
+
+    O grafo é esvaziado em lotes paralelos (`reset_graph`, com as próprias
+    configurações, como `GRAPH_RESET_WORKERS`), todos os vértices são
+    carregados antes das arestas, também em lotes paralelos (`load_rows`),
+    e as arestas derivadas da execução mais recente são recriadas no
+    final.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils conectada ao writer.
+    load_mock (bool): Se os dados mock devem ser carregados.
+    endpoints (Endpoints): Endpoints do writer, usados pelas conexões da
+        limpeza e da carga. Obrigatório quando `load_mock` é True.
+    batch_size (int): Número de elementos por requisição.
+    workers (int): Número de conexões paralelas da carga.
+
+    Raises:
+    -------
+    ValueError: Se `load_mock` for True e `endpoints` não for informado.
+    """
     if load_mock:
+        if endpoints is None:
+            raise ValueError("endpoints is required to load mock data")
         data = create_mock()
-        g.V().drop().iterate()
-        g.E().drop().iterate()
+        reset_graph(endpoints)
         nodes = []
         keys = list(data['nodes'].keys())
         for key in keys:
             for v in data['nodes'][key]:
                 nodes.append(v)
 
-        logger.info(f"Loading {len(nodes)} nodes and \
-                    {len(data['edges'])} edges into the graph.")
-
-        for node in nodes:
-            try:
-                v = g.addV(node['~label']).property(T.id, node['~id'])
-                for key, value in node.items():
-                    if key not in ['~label', '~id']:
-                        safe_key = key.split(":")[0]
-                        v = v.property(safe_key, value)
-                v.next()
-            except Exception as e:
-                logger.error(f"Erro ao inserir nó {node['~id']}: {e} - {node}")
-                raise e
-
-        for edge in data['edges']:
-            g.V(edge['~from']) \
-                .addE(edge['~label']) \
-                .to(__.V(edge['~to'])) \
-                .next()
+        logger.info(
+            f"Loading {len(nodes)} nodes and {len(data['edges'])} edges "
+            f"into the graph ({workers} workers, batches of {batch_size})."
+        )
 
+        started_at = time.perf_counter()
+        load_rows(endpoints, nodes, "add_vertices", batch_size, workers)
+        logger.info(
+            f"Loaded {len(nodes)} nodes in "
+            f"{time.perf_counter() - started_at:.1f}s"
+        )
+
+        started_at = time.perf_counter()
+        load_rows(endpoints, data['edges'], "add_edges", batch_size, workers)
+        logger.info(
+            f"Loaded {len(data['edges'])} edges in "
+            f"{time.perf_counter() - started_at:.1f}s"
+        )
+
+        rebuild_latest_run_edges(g)
         logger.info("Data loaded successfully.")
     else:
         logger.info("No mock data provided, skipping bulk load.")
 
 
+def move_edges(
+        source,
+        target_id: str,
+        duplicate_ids: list,
+        label: str,
+        out: bool,
+        limit: int = None
+        ):
+    """Move as arestas `label` das tabelas duplicadas para a tabela
+    `target_id`, sem criar arestas paralelas.
+
+    As arestas são agrupadas com `fold()`: os vizinhos distintos que ainda
+    não estão ligados ao alvo ganham uma aresta nova e, em seguida, as
+    arestas das duplicadas são removidas. Retorna o número de arestas
+    movidas.
+
+    Args:
+    -----
+    source: `g` (travessia própria) ou `__` (travessia anônima, usada
+        dentro de `merge_traversal`).
+    target_id (str): ID da tabela que permanece.
+    duplicate_ids (list): IDs das tabelas duplicadas.
+    label (str): Label das arestas.
+    out (bool): Se as arestas saem das tabelas (`consumed_by`, ...) ou
+        chegam nelas (`produce`, ...).
+    limit (int): Número máximo de arestas movidas.
+    """
+    edges = source.V(*duplicate_ids)
+    edges = edges.outE(label) if out else edges.inE(label)
+    if limit:
+        edges = edges.limit(limit)
+    if out:
+        neighbors = __.unfold().inV().dedup() \
+            .where(__.not_(__.in_(label).hasId(target_id))) \
+            .addE(label).from_(__.V(target_id))
+    else:
+        neighbors = __.unfold().outV().dedup() \
+            .where(__.not_(__.out(label).hasId(target_id))) \
+            .addE(label).to(__.V(target_id))
+    return edges.fold() \
+        .sideEffect(neighbors) \
+        .sideEffect(__.unfold().drop()) \
+        .count(Scope.local)
+
+
+def edge_labels(tables: list) -> list:
+    """Labels das arestas das tabelas, como pares (label, out), na ordem
+    em que aparecem. `tables` são projeções com `outLabels` e
+    `inLabels`."""
+    return list(dict.fromkeys(
+        [(label, True) for table in tables for label in table["outLabels"]]
+        + [(label, False) for table in tables for label in table["inLabels"]]
+    ))
+
+
+def drop_unlinked(source, duplicate_ids: list):
+    """Remove as duplicadas que não têm mais arestas. Uma duplicada com
+    arestas (criadas durante a mesclagem) permanece, em vez de perdê-las
+    com o vértice."""
+    return source.V(*duplicate_ids).where(__.not_(__.bothE())).drop()
+
+
+def merge_traversal(target_id: str, duplicate_ids: list, labels: list):
+    """Travessia anônima que mescla as duplicadas na tabela `target_id`:
+    move as arestas de cada par (label, out) de `labels` e remove as
+    duplicadas sem arestas."""
+    traversal = __.V(target_id)
+    for label, out in labels:
+        traversal = traversal.sideEffect(
+            move_edges(__, target_id, duplicate_ids, label, out=out)
+        )
+    return traversal.sideEffect(drop_unlinked(__, duplicate_ids))
+
+
+def merge_hub_tables(
+        g: GremlinUtils,
+        target_id: str,
+        duplicate_ids: list,
+        labels: list,
+        chunk_size: int = MERGE_CHUNK_SIZE
+        ) -> int:
+    """Mescla duplicadas com muitas arestas em travessias de até
+    `chunk_size` arestas por label.
+
+    Cada travessia move e remove as arestas que processou, então uma
+    mesclagem interrompida continua de onde parou quando executada de
+    novo. As duplicadas sem arestas são removidas no final.
+
+    Returns:
+    -------
+    int: Número de arestas movidas.
+    """
+    moved = 0
+    for label, out in labels:
+        while True:
+            count = move_edges(
+                g, target_id, duplicate_ids, label, out, limit=chunk_size
+            ).next()
+            moved += count
+            if count:
+                logger.info(
+                    f"Moved {moved} edges into table {target_id} "
+                    f"({label})"
+                )
+            if count < chunk_size:
+                break
+    drop_unlinked(g, duplicate_ids).iterate()
+    return moved
+
+
+@measured()
+def merge_tables(
+        g: GremlinUtils,
+        merges: list,
+        batch_size: int = MERGE_BATCH_SIZE,
+        chunk_size: int = MERGE_CHUNK_SIZE,
+        hub_edges: int = MERGE_HUB_EDGES
+        ) -> dict:
+    """Mescla tabelas duplicadas em lote.
+
+    Cada par (alvo, duplicadas) é mesclado por uma única travessia
+    (`merge_traversal`), com `batch_size` pares por requisição. Todas as
+    arestas das duplicadas, de qualquer label (os labels são lidos das
+    próprias duplicadas), passam para o alvo, sem arestas paralelas, e as
+    duplicadas são removidas. Uma duplicada que ainda tenha arestas depois
+    da mesclagem não é removida e aparece em `kept`. Duplicadas com mais
+    de `hub_edges` arestas são mescladas em partes (`merge_hub_tables`).
+
+    Quando há mais de uma tabela com o nome do alvo, a de menor ID
+    permanece e as demais são mescladas nela; os IDs dessas tabelas
+    aparecem em `implicit` no par mesclado. Pares com algum nome não
+    encontrado e pares em que o alvo está entre as duplicadas não são
+    mesclados.
+
+    Args:
+    -----
+    g (GremlinUtils): Instância da classe GremlinUtils conectada ao writer.
+    merges (list): Pares (nome da tabela alvo, nomes das duplicadas).
+    batch_size (int): Número de pares por requisição.
+    chunk_size (int): Arestas por travessia na mesclagem em partes.
+    hub_edges (int): Número de arestas a partir do qual as duplicadas são
+        mescladas em partes.
+
+    Returns:
+    -------
+    dict: Os pares mesclados (`merged`), os nomes não encontrados
+        (`notFound`), os alvos listados entre as próprias duplicadas
+        (`selfMerges`) e os IDs das duplicadas mantidas por ainda terem
+        arestas (`kept`).
+    """
+    merged, not_found, kept = [], [], []
+    self_merges = [
+        target for target, duplicates in merges if target in duplicates
+    ]
+    merges = [
+        (target, duplicates) for target, duplicates in merges
+        if target not in duplicates
+    ]
+    for start in range(0, len(merges), batch_size):
+        batch = merges[start:start + batch_size]
+        names = list(dict.fromkeys(
+            name for target, duplicates in batch
+            for name in [target] + list(duplicates)
+        ))
+        tables = {}
+        source = start_vertices(g, VERTEX_LABEL_TABLE, names)
+        for table in source \
+                .project("id", "name", "edges", "outLabels", "inLabels") \
+                .by(T.id) \
+                .by("table_name") \
+                .by(__.bothE().limit(hub_edges + 1).count()) \
+                .by(__.outE().label().dedup().fold()) \
+                .by(__.inE().label().dedup().fold()) \
+                .toList():
+            tables.setdefault(table["name"], []).append(table)
+
+        single, hubs = [], []
+        for target, duplicates in batch:
+            missing = [
+                name for name in [target] + list(duplicates)
+                if name not in tables
+            ]
+            if missing:
+                not_found += missing
+                continue
+            candidates = sorted(tables[target], key=lambda t: str(t["id"]))
+            target_id = candidates[0]["id"]
+            duplicate_tables = list({
+                table["id"]: table
+                for table in candidates[1:] + [
+                    table for name in duplicates for table in tables[name]
+                ]
+                if table["id"] != target_id
+            }.values())
+            if not duplicate_tables:
+                continue
+            duplicate_ids = [table["id"] for table in duplicate_tables]
+            implicit = [table["id"] for table in candidates[1:]]
+            if implicit:
+                logger.warning(
+                    f"Table {target} has {len(candidates)} vertices, "
+                    f"merging {implicit} into {target_id}"
+                )
+            edges = sum(table["edges"] for table in duplicate_tables)
+            (hubs if edges > hub_edges else single).append((
+                target, duplicates, target_id, duplicate_ids, implicit,
+                edge_labels(duplicate_tables)
+            ))
+
+        if single:
+            traversal = g.inject(0)
+            for _, _, target_id, duplicate_ids, _, labels in single:
+                traversal = traversal.sideEffect(
+                    merge_traversal(target_id, duplicate_ids, labels)
+                )
+            traversal.iterate()
+        for _, _, target_id, duplicate_ids, _, labels in hubs:
+            merge_hub_tables(g, target_id, duplicate_ids, labels, chunk_size)
+
+        all_duplicate_ids = [
+            duplicate_id for pairs in (single, hubs)
+            for _, _, _, duplicate_ids, _, _ in pairs
+            for duplicate_id in duplicate_ids
+        ]
+        remaining = g.V(*all_duplicate_ids).id_().toList() \
+            if all_duplicate_ids else []
+        if remaining:
+            logger.warning(
+                f"Tables {remaining} still have edges after the merge and "
+                "were not dropped"
+            )
+        kept += remaining
+
+        merged += [
+            {
+                "target": target,
+                "duplicates": list(duplicates),
+                "chunked": chunked,
+                "implicit": implicit,
+            }
+            for pairs, chunked in ((single, False), (hubs, True))
+            for target, duplicates, _, _, implicit, _ in pairs
+        ]
+        logger.info(
+            f"Merged {len(merged)} of {len(merges)} table pairs "
+            f"({len(not_found)} names not found)"
+        )
+    return {
+        "merged": merged,
+        "notFound": not_found,
+        "selfMerges": self_merges,
+        "kept": kept,
+    }
+
+
+@measured()
 def merge_table_data(
     g,
     tableId: str,
     table_merged: str
 ) -> dict:
-    try:
-        # Buscar os IDs das tabelas
-        id_table = g.V().has("TABLE", "table_name", tableId) \
-            .project("id").by(T.id).toList()[0]["id"]
-        id_table_merged = g.V().has("TABLE", "table_name", table_merged) \
-            .project("id").by(T.id).toList()[0]["id"]
-    except IndexError:
+    """Mescla uma ou mais tabelas (`table_merged`, separadas por vírgula)
+    na tabela `tableId` com `merge_tables`."""
+    duplicates = [
+        name.strip() for name in table_merged.split(",") if name.strip()
+    ]
+    summary = merge_tables(g, [(tableId, duplicates)])
+    if summary["selfMerges"]:
+        return {
+                "statusCode": 400,
+                "body": json.dumps({
+                    "message": "Cannot merge a table into itself."
+                }),
+            }
+    if summary["notFound"]:
         return {
                 "statusCode": 404,
                 "body": json.dumps({
@@ -84,30 +453,23 @@ def merge_table_data(
                 }),
             }
 
-    logger.info(
-        f"Migrando edges da tabela '{table_merged}' para '{tableId}'"
-    )
-
-    # Redireciona arestas "consumed_by" para a nova tabela
-    g.V(id_table_merged).outE("consumed_by").as_("e").inV() \
-        .addE("consumed_by").from_(__.V(id_table)) \
-        .select("e").drop().iterate()
-
-    # Redireciona arestas "produce" para a nova tabela
-    g.V(id_table_merged).inE("produce").as_("e").outV() \
-        .addE("produce").to(__.V(id_table)) \
-        .select("e").drop().iterate()
-
-    # Remove a tabela antiga
-    g.V(id_table_merged).drop().iterate()
-
     logger.info(
         f"Tabela '{table_merged}' mesclada com sucesso na '{tableId}'"
         )
 
+    implicit = [
+        table_id for pair in summary["merged"]
+        for table_id in pair["implicit"]
+    ]
+    body = {
+        "message": f"Table '{table_merged}' merged into '{tableId}'."
+    }
+    if implicit:
+        # Tabelas com o mesmo nome do alvo, mescladas na de menor ID
+        body["implicitlyMerged"] = implicit
+    if summary["kept"]:
+        body["kept"] = summary["kept"]
     return {
         "statusCode": 200,
-        "body": json.dumps({
-            "message": f"Table '{table_merged}' merged into '{tableId}'."
-        })
+        "body": json.dumps(body)
     }
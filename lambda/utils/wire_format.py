@@ -0,0 +1,196 @@
+import base64
+import gzip
+import json
+
+FORMAT_JSON = "json"
+FORMAT_COMPACT = "compact"
+COMPACT_MEDIA_TYPE = "application/vnd.lineage.compact+json"
+JSON_MEDIA_TYPE = "application/json"
+# Respostas menores que isto não compensam a compressão
+GZIP_MIN_SIZE = 1024
+
+MISSING_VALUE = "N/A"
+SINGLE_SECTIONS = ("table", "job")
+# Estados de uma propriedade em uma linha, nas máscaras do formato compacto
+PRESENT = 0
+ABSENT = 1
+NONE = 2
+
+
+def get_header(event: dict, name: str) -> str:
+    """Retorna um header da requisição, sem diferenciar maiúsculas."""
+    name = name.lower()
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == name:
+            return value or ""
+    return ""
+
+
+def negotiate(event: dict, parameters: dict) -> tuple:
+    """Escolhe o formato e a compressão da resposta.
+
+    O formato compacto é escolhido com `format=compact` na query string ou
+    com o header `Accept: application/vnd.lineage.compact+json`; a resposta
+    é comprimida quando `Accept-Encoding` aceita gzip.
+
+    Returns:
+    -------
+    tuple: Uma tupla contendo:
+        - response_format: `FORMAT_JSON` ou `FORMAT_COMPACT`.
+        - use_gzip: Se a resposta deve ser comprimida com gzip.
+    """
+    response_format = (parameters.get("format") or "").lower()
+    if response_format not in (FORMAT_JSON, FORMAT_COMPACT):
+        accept = get_header(event, "Accept")
+        response_format = FORMAT_COMPACT \
+            if COMPACT_MEDIA_TYPE in accept else FORMAT_JSON
+    accept_encoding = get_header(event, "Accept-Encoding").lower()
+    use_gzip = any(
+        encoding.split(";")[0].strip() == "gzip"
+        for encoding in accept_encoding.split(",")
+    )
+    return response_format, use_gzip
+
+
+def to_compact(subgraph: dict) -> dict:
+    """Converte um subgrafo no formato compacto.
+
+    Os IDs dos vértices são internados em `ids` e substituídos pelo índice
+    nessa lista, tanto nos nós quanto nas arestas. Cada seção vira um
+    dicionário de colunas (uma lista por propriedade) e as propriedades
+    sem valor ("N/A") viram null.
+
+    Linhas de uma seção podem ter chaves diferentes e uma propriedade pode
+    valer None. Para que `from_compact` reconstrua exatamente o subgrafo,
+    as colunas em que alguma linha não tem a chave ou tem None ganham uma
+    máscara por linha em `masks[seção][coluna]` (`PRESENT`, `ABSENT` ou
+    `NONE`); as demais colunas não têm máscara.
+    """
+    ids = {}
+    sections = {}
+    masks = {}
+    for name, value in subgraph.items():
+        if name == "edges":
+            continue
+        rows = [value] if isinstance(value, dict) and value else value
+        if not isinstance(rows, list):
+            rows = []
+        columns = {}
+        for row in rows:
+            for key in row:
+                columns.setdefault(key, [])
+        for key, column in columns.items():
+            mask = [presence(row, key) for row in rows]
+            if any(mask):
+                masks.setdefault(name, {})[key] = mask
+            if key == "id":
+                column.extend(
+                    None if row.get("id") is None
+                    else ids.setdefault(row["id"], len(ids))
+                    for row in rows
+                )
+            else:
+                column.extend(
+                    None if row.get(key, MISSING_VALUE) == MISSING_VALUE
+                    else row[key]
+                    for row in rows
+                )
+        sections[name] = columns
+
+    edges = None
+    if "edges" in subgraph:
+        edges = {"from": [], "to": []}
+        for edge in subgraph["edges"]:
+            edges["from"].append(ids.setdefault(edge["from"], len(ids)))
+            edges["to"].append(ids.setdefault(edge["to"], len(ids)))
+
+    compact = {"ids": list(ids), "sections": sections, "edges": edges}
+    if masks:
+        compact["masks"] = masks
+    return compact
+
+
+def presence(row: dict, key: str) -> int:
+    if key not in row:
+        return ABSENT
+    return NONE if row[key] is None else PRESENT
+
+
+def from_compact(compact: dict) -> dict:
+    """Reconstrói o subgrafo original a partir de `to_compact`."""
+    ids = compact["ids"]
+    masks = compact.get("masks") or {}
+    subgraph = {}
+    for name, columns in compact["sections"].items():
+        size = len(next(iter(columns.values()), []))
+        section_masks = masks.get(name, {})
+        rows = []
+        for i in range(size):
+            row = {}
+            for key, column in columns.items():
+                mask = section_masks.get(key)
+                state = mask[i] if mask else PRESENT
+                if state == ABSENT:
+                    continue
+                value = column[i]
+                if state == NONE:
+                    value = None
+                elif key == "id":
+                    value = ids[value]
+                elif value is None:
+                    value = MISSING_VALUE
+                row[key] = value
+            rows.append(row)
+        if name in SINGLE_SECTIONS:
+            subgraph[name] = rows[0] if rows else {}
+        else:
+            subgraph[name] = rows
+    edges = compact.get("edges")
+    if edges is not None:
+        subgraph["edges"] = [
+            {"from": ids[frm], "to": ids[to]}
+            for frm, to in zip(edges["from"], edges["to"])
+        ]
+    return subgraph
+
+
+def encode_response(
+        status_code: int,
+        payload: dict,
+        response_format: str = FORMAT_JSON,
+        use_gzip: bool = False
+        ) -> dict:
+    """Monta a resposta do API Gateway no formato negociado.
+
+    No formato compacto `payload["data"]` é convertido por `to_compact`.
+    Com gzip, o corpo é comprimido e enviado em base64
+    (`isBase64Encoded`), decodificado pelo API Gateway por meio dos
+    `BinaryMediaTypes` do template.
+    """
+    content_type = JSON_MEDIA_TYPE
+    if response_format == FORMAT_COMPACT and "data" in payload:
+        payload = dict(payload, format=FORMAT_COMPACT,
+                       data=to_compact(payload["data"]))
+        content_type = COMPACT_MEDIA_TYPE
+    body = json.dumps(payload, separators=(",", ":")) \
+        if response_format == FORMAT_COMPACT else json.dumps(payload)
+
+    headers = {
+        "Content-Type": content_type,
+        "Vary": "Accept, Accept-Encoding"
+    }
+    if use_gzip and len(body) >= GZIP_MIN_SIZE:
+        headers["Content-Encoding"] = "gzip"
+        return {
+            "statusCode": status_code,
+            "headers": headers,
+            "body": base64.b64encode(
+                gzip.compress(body.encode("utf-8"), compresslevel=5)
+            ).decode("ascii"),
+            "isBase64Encoded": True,
+        }
+    return {
+        "statusCode": status_code,
+        "headers": headers,
+        "body": body,
+    }
@@ -0,0 +1,16 @@
+import os
+import sys
+
+# O código da Lambda fica em lambda/ (nome reservado em Python), então os
+# módulos são importados a partir do próprio diretório, como na Lambda
+LAMBDA_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "lambda"
+)
+sys.path.insert(0, os.path.abspath(LAMBDA_DIR))
+
+# Variáveis lidas por app.py na importação; nenhum teste acessa o Neptune
+os.environ.setdefault("NEPTUNE_ENDPOINT_WRITER", "localhost")
+os.environ.setdefault("NEPTUNE_PORT", "8182")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("NAME_INDEX", "false")
+os.environ.setdefault("QUERY_METRICS", "false")
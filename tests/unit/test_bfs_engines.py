@@ -0,0 +1,347 @@
+import random
+
+import pytest
+
+from utils.constants import VERTEX_LABEL_JOB, VERTEX_LABEL_TABLE
+from utils.data_reader import (
+    LineageAdjacency,
+    TableBfs,
+    JobBfs,
+    run_tables_bfs,
+    run_jobs_bfs,
+    merge_subgraphs
+)
+
+
+class LineageModel:
+    """Linhagem em memória: cada job tem execuções (dt_update, tabelas
+    produzidas, tabelas consumidas); a de maior dt_update é a mais
+    recente."""
+
+    def __init__(self, tables: int, jobs: int, seed: int):
+        rng = random.Random(seed)
+        self.tables = [f"t{i}" for i in range(tables)]
+        self.runs = {}
+        for j in range(jobs):
+            runs = []
+            for dt in rng.sample(range(100), rng.randint(1, 3)):
+                produces = set(rng.sample(self.tables, rng.randint(0, 2)))
+                consumes = set(rng.sample(self.tables, rng.randint(0, 3)))
+                runs.append((dt, produces, consumes))
+            self.runs[f"j{j}"] = runs
+
+    def latest(self, job_id: str) -> tuple:
+        _, produces, consumes = max(self.runs[job_id], key=lambda r: r[0])
+        return produces, consumes
+
+    def any_run(self, table_id: str, produce: bool) -> set:
+        index = 1 if produce else 2
+        return {
+            job_id for job_id, runs in self.runs.items()
+            if any(table_id in run[index] for run in runs)
+        }
+
+    def latest_producers(self, table_id: str) -> set:
+        return {j for j in self.runs if table_id in self.latest(j)[0]}
+
+    def latest_consumers(self, table_id: str) -> set:
+        return {j for j in self.runs if table_id in self.latest(j)[1]}
+
+    def latest_edges(self, job_ids: set, table_ids: set) -> set:
+        edges = set()
+        for job_id in job_ids:
+            produces, consumes = self.latest(job_id)
+            edges |= {(job_id, t) for t in produces if t in table_ids}
+            edges |= {(t, job_id) for t in consumes if t in table_ids}
+        return edges
+
+
+def job_node(job_id: str) -> dict:
+    return {"id": job_id, "label": VERTEX_LABEL_JOB, "name": job_id}
+
+
+def table_node(table_id: str) -> dict:
+    return {
+        "id": table_id, "label": VERTEX_LABEL_TABLE, "table_name": table_id
+    }
+
+
+def job_row(model: LineageModel, job_id: str) -> dict:
+    produces, consumes = model.latest(job_id)
+    return {
+        "job": job_node(job_id),
+        "produces": [table_node(t) for t in sorted(produces)],
+        "consumes": [table_node(t) for t in sorted(consumes)],
+    }
+
+
+class StubAdjacency(LineageAdjacency):
+    """`LineageAdjacency` com `fetch` respondido pelo modelo, no formato
+    de `get_lineage_adjacency`."""
+
+    def __init__(self, model: LineageModel, with_links: bool = False):
+        super().__init__(g=None, with_links=with_links)
+        self.model = model
+
+    def fetch(self, up_tables: set, down_tables: set) -> tuple:
+        jobs = set()
+        for table_id in up_tables:
+            jobs |= self.model.any_run(table_id, produce=True)
+        for table_id in down_tables:
+            jobs |= self.model.any_run(table_id, produce=False)
+        links = {
+            (table_id, job_id)
+            for table_id in up_tables
+            for job_id in self.model.any_run(table_id, produce=True)
+        } if self.with_links else set()
+        rows = [
+            job_row(self.model, job_id)
+            for job_id in sorted(jobs - set(self.rows))
+        ]
+        return links, rows
+
+    def fetch_members(self, job_ids: set, up_tables: set,
+                      down_tables: set) -> tuple:
+        links, rows = self.fetch(up_tables, down_tables)
+        known = {row["job"]["id"] for row in rows}
+        rows += [
+            job_row(self.model, job_id)
+            for job_id in sorted(set(job_ids) - known)
+        ]
+        return links, rows
+
+
+def walk(start: set, level: int, step) -> set:
+    """Vértices alcançados em 1..level saltos de `step`, sem revisitar a
+    partida (como `visit_once` nas travessias do engine default)."""
+    visited, frontier, reached = set(start), set(start), set()
+    for _ in range(level):
+        frontier = {
+            node for current in frontier for node in step(current)
+        } - visited
+        visited |= frontier
+        reached |= frontier
+    return reached
+
+
+def reference_table(model: LineageModel, table_id: str, level: int,
+                    level_down: int) -> dict:
+    """Seções de `get_subgraph_of_the_table`, pela definição das
+    travessias do engine default."""
+    ascendant_tables = walk({table_id}, level, lambda t: {
+        u for j in model.latest_producers(t) for u in model.latest(j)[1]
+    })
+    descendant_tables = walk({table_id}, level_down, lambda t: {
+        u for j in model.latest_consumers(t) for u in model.latest(j)[0]
+    })
+    ascendant_jobs = {
+        j for t in ascendant_tables for j in model.latest_producers(t)
+    }
+    descendant_jobs = {
+        j for t in descendant_tables | {table_id}
+        for j in model.latest_consumers(t)
+    }
+    source_job = model.any_run(table_id, produce=True)
+    tables = {table_id} | ascendant_tables | descendant_tables
+    jobs = ascendant_jobs | descendant_jobs | source_job
+    return {
+        "sourceJob": source_job,
+        "ascendantJobs": ascendant_jobs,
+        "ascendantTables": ascendant_tables,
+        "descendantJobs": descendant_jobs,
+        "descendantTables": descendant_tables,
+        "edges": model.latest_edges(jobs, tables),
+    }
+
+
+def reference_job(model: LineageModel, job_id: str, level: int,
+                  level_down: int) -> dict:
+    """Seções de `get_subgraph_of_the_job`, pela definição das travessias
+    do engine default."""
+    ascendant_jobs = walk({job_id}, level, lambda j: {
+        p for t in model.latest(j)[1] for p in model.any_run(t, True)
+    })
+    descendant_jobs = walk({job_id}, level_down, lambda j: {
+        c for t in model.latest(j)[0] for c in model.latest_consumers(t)
+    })
+    ascendant_tables = {
+        t for j in ascendant_jobs | {job_id} for t in model.latest(j)[1]
+    }
+    descendant_tables = {
+        t for j in descendant_jobs | {job_id} for t in model.latest(j)[0]
+    }
+    jobs = {job_id} | ascendant_jobs | descendant_jobs
+    return {
+        "ascendantJobs": ascendant_jobs,
+        "ascendantTables": ascendant_tables,
+        "descendantJobs": descendant_jobs,
+        "descendantTables": descendant_tables,
+        "edges": model.latest_edges(
+            jobs, ascendant_tables | descendant_tables
+        ),
+    }
+
+
+def sections_of(subgraph: dict, expected: dict) -> dict:
+    return {
+        section: {
+            (item["from"], item["to"]) if section == "edges"
+            else item["id"]
+            for item in subgraph[section]
+        }
+        for section in expected
+    }
+
+
+def table_searches(model: LineageModel, table_ids: list, level: int,
+                   level_down: int) -> dict:
+    return {
+        table_id: TableBfs(
+            [table_node(table_id)],
+            [job_node(j) for j in
+             sorted(model.any_run(table_id, produce=True))],
+            level, level_down
+        )
+        for table_id in table_ids
+    }
+
+
+def job_searches(model: LineageModel, adjacency: StubAdjacency,
+                 job_ids: list, level: int, level_down: int) -> dict:
+    searches = {}
+    for job_id in job_ids:
+        row = job_row(model, job_id)
+        adjacency.add_row(row)
+        searches[job_id] = JobBfs([row["job"]], row, level, level_down)
+    return searches
+
+
+DEPTHS = [(1, 1), (2, 3), (4, 1), (10, 10)]
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("level, level_down", DEPTHS)
+def test_table_bfs_matches_reference(seed, level, level_down):
+    model = LineageModel(tables=30, jobs=25, seed=seed)
+    table_ids = random.Random(seed).sample(model.tables, 5)
+    adjacency = StubAdjacency(model)
+    searches = table_searches(model, table_ids, level, level_down)
+
+    run_tables_bfs(searches, adjacency, level, level_down)
+
+    for table_id in table_ids:
+        expected = reference_table(model, table_id, level, level_down)
+        subgraph = searches[table_id].build(adjacency, {})
+        assert subgraph["table"]["id"] == table_id
+        assert sections_of(subgraph, expected) == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("level, level_down", DEPTHS)
+def test_job_bfs_matches_reference(seed, level, level_down):
+    model = LineageModel(tables=30, jobs=25, seed=seed)
+    job_ids = random.Random(seed).sample(sorted(model.runs), 5)
+    adjacency = StubAdjacency(model, with_links=True)
+    searches = job_searches(model, adjacency, job_ids, level, level_down)
+
+    run_jobs_bfs(searches, adjacency, level, level_down)
+
+    for job_id in job_ids:
+        expected = reference_job(model, job_id, level, level_down)
+        subgraph = searches[job_id].build(adjacency, {})
+        assert subgraph["job"]["id"] == job_id
+        assert sections_of(subgraph, expected) == expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_preloaded_members_need_a_single_query(seed):
+    # Todos os nós do modelo: superconjunto dos membros do fecho
+    model = LineageModel(tables=30, jobs=25, seed=seed)
+    rng = random.Random(seed)
+    table_ids = rng.sample(model.tables, 3)
+    job_ids = rng.sample(sorted(model.runs), 3)
+    tables = StubAdjacency(model)
+    jobs = StubAdjacency(model, with_links=True)
+    table_search = table_searches(model, table_ids, 3, 3)
+    job_search = job_searches(model, jobs, job_ids, 3, 3)
+
+    for adjacency in (tables, jobs):
+        adjacency.preload(set(model.runs), model.tables, model.tables)
+    run_tables_bfs(table_search, tables, 3, 3)
+    run_jobs_bfs(job_search, jobs, 3, 3)
+
+    assert tables.queries == jobs.queries == 1
+    for table_id in table_ids:
+        expected = reference_table(model, table_id, 3, 3)
+        subgraph = table_search[table_id].build(tables, {})
+        assert sections_of(subgraph, expected) == expected
+    for job_id in job_ids:
+        expected = reference_job(model, job_id, 3, 3)
+        subgraph = job_search[job_id].build(jobs, {})
+        assert sections_of(subgraph, expected) == expected
+
+
+def test_preload_follows_edges_added_after_the_closure():
+    model = LineageModel(tables=30, jobs=25, seed=4)
+    closure_jobs = set(model.runs)
+    table_ids, job_ids = model.tables[:5], sorted(model.runs)[:5]
+    # Um job criado depois do fecho liga tabelas já conhecidas
+    model.runs["j_new"] = [(200, {"t0", "t1"}, {"t2", "t3"})]
+    tables = StubAdjacency(model)
+    jobs = StubAdjacency(model, with_links=True)
+    table_search = table_searches(model, table_ids, 3, 3)
+    job_search = job_searches(model, jobs, job_ids, 3, 3)
+
+    for adjacency in (tables, jobs):
+        adjacency.preload(closure_jobs, model.tables, model.tables)
+    run_tables_bfs(table_search, tables, 3, 3)
+    run_jobs_bfs(job_search, jobs, 3, 3)
+
+    assert "j_new" in tables.rows and "j_new" in jobs.rows
+    for table_id in table_ids:
+        expected = reference_table(model, table_id, 3, 3)
+        subgraph = table_search[table_id].build(tables, {})
+        assert sections_of(subgraph, expected) == expected
+    for job_id in job_ids:
+        expected = reference_job(model, job_id, 3, 3)
+        subgraph = job_search[job_id].build(jobs, {})
+        assert sections_of(subgraph, expected) == expected
+
+
+def test_batch_shares_adjacency_queries():
+    model = LineageModel(tables=30, jobs=25, seed=7)
+    table_ids = model.tables[:10]
+
+    batch = StubAdjacency(model)
+    run_tables_bfs(table_searches(model, table_ids, 3, 3), batch, 3, 3)
+    single_queries = 0
+    for table_id in table_ids:
+        single = StubAdjacency(model)
+        run_tables_bfs(
+            table_searches(model, [table_id], 3, 3), single, 3, 3
+        )
+        single_queries += single.queries
+
+    # Uma consulta por nível para todas as tabelas
+    assert batch.queries <= 4
+    assert batch.queries < single_queries
+
+
+def test_merge_subgraphs_without_duplicates():
+    t1, t2, t3 = table_node("t1"), table_node("t2"), table_node("t3")
+    j1 = job_node("j1")
+    subgraphs = [
+        {"table": t1, "ascendantTables": [t2], "descendantJobs": [j1],
+         "edges": [{"from": "t1", "to": "j1"}]},
+        {"table": t2, "ascendantTables": [t3], "descendantJobs": [j1],
+         "edges": [{"from": "t1", "to": "j1"}]},
+        {"table": {}, "ascendantTables": [], "descendantJobs": [],
+         "edges": []},
+    ]
+
+    merged = merge_subgraphs(subgraphs, VERTEX_LABEL_TABLE)
+
+    assert merged["tables"] == [t1, t2]
+    assert merged["ascendantTables"] == [t2, t3]
+    assert merged["descendantJobs"] == [j1]
+    assert merged["edges"] == [{"from": "t1", "to": "j1"}]
@@ -2,7 +2,7 @@ import json
 
 import pytest
 
-from hello_world import app
+import app
 
 
 @pytest.fixture()
@@ -10,63 +10,91 @@ def apigw_event():
     """ Generates API GW Event"""
 
     return {
-        "body": '{ "test": "body"}',
-        "resource": "/{proxy+}",
+        "body": None,
+        "resource": "/networks",
         "requestContext": {
             "resourceId": "123456",
             "apiId": "1234567890",
-            "resourcePath": "/{proxy+}",
-            "httpMethod": "POST",
+            "resourcePath": "/networks",
+            "httpMethod": "GET",
             "requestId": "c6af9ac6-7b61-11e6-9a41-93e8deadbeef",
             "accountId": "123456789012",
-            "identity": {
-                "apiKey": "",
-                "userArn": "",
-                "cognitoAuthenticationType": "",
-                "caller": "",
-                "userAgent": "Custom User Agent String",
-                "user": "",
-                "cognitoIdentityPoolId": "",
-                "cognitoIdentityId": "",
-                "cognitoAuthenticationProvider": "",
-                "sourceIp": "127.0.0.1",
-                "accountId": "",
-            },
             "stage": "prod",
         },
-        "queryStringParameters": {"foo": "bar"},
+        "queryStringParameters": {
+            "node_type": "TABLE",
+            "node_name": "tb_cliente",
+        },
         "headers": {
-            "Via": "1.1 08f323deadbeefa7af34d5feb414ce27.cloudfront.net (CloudFront)",
-            "Accept-Language": "en-US,en;q=0.8",
-            "CloudFront-Is-Desktop-Viewer": "true",
-            "CloudFront-Is-SmartTV-Viewer": "false",
-            "CloudFront-Is-Mobile-Viewer": "false",
-            "X-Forwarded-For": "127.0.0.1, 127.0.0.2",
-            "CloudFront-Viewer-Country": "US",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Upgrade-Insecure-Requests": "1",
-            "X-Forwarded-Port": "443",
-            "Host": "1234567890.execute-api.us-east-1.amazonaws.com",
-            "X-Forwarded-Proto": "https",
-            "X-Amz-Cf-Id": "aaaaaaaaaae3VYQb9jd-nvCd-de396Uhbp027Y2JvkCPNLmGJHqlaA==",
-            "CloudFront-Is-Tablet-Viewer": "false",
-            "Cache-Control": "max-age=0",
-            "User-Agent": "Custom User Agent String",
-            "CloudFront-Forwarded-Proto": "https",
+            "Accept": "application/json",
             "Accept-Encoding": "gzip, deflate, sdch",
+            "Host": "1234567890.execute-api.us-east-1.amazonaws.com",
         },
-        "pathParameters": {"proxy": "/examplepath"},
-        "httpMethod": "POST",
-        "stageVariables": {"baz": "qux"},
-        "path": "/examplepath",
+        "httpMethod": "GET",
+        "path": "/networks",
     }
 
 
-def test_lambda_handler(apigw_event):
+def with_parameters(event, **parameters):
+    return dict(
+        event,
+        queryStringParameters=dict(
+            event["queryStringParameters"], **parameters
+        )
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_neptune(monkeypatch):
+    """Falha o teste se o handler tentar acessar o Neptune."""
+    def run(query, *args, **kwargs):
+        raise AssertionError("unexpected Neptune query")
+
+    monkeypatch.setattr(app.router, "run_read", run)
+    monkeypatch.setattr(app.router, "run_write", run)
+
+
+@pytest.mark.parametrize("parameters, message", [
+    ({"node_type": "VIEW"}, "Invalid node type"),
+    ({"engine": "unknown"}, "Invalid engine"),
+    ({"depth_up": "0"}, "Invalid depth"),
+    ({"depth_down": "abc"}, "Invalid depth"),
+    ({"debug": "trace"}, "Invalid debug mode"),
+    ({"debug": "profile", "engine": "bfs"}, "cannot be profiled"),
+    ({"page_size": "0"}, "Invalid page_size"),
+    ({"merge_table": "true"}, "table_merged"),
+])
+def test_lambda_handler_rejects_invalid_parameters(
+        apigw_event, parameters, message):
+
+    ret = app.lambda_handler(with_parameters(apigw_event, **parameters), "")
+    data = json.loads(ret["body"])
+
+    assert ret["statusCode"] == 400
+    assert message in data["message"]
+
+
+def test_lambda_handler_rejects_too_many_batch_nodes(apigw_event):
+    names = ",".join(f"tb_{i}" for i in range(app.MAX_BATCH_NODES + 1))
+
+    ret = app.lambda_handler(
+        with_parameters(apigw_event, node_names=names), ""
+    )
+
+    assert ret["statusCode"] == 400
+    assert "node_names" in json.loads(ret["body"])["message"]
+
+
+def test_lambda_handler_returns_subgraph(apigw_event, monkeypatch):
+    subgraph = {"table": {"id": "t1"}, "edges": []}
+    monkeypatch.setattr(app.subgraph_cache, "max_entries", 0)
+    monkeypatch.setattr(
+        app, "get_subgraph", lambda *args, **kwargs: subgraph
+    )
 
     ret = app.lambda_handler(apigw_event, "")
     data = json.loads(ret["body"])
 
     assert ret["statusCode"] == 200
-    assert "message" in ret["body"]
-    assert data["message"] == "hello world"
+    assert data["message"] == "Successfully retrieved subgraph."
+    assert data["data"] == subgraph
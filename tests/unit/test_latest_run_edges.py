@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils import latest_run_edges
+from utils.latest_run_edges import changed_jobs, sync_latest_run_edges
+from utils.stream_checkpoint import checkpoint_id
+
+
+def record(event_id: int, element_type: str, element_id: str = None,
+           value=None, key=None, frm=None, to=None) -> SimpleNamespace:
+    return SimpleNamespace(event_id=event_id, data=SimpleNamespace(
+        type=element_type, id=element_id, key=key, value=value, frm=frm,
+        to=to
+    ))
+
+
+def test_changed_jobs_maps_records_to_jobs_and_runs():
+    records = [
+        record(1, "e", "e1", "schedule", frm="j1", to="r1"),
+        record(2, "e", "e2", "has", frm="r2", to="p2"),
+        record(3, "e", "e3", "produce", frm="p3", to="t1"),
+        record(4, "e", "e4", "consumed_by", frm="t2", to="p4"),
+        record(5, "vp", "r5", "2024-01-01", key="dt_update"),
+        record(6, "vp", "r6", "glue", key="tool"),
+        record(7, "e", "e7", "latest_produces", frm="j2", to="t3"),
+        record(8, "vp", checkpoint_id("latest_run_edges"), 10,
+               key="commit_num"),
+    ]
+
+    jobs, runs, last_event_id = changed_jobs(records)
+
+    assert jobs == {"j1"}
+    assert runs == {"r2", "p3", "p4", "r5"}
+    assert last_event_id == 8
+
+
+class FakeReader:
+    """`StreamReader` com os registros já prontos, em um único lote."""
+
+    def __init__(self, records: list):
+        self.records = records
+
+    def reset_metrics(self) -> None:
+        pass
+
+    def metrics(self) -> dict:
+        return {}
+
+    def batches_after(self, event_id, max_records=None):
+        if self.records:
+            yield SimpleNamespace(
+                records=lambda: iter(self.records),
+                total_records=len(self.records)
+            )
+
+
+@pytest.fixture()
+def graph(monkeypatch):
+    """Checkpoint, donos das execuções e refresh em memória."""
+    state = {"checkpoint": 0, "saved": [], "refreshed": []}
+    monkeypatch.setattr(
+        latest_run_edges, "load_checkpoint",
+        lambda g, name: state["checkpoint"]
+    )
+    monkeypatch.setattr(
+        latest_run_edges, "save_checkpoint",
+        lambda g, name, event_id: state["saved"].append(event_id)
+    )
+    monkeypatch.setattr(
+        latest_run_edges, "get_owner_jobs",
+        lambda g, run_ids: {f"owner-{run_id}" for run_id in run_ids}
+    )
+    monkeypatch.setattr(
+        latest_run_edges, "refresh_latest_run_edges",
+        lambda g, jobs: state["refreshed"].append(set(jobs)) or len(jobs)
+    )
+    return state
+
+
+def test_sync_refreshes_changed_jobs_and_saves(graph):
+    reader = FakeReader([
+        record(1, "e", "e1", "has", frm="r1", to="p1"),
+        record(2, "e", "e2", "schedule", frm="j1", to="r2"),
+    ])
+
+    summary = sync_latest_run_edges(None, reader)
+
+    assert graph["refreshed"] == [{"j1", "owner-r1"}]
+    assert graph["saved"] == [2]
+    assert summary["jobs"] == 2
+
+
+def test_sync_ignores_its_own_writes(graph):
+    # Registros da execução anterior: arestas derivadas e o checkpoint
+    reader = FakeReader([
+        record(1, "e", "e1", "latest_produces", frm="j1", to="t1"),
+        record(2, "vp", checkpoint_id("latest_run_edges"), 1,
+               key="commit_num"),
+    ])
+
+    summary = sync_latest_run_edges(None, reader)
+
+    assert graph["refreshed"] == [] and graph["saved"] == []
+    assert summary == {"records": 2, "jobs": 0, "stream": {}}
@@ -0,0 +1,229 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from neptune_python_utils.streams import NeptuneStreamColumns
+from utils.constants import VERTEX_LABEL_JOB, VERTEX_LABEL_TABLE
+from utils.lineage_closure import LineageClosure
+from utils.lineage_closure_index import (
+    ClosureIndex,
+    log_path,
+    sync_closure_index
+)
+
+
+class RunGraph:
+    """Jobs, execuções, planos e tabelas com as arestas `schedule`, `has`,
+    `produce` e `consumed_by`, alterados por lotes aleatórios de registros
+    do Neptune Stream."""
+
+    def __init__(self, seed: int, jobs: int = 8, tables: int = 12):
+        self.rng = random.Random(seed)
+        self.jobs = [f"j{i}" for i in range(jobs)]
+        self.tables = [f"t{i}" for i in range(tables)]
+        self.runs = [f"r{i}" for i in range(2 * jobs)]
+        self.plans = [f"p{i}" for i in range(3 * jobs)]
+        # Cada execução e plano tem no máximo um pai
+        self.parent = {}
+        self.edges = []
+        self.commit_num = 0
+        for run in self.runs:
+            self.parent[run] = self.rng.choice(self.jobs)
+            self.edges.append(("schedule", self.parent[run], run))
+        for plan in self.plans:
+            self.parent[plan] = self.rng.choice(self.runs)
+            self.edges.append(("has", self.parent[plan], plan))
+        for _ in range(3 * tables):
+            self.edges.append(self.io_edge())
+
+    def io_edge(self) -> tuple:
+        plan, table = self.rng.choice(self.plans), \
+            self.rng.choice(self.tables)
+        if self.rng.random() < 0.5:
+            return "produce", plan, table
+        return "consumed_by", table, plan
+
+    def export(self) -> list:
+        vertices = [("vertex", {"~id": job, "~label": VERTEX_LABEL_JOB})
+                    for job in self.jobs]
+        vertices += [("vertex", {"~id": table, "~label": VERTEX_LABEL_TABLE})
+                     for table in self.tables]
+        return vertices + [
+            ("edge", {"~label": label, "~from": frm, "~to": to})
+            for label, frm, to in self.edges
+        ]
+
+    def batch(self, size: int) -> NeptuneStreamColumns:
+        self.commit_num += 1
+        records = []
+        for op_num in range(1, size + 1):
+            choice = self.rng.random()
+            if choice < 0.05:
+                table = f"t{len(self.tables)}"
+                self.tables.append(table)
+                data = {"id": table, "type": "vl",
+                        "value": {"value": VERTEX_LABEL_TABLE}}
+                op = "ADD"
+            elif choice < 0.5 and self.edges:
+                label, frm, to = self.edges.pop(
+                    self.rng.randrange(len(self.edges))
+                )
+                if label in ("schedule", "has"):
+                    del self.parent[to]
+                data = {"type": "e", "value": {"value": label},
+                        "from": frm, "to": to}
+                op = "REMOVE"
+            else:
+                orphans = [
+                    child for child in self.runs + self.plans
+                    if child not in self.parent
+                ]
+                if orphans and self.rng.random() < 0.5:
+                    child = self.rng.choice(orphans)
+                    label = "schedule" if child in self.runs else "has"
+                    frm = self.rng.choice(
+                        self.jobs if label == "schedule" else self.runs
+                    )
+                    self.parent[child] = frm
+                    edge = (label, frm, child)
+                else:
+                    edge = self.io_edge()
+                self.edges.append(edge)
+                label, frm, to = edge
+                data = {"type": "e", "value": {"value": label},
+                        "from": frm, "to": to}
+                op = "ADD"
+            data.setdefault("id", f"e{self.commit_num}-{op_num}")
+            records.append({
+                "op": op,
+                "eventId": {"commitNum": self.commit_num, "opNum": op_num},
+                "data": data,
+            })
+        return NeptuneStreamColumns(records, "PG_JSON")
+
+
+def closure_of(index: ClosureIndex) -> dict:
+    """Fecho pelos IDs, independente da numeração dos nós."""
+    def ids(bitmap):
+        return frozenset(
+            vertex_id for number, vertex_id in enumerate(index.ids)
+            if bitmap >> number & 1
+        )
+
+    members = {}
+    for number, representative in enumerate(index.component):
+        members.setdefault(representative, set()).add(index.ids[number])
+    return {
+        vertex_id: (
+            ids(index.ancestors[number]),
+            ids(index.descendants[number]),
+            index.lengths[0][number],
+            index.lengths[1][number],
+            frozenset(members[index.component[number]]),
+        )
+        for number, vertex_id in enumerate(index.ids)
+    }
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_batches_match_a_rebuild(seed):
+    graph = RunGraph(seed)
+    index = ClosureIndex.build(graph.export())
+
+    for _ in range(15):
+        index.apply([graph.batch(graph.rng.randint(1, 8))])
+
+        assert closure_of(index) == \
+            closure_of(ClosureIndex.build(graph.export()))
+
+
+def test_written_closure_matches_the_index(tmp_path):
+    graph = RunGraph(seed=3)
+    index = ClosureIndex.build(graph.export())
+    path = str(tmp_path / "closure.bin")
+    for _ in range(10):
+        index.apply([graph.batch(5)])
+        index.write_closure(path)
+
+    closure = LineageClosure.load(path)
+    for vertex_id, (ancestors, descendants, up, down, _) in \
+            closure_of(index).items():
+        node = closure.node(vertex_id)
+        assert set(closure.ancestors(vertex_id)) == ancestors
+        assert set(closure.descendants(vertex_id)) == descendants
+        assert closure.longest_path(node, 0) == up
+        assert closure.longest_path(node, 1) == down
+    closure.close()
+
+
+@pytest.mark.parametrize("compact_records", [1000, 10])
+def test_checkpoints_restore_the_index(tmp_path, compact_records):
+    graph = RunGraph(seed=5)
+    path = str(tmp_path / "index.pkl")
+    index = ClosureIndex.build(graph.export())
+    index.save(path)
+    for _ in range(8):
+        index.apply([graph.batch(4)])
+        index.checkpoint(path, compact_records)
+
+    restored = ClosureIndex.load(path)
+
+    assert restored.event_id.to_dict() == index.event_id.to_dict()
+    assert closure_of(restored) == closure_of(index)
+
+
+def test_incomplete_log_entry_is_discarded(tmp_path):
+    graph = RunGraph(seed=8)
+    path = str(tmp_path / "index.pkl")
+    index = ClosureIndex.build(graph.export())
+    index.save(path)
+    index.apply([graph.batch(4)])
+    index.checkpoint(path)
+    expected = closure_of(index)
+    event_id = index.event_id.to_dict()
+    index.apply([graph.batch(4)])
+    index.checkpoint(path)
+    with open(log_path(path), "r+b") as file:
+        file.truncate(file.seek(0, 2) - 3)
+
+    restored = ClosureIndex.load(path)
+
+    assert restored.event_id.to_dict() == event_id
+    assert closure_of(restored) == expected
+
+
+class PageReader:
+    """`StreamReader` que entrega lotes já prontos, um por página."""
+
+    def __init__(self, pages: list):
+        self.pages = pages
+        self.delivered = 0
+
+    def reset_metrics(self) -> None:
+        pass
+
+    def metrics(self) -> dict:
+        return {}
+
+    def batches_after(self, event_id, max_records=None):
+        for columns in self.pages:
+            self.delivered += 1
+            yield SimpleNamespace(
+                columns=lambda columns=columns: columns,
+                total_records=len(columns)
+            )
+
+
+def test_sync_applies_each_page():
+    graph = RunGraph(seed=11)
+    index = ClosureIndex.build(graph.export())
+    index.apply([graph.batch(1)])
+    reader = PageReader([graph.batch(6) for _ in range(5)])
+
+    summary = sync_closure_index(index, reader)
+
+    assert reader.delivered == 5
+    assert summary["records"] == 30
+    assert summary["commitNum"] == graph.commit_num
+    assert closure_of(index) == closure_of(ClosureIndex.build(graph.export()))
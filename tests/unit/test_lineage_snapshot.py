@@ -0,0 +1,163 @@
+from types import SimpleNamespace
+
+from utils import lineage_snapshot
+from utils.lineage_snapshot import (
+    LineageSnapshot,
+    SnapshotStore,
+    changed_attached
+)
+
+
+def vertex(vertex_id: str, label: str, **properties) -> tuple:
+    return "vertex", dict({"~id": vertex_id, "~label": label}, **{
+        f"{key}:String": value for key, value in properties.items()
+    })
+
+
+def edge(label: str, frm: str, to: str) -> tuple:
+    return "edge", {"~label": label, "~from": frm, "~to": to}
+
+
+def record(element_type: str, element_id: str, value=None, frm=None,
+           to=None) -> SimpleNamespace:
+    return SimpleNamespace(data=SimpleNamespace(
+        type=element_type, id=element_id, key=None, value=value, frm=frm,
+        to=to
+    ))
+
+
+def snapshot() -> LineageSnapshot:
+    return LineageSnapshot.build([
+        vertex("t1", "TABLE", table_name="tb_a"),
+        vertex("t2", "TABLE", table_name="tb_b"),
+        vertex("f1", "FEATURE", feature_name="feat"),
+        vertex("m1", "MODEL", model_name="model"),
+        vertex("d1", "DATASET", dataset_name="ds"),
+        vertex("a1", "ANALYSIS", analysis_name="an"),
+        vertex("b1", "DASHBOARD", dashboard_name="dash"),
+        edge("belongs_to_table", "t1", "f1"),
+        edge("has_feature", "f1", "m1"),
+        edge("read_by", "t2", "d1"),
+        edge("uses_dataset", "d1", "a1"),
+        edge("generate_by", "a1", "b1"),
+    ])
+
+
+def test_attached_owners_walk_back_to_the_tables():
+    lineage = snapshot()
+
+    assert lineage.attached_owners(["m1"]) == {"t1"}
+    assert lineage.attached_owners(["b1", "f1"]) == {"t1", "t2"}
+    assert lineage.attached_owners(["t2", "unknown"]) == {"t2"}
+
+
+def test_changed_attached_keeps_only_attached_changes():
+    lineage = snapshot()
+    records = [
+        record("e", "e1", "has_feature", frm="f1", to="m2"),
+        record("e", "e2", "produce", frm="p1", to="t1"),
+        record("vl", "m3", "MODEL"),
+        record("vl", "j1", "JOB"),
+        record("vp", "b1"),
+        record("vp", "t2"),
+    ]
+
+    assert changed_attached(lineage, records) == {"f1", "m3", "b1"}
+
+
+def test_overlay_replaces_attached_nodes_of_a_table():
+    lineage = snapshot()
+    items = [
+        {"section": "attached",
+         "item": {"id": "f9", "label": "FEATURE", "feature_name": "new"}},
+        {"section": "edge", "item": {"from": "t1", "to": "f9"}},
+    ]
+
+    lineage.overlay.set_attached("t1", items)
+
+    assert lineage.attached("t1") == items
+    assert lineage.is_attached("f9")
+    assert [item["item"]["id"] for item in lineage.attached("t2")
+            if item["section"] == "attached"] == ["d1", "a1", "b1"]
+
+
+class PageReader:
+    """`StreamReader` com páginas de registros já prontas."""
+
+    def __init__(self, pages: list):
+        self.pages = pages
+        self.delivered = 0
+        self.max_records = None
+
+    def batches_after(self, event_id, max_records=None):
+        self.max_records = max_records
+        for records in self.pages:
+            self.delivered += 1
+            yield SimpleNamespace(records=lambda records=records: records)
+
+
+def store_with_pages(monkeypatch, pages: list, max_entries: int):
+    """`SnapshotStore` lendo `pages`; cada vértice alterado vira uma entrada
+    do overlay, sem consultas ao grafo."""
+    def update_overlay(g, lineage, job_ids, vertex_ids):
+        for vertex_id in vertex_ids:
+            lineage.overlay.set_node(vertex_id, None)
+
+    monkeypatch.setattr(lineage_snapshot, "update_overlay", update_overlay)
+    monkeypatch.setattr(
+        lineage_snapshot, "update_attached", lambda g, lineage, ids: None
+    )
+    monkeypatch.setattr(
+        lineage_snapshot, "get_owner_jobs", lambda g, ids: set()
+    )
+    store = SnapshotStore(
+        path=None, refresh_interval=0, max_records=50,
+        max_entries=max_entries
+    )
+    store.snapshot = snapshot()
+    store.stream = object()
+    store.reader = PageReader(pages)
+    store._last_event_id = 0
+    return store
+
+
+def page(start: int, vertex_ids: list) -> list:
+    return [
+        SimpleNamespace(event_id=start + number, data=SimpleNamespace(
+            type="vp", id=vertex_id, key="status", value="x", frm=None,
+            to=None
+        ))
+        for number, vertex_id in enumerate(vertex_ids)
+    ]
+
+
+def test_refresh_applies_each_page_up_to_the_cap(monkeypatch):
+    store = store_with_pages(
+        monkeypatch, [page(1, ["t1"]), page(2, ["t2"])], max_entries=10
+    )
+
+    assert store.get(None) is store.snapshot
+    assert store.reader.max_records == 50
+    assert store.reader.delivered == 2
+    assert store._last_event_id == 2
+    assert len(store.snapshot.overlay) == 2
+
+
+def test_overlay_past_the_limit_falls_back_to_bfs(monkeypatch):
+    store = store_with_pages(
+        monkeypatch, [page(1, ["t1", "t2"]), page(3, ["f1"])],
+        max_entries=1
+    )
+    monkeypatch.setattr(
+        lineage_snapshot, "get_subgraphs_of_the_tables_bfs",
+        lambda g, names, level, level_down: {
+            name: {"engine": "bfs"} for name in names
+        }
+    )
+
+    subgraph = store.get_subgraph_of_the_table(None, "tb_a", 2)
+
+    assert subgraph == {"engine": "bfs"}
+    assert store.disabled and store.snapshot is None
+    assert store.reader.delivered == 1
+    assert store.staleness() is None
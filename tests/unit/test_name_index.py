@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+from gremlin_python.process.graph_traversal import GraphTraversalSource
+from gremlin_python.process.traversal import TraversalStrategies
+from gremlin_python.structure.graph import Graph
+
+from utils import name_index
+from utils.name_index import NameIndex, start_vertices
+
+
+def record(op: str, element_type: str, vertex_id: str, value,
+           key: str = None) -> SimpleNamespace:
+    return SimpleNamespace(op=op, data=SimpleNamespace(
+        type=element_type, id=vertex_id, key=key, value=value
+    ))
+
+
+@pytest.fixture()
+def index(monkeypatch):
+    index = NameIndex(stream=object())
+    index.loaded = True
+    for vertex_id, name in (("t1", "tb_a"), ("t2", "tb_a"), ("t3", "tb_b")):
+        index.apply(record("ADD", "vl", vertex_id, "TABLE"))
+        index.apply(record("ADD", "vp", vertex_id, name, "table_name"))
+    monkeypatch.setattr(name_index, "_index", index)
+    return index
+
+
+def steps(traversal) -> list:
+    return [step[0] for step in traversal.bytecode.step_instructions]
+
+
+def source():
+    return GraphTraversalSource(Graph(), TraversalStrategies())
+
+
+def test_start_vertices_uses_ids_when_every_name_is_indexed(index):
+    traversal = start_vertices(source(), "TABLE", ["tb_a", "tb_b"])
+
+    assert traversal.bytecode.step_instructions == [["V", "t1", "t2", "t3"]]
+
+
+@pytest.mark.parametrize("names", [["tb_c"], ["tb_a", "tb_c"]])
+def test_start_vertices_falls_back_to_the_property_on_a_miss(index, names):
+    traversal = start_vertices(source(), "TABLE", names)
+
+    assert steps(traversal) == ["V", "has"]
+
+
+def test_renamed_vertex_moves_to_the_new_name(index):
+    index.apply(record("REMOVE", "vp", "t3", "tb_b", "table_name"))
+    index.apply(record("ADD", "vp", "t3", "tb_c", "table_name"))
+
+    assert not index.contains("TABLE", "tb_b")
+    assert index.ids("TABLE", ["tb_c"]) == {"tb_c": ["t3"]}
+
+
+class PagedStream:
+    """Stream com registros pendentes, entregues em páginas de `limit`."""
+
+    def __init__(self, records: list):
+        self.records = records
+        self.polls = []
+
+    def poll_after(self, event_id, limit):
+        self.polls.append((event_id, limit))
+        start = 0 if event_id is None else event_id
+        page = self.records[start:start + limit]
+        return SimpleNamespace(total_records=len(page),
+                               records=lambda: page)
+
+
+def stream_record(event_id: int, vertex_id: str, name: str):
+    data = record("ADD", "vp", vertex_id, name, "table_name")
+    data.event_id = event_id
+    return data
+
+
+def test_refresh_reads_at_most_max_records_per_call(index):
+    index.stream = PagedStream([
+        stream_record(number, "t3", f"tb_{number}")
+        for number in range(1, 6)
+    ])
+    index.max_records = 2
+    index._last_event_id = 0
+
+    index.refresh()
+
+    assert index.stream.polls == [(0, 2)]
+    assert index.contains("TABLE", "tb_2")
+    assert not index.contains("TABLE", "tb_3")
+
+    index.refresh()
+
+    assert index.stream.polls[-1] == (2, 2)
+    assert index.contains("TABLE", "tb_4")
+
+
+def test_stream_failure_backs_off_and_keeps_the_index(index):
+    class FailingStream:
+        def poll_after(self, event_id, limit):
+            raise RuntimeError("stream down")
+
+    index.stream = FailingStream()
+
+    index.refresh()
+
+    assert index.enabled and index.loaded
+    assert index.backoff.failures == 1
+    assert not index.backoff.ready()
+    assert index.get(None) is index
+    assert index.ids("TABLE", ["tb_b"]) == {"tb_b": ["t3"]}
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+from neptune_python_utils.streams import EventId, NeptuneStreamColumns
+from utils.subgraph_cache import SubgraphCache
+
+
+def page(commit_num: int, records: list) -> SimpleNamespace:
+    """Resposta de `poll_after` com os registros de um commit."""
+    records_json = [
+        {"op": "ADD",
+         "eventId": {"commitNum": commit_num, "opNum": op_num},
+         "data": data}
+        for op_num, data in enumerate(records, start=1)
+    ]
+    return SimpleNamespace(
+        total_records=len(records_json),
+        last_event_id=EventId(commit_num, len(records_json)),
+        columns=lambda: NeptuneStreamColumns(records_json, "PG_JSON")
+    )
+
+
+class FakeStream:
+
+    def __init__(self):
+        self.pages = []
+
+    def latest_event_id(self) -> EventId:
+        return EventId(10, 1)
+
+    def poll_after(self, event_id, limit):
+        return self.pages.pop(0) if self.pages else None
+
+
+def cache_with_entries(owners: dict) -> tuple:
+    stream = FakeStream()
+    cache = SubgraphCache(
+        max_entries=10, ttl=300, stream=stream,
+        resolve_owners=lambda run_ids: {
+            owners[run_id] for run_id in run_ids if run_id in owners
+        },
+        refresh_interval=0
+    )
+    # A primeira leitura só posiciona o cache no fim do stream
+    cache.get("warmup")
+    cache.put("a", {"job": {"id": "j1"}, "tables": [{"id": "t1"}]})
+    cache.put("b", {"job": {"id": "j2"}, "tables": [{"id": "t2"}]})
+    return cache, stream
+
+
+def test_latest_run_change_invalidates_the_owner_job():
+    cache, stream = cache_with_entries({"r1": "j1"})
+    stream.pages.append(page(11, [
+        {"id": "r1", "type": "vp", "key": "dt_update",
+         "value": {"value": "2024-05-01", "dataType": "String"}},
+    ]))
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+
+def test_run_edge_and_vertex_changes_invalidate():
+    cache, stream = cache_with_entries({"p1": "j2"})
+    stream.pages.append(page(11, [
+        {"id": "e1", "type": "e", "key": "label",
+         "value": {"value": "produce", "dataType": "String"},
+         "from": "p1", "to": "t9"},
+        {"id": "t1", "type": "vp", "key": "status",
+         "value": {"value": "inactive", "dataType": "String"}},
+        {"id": "checkpoint-latest_run_edges", "type": "vp",
+         "key": "commit_num", "value": {"value": 10, "dataType": "Long"}},
+    ]))
+
+    assert cache.get("a") is None
+    assert cache.get("b") is None
@@ -0,0 +1,135 @@
+import pytest
+from gremlin_python.process.graph_traversal import GraphTraversalSource
+from gremlin_python.process.traversal import Bytecode, P, TraversalStrategies
+from gremlin_python.structure.graph import Graph
+
+from utils import subgraph_pages
+from utils.subgraph_pages import (
+    TableLineagePaths,
+    decode_cursor,
+    encode_cursor,
+    get_subgraph_page,
+    page_traversal
+)
+
+
+def state(**fields) -> dict:
+    return {
+        "node_type": "TABLE", "node_name": "tb_a", "level": 3,
+        "level_down": 2, "engine": "single_trip", "section": 4,
+        "after": ["t1", "t2"], "sections": None, **fields
+    }
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(state())
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == state()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    encode_cursor(["TABLE"]),
+    encode_cursor({"node_type": "TABLE"}),
+    encode_cursor(state(section="4")),
+    encode_cursor(state(after=3)),
+])
+def test_invalid_cursor_raises(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def predicates(bytecode) -> list:
+    """Predicados `P` de uma travessia, inclusive das anônimas."""
+    found = []
+    for _, *args in bytecode.step_instructions:
+        for arg in args:
+            if isinstance(arg, P):
+                found.append(arg)
+            elif isinstance(arg, Bytecode):
+                found += predicates(arg)
+            elif hasattr(arg, "bytecode"):
+                found += predicates(arg.bytecode)
+    return found
+
+
+def test_only_the_first_section_seeks_after_the_cursor():
+    g = GraphTraversalSource(Graph(), TraversalStrategies())
+    paths = TableLineagePaths(2, 2)
+
+    traversal = page_traversal(
+        g, paths, "tb_a", ["ascendantJobs", "ascendantTables"], "j1", 10
+    )
+
+    seeks = [p for p in predicates(traversal.bytecode)
+             if p.operator == "gt"]
+    assert [p.value for p in seeks] == ["j1"]
+
+
+class FakeTraversal:
+    def __init__(self, results: list):
+        self.results = results
+
+    def toList(self) -> list:
+        return self.results
+
+
+@pytest.fixture()
+def pages(monkeypatch):
+    """Substitui a consulta de cada página pelos resultados informados e
+    registra as seções e a posição pedidas."""
+    calls = []
+    queue = []
+
+    def fake_page_traversal(g, paths, node_name, names, after, page_size):
+        calls.append((names, after))
+        return FakeTraversal(queue.pop(0))
+
+    monkeypatch.setattr(subgraph_pages, "page_traversal", fake_page_traversal)
+    return calls, queue
+
+
+def item(section: str, vertex_id: str) -> dict:
+    return {"section": section, "item": {"id": vertex_id}}
+
+
+def test_next_page_continues_in_the_section_of_the_last_item(pages):
+    calls, queue = pages
+    queue.append([
+        item("table", "t0"), item("sourceJob", "j0"),
+        item("ascendantJobs", "j1"),
+    ])
+    queue.append([item("ascendantJobs", "j2"), item("ascendantTables", "t1")])
+
+    first = get_subgraph_page(None, "TABLE", "tb_a", page_size=3)
+    second = get_subgraph_page(None, "TABLE", "ignored",
+                               cursor=first["cursor"], page_size=3)
+
+    assert first["data"] == {
+        "table": {"id": "t0"}, "sourceJob": [{"id": "j0"}],
+        "ascendantJobs": [{"id": "j1"}],
+    }
+    assert decode_cursor(first["cursor"])["section"] == 2
+    assert calls[1] == (list(TableLineagePaths.sections[2:]), "j1")
+    assert second["cursor"] is None
+    assert second["data"]["ascendantJobs"] == [{"id": "j2"}]
+    assert second["data"]["ascendantTables"] == [{"id": "t1"}]
+    assert second["data"]["edges"] == []
+    assert "table" not in second["data"]
+
+
+def test_cursor_keeps_the_requested_sections(pages):
+    calls, queue = pages
+    queue.append([
+        {"section": "edges", "item": {"from": "t1", "to": "t2"}},
+    ])
+    queue.append([])
+
+    first = get_subgraph_page(None, "TABLE", "tb_a", page_size=1,
+                              sections=["features", "edges"])
+    get_subgraph_page(None, "TABLE", "tb_a", cursor=first["cursor"],
+                      page_size=1)
+
+    assert calls[0] == (["features", "edges"], None)
+    assert calls[1] == (["edges"], ["t1", "t2"])
@@ -0,0 +1,49 @@
+import pytest
+
+from utils import utils
+
+
+def test_bulk_load_requires_endpoints(monkeypatch):
+    monkeypatch.setattr(
+        utils, "reset_graph",
+        lambda *args, **kwargs: pytest.fail("graph reset without endpoints")
+    )
+
+    with pytest.raises(ValueError, match="endpoints"):
+        utils.bulk_load_data(g=None, load_mock=True)
+
+
+def test_bulk_load_resets_with_its_own_settings(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        utils, "reset_graph", lambda *args, **kwargs: calls.append(
+            (args, kwargs)
+        )
+    )
+    monkeypatch.setattr(utils, "load_rows", lambda *args, **kwargs: None)
+    monkeypatch.setattr(
+        utils, "rebuild_latest_run_edges", lambda *args, **kwargs: 0
+    )
+
+    utils.bulk_load_data(g=None, load_mock=True, endpoints="e", workers=16)
+
+    assert calls == [(("e",), {})]
+
+
+def test_merge_rejects_self_merge_without_querying():
+    ret = utils.merge_table_data(g=None, tableId="tb_a", table_merged="tb_a")
+
+    assert ret["statusCode"] == 400
+    assert "itself" in ret["body"]
+
+
+def test_edge_labels_keep_every_label_and_direction():
+    tables = [
+        {"outLabels": ["consumed_by", "custom"], "inLabels": ["produce"]},
+        {"outLabels": ["custom", "read_by"], "inLabels": ["other"]},
+    ]
+
+    assert utils.edge_labels(tables) == [
+        ("consumed_by", True), ("custom", True), ("read_by", True),
+        ("produce", False), ("other", False),
+    ]
@@ -0,0 +1,90 @@
+import json
+import random
+
+import pytest
+
+from utils.wire_format import MISSING_VALUE, from_compact, to_compact
+
+
+def round_trip(subgraph: dict) -> dict:
+    # A resposta passa por JSON, como no API Gateway
+    return from_compact(json.loads(json.dumps(to_compact(subgraph))))
+
+
+def test_round_trip_subgraph():
+    subgraph = {
+        "table": {"id": "t1", "label": "TABLE", "table_name": "tb_a",
+                  "status": MISSING_VALUE},
+        "ascendantJobs": [
+            {"id": "j1", "label": "JOB", "name": "job_a", "tool": "glue"},
+            {"id": "j2", "label": "JOB", "name": "job_b",
+             "tool": MISSING_VALUE},
+        ],
+        "features": [],
+        "edges": [{"from": "j1", "to": "t1"}, {"from": "t1", "to": "j2"}],
+    }
+
+    assert round_trip(subgraph) == subgraph
+
+
+def test_round_trip_rows_with_different_keys():
+    subgraph = {
+        "ascendantJobs": [
+            {"id": "j1", "name": "job_a"},
+            {"id": "j2", "tool": "glue"},
+            {"id": "j3"},
+        ],
+    }
+
+    assert round_trip(subgraph) == subgraph
+
+
+def test_round_trip_keeps_none_apart_from_missing_value():
+    subgraph = {
+        "table": {"id": "t1", "status": None, "location_path": MISSING_VALUE},
+        "descendantTables": [
+            {"id": "t2", "status": None},
+            {"id": "t3", "status": MISSING_VALUE},
+            {"id": "t4", "status": "active"},
+        ],
+    }
+
+    assert round_trip(subgraph) == subgraph
+
+
+def test_masks_only_for_irregular_columns():
+    compact = to_compact({
+        "descendantTables": [
+            {"id": "t1", "status": None, "name": "a"},
+            {"id": "t2", "name": MISSING_VALUE},
+        ],
+    })
+
+    assert compact["masks"] == {"descendantTables": {"status": [2, 1]}}
+    assert "masks" not in to_compact({"table": {"id": "t1", "name": "a"}})
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_round_trip_random_sections(seed):
+    rng = random.Random(seed)
+    values = ["a", "b", 1, 2.5, True, None, MISSING_VALUE, ""]
+    keys = ["label", "name", "status", "dt_update", "tool"]
+    node_ids = [f"n{i}" for i in range(15)]
+
+    def row():
+        node = {"id": rng.choice(node_ids)}
+        for key in rng.sample(keys, rng.randint(0, len(keys))):
+            node[key] = rng.choice(values)
+        return node
+
+    subgraph = {
+        "table": row() if rng.random() < 0.8 else {},
+        "ascendantTables": [row() for _ in range(rng.randint(0, 6))],
+        "descendantJobs": [row() for _ in range(rng.randint(0, 6))],
+        "edges": [
+            {"from": rng.choice(node_ids), "to": rng.choice(node_ids)}
+            for _ in range(rng.randint(0, 8))
+        ],
+    }
+
+    assert round_trip(subgraph) == subgraph